@@ -0,0 +1,95 @@
+"""
+In-process stand-in for the Telegram Bot API.
+
+`FakeTelegramAPI.transport` is an `httpx.MockTransport` that can be plugged
+into the shared client (`telegram_client.transport = fake.transport`) so the
+whole reply path — outbox, rate limiters, retries — runs without the network.
+Latency, 5xx errors and 429 rate-limit responses can be injected; every
+successful call is recorded and can be observed through `on_send`.
+
+Used by the replay load test (backend/benchmarks/replay_load.py).
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter
+from typing import Callable
+
+import httpx
+
+
+class FakeTelegramAPI:
+    """Answers Bot API calls locally with configurable latency and error injection."""
+
+    def __init__(
+        self,
+        latency_seconds: float = 0.0,
+        jitter_seconds: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: int = 1,
+        on_send: Callable[[str, dict], None] | None = None,
+        seed: int | None = None,
+    ):
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.on_send = on_send
+        self.calls = Counter()  # (method, outcome) -> count
+        self._rng = random.Random(seed)
+        self._message_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.transport = httpx.MockTransport(self._handle)
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        method = request.url.path.rsplit("/", 1)[-1]
+        payload = json.loads(request.content or b"{}")
+        await asyncio.sleep(self.latency_seconds + self._rng.random() * self.jitter_seconds)
+
+        roll = self._rng.random()
+        if roll < self.rate_limit_rate:
+            self._count(method, "429")
+            return httpx.Response(
+                429,
+                json={
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                },
+            )
+        if roll < self.rate_limit_rate + self.error_rate:
+            self._count(method, "500")
+            return httpx.Response(
+                500,
+                json={"ok": False, "error_code": 500, "description": "Internal Server Error"},
+            )
+
+        self._count(method, "ok")
+        if self.on_send:
+            self.on_send(method, payload)
+        return httpx.Response(200, json={"ok": True, "result": self._result(method, payload)})
+
+    def _result(self, method: str, payload: dict):
+        if method in ("sendMessage", "editMessageText"):
+            return {
+                "message_id": payload.get("message_id") or next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": payload.get("chat_id")},
+                "text": payload.get("text", ""),
+            }
+        return True
+
+    def _count(self, method: str, outcome: str):
+        with self._lock:
+            self.calls[(method, outcome)] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {f"{method}:{outcome}": n for (method, outcome), n in sorted(self.calls.items())}
@@ -0,0 +1,260 @@
+"""
+Async gateway for LLM provider calls.
+
+Every call to an LLM provider (backend/adapters/llm_providers.py) goes
+through that provider's `LLMGateway`, which runs on the shared I/O loop
+(backend/utils/background_loop.py) and protects the bot from a slow or
+failing provider:
+
+- a per-request deadline covering queueing, retries and the call itself,
+- a semaphore capping in-flight calls, so a stalled provider cannot tie up
+  more than LLM_MAX_CONCURRENCY requests,
+- retries with exponential backoff and jitter for transient errors
+  (timeouts, connection errors, 429 and 5xx),
+- a circuit breaker: after LLM_BREAKER_FAILURE_THRESHOLD consecutive
+  failures, calls fail immediately with `LLMUnavailable` for
+  LLM_BREAKER_RESET_SECONDS.  One trial call is then let through, and it
+  closes the breaker again if it succeeds.  Timeouts only count as failures
+  when the gateway's own timeout ran out, not a caller's shorter deadline.
+
+Which exceptions count as transient is provider-specific (`is_transient`).
+"""
+
+import logging
+import asyncio
+import random
+import threading
+import time
+
+from typing import Awaitable, Callable
+
+import groq
+
+from backend.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Shown to the user instead of a confirmation when the LLM can't be reached
+LLM_UNAVAILABLE_MESSAGE = (
+    "I'm having trouble understanding messages right now. Please try again shortly."
+)
+
+_TRANSIENT_GROQ_ERRORS = (
+    groq.APITimeoutError,
+    groq.APIConnectionError,
+    groq.RateLimitError,
+    groq.InternalServerError,
+)
+
+
+def is_transient_groq_error(e: Exception) -> bool:
+    return isinstance(e, _TRANSIENT_GROQ_ERRORS)
+
+
+class LLMUnavailable(Exception):
+    """The LLM could not produce a response (breaker open, deadline exceeded or errors)."""
+
+    def __init__(self, reason: str, detail: str = ""):
+        self.reason = reason
+        super().__init__(f"LLM unavailable ({reason}){': ' + detail if detail else ''}")
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial call."""
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """True if a call may go ahead now."""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("LLM circuit breaker opened after %s failures", self.failures)
+                self._opened_at = time.monotonic()  # (Re)start the open period
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """Give up a half-open trial that ended without an outcome (e.g. cancelled)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class LLMGateway:
+    """Deadline, concurrency cap, retries and circuit breaker around one provider's calls."""
+
+    def __init__(
+        self,
+        name: str,
+        timeout_seconds: float = 20.0,
+        max_concurrency: int = 8,
+        max_retries: int = 2,
+        breaker: CircuitBreaker | None = None,
+        is_transient: Callable[[Exception], bool] = is_transient_groq_error,
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker(5, 30.0)
+        self.is_transient = is_transient
+        self.name = name
+        self._semaphore: asyncio.Semaphore | None = None
+        self._in_flight = 0
+        metrics.gauge(
+            "llm_in_flight",
+            "LLM calls currently in progress",
+            fn=lambda: self._in_flight,
+            provider=name,
+        )
+        metrics.gauge(
+            "llm_breaker_open",
+            "1 while the LLM circuit breaker rejects calls",
+            fn=lambda: int(self.breaker.state == CircuitBreaker.OPEN),
+            provider=name,
+        )
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable],
+        deadline: float | None = None,
+        model: str = "",
+    ):
+        """
+        Await `call()` (a fresh provider request per attempt) under the
+        gateway's protections.  `deadline` overrides the default per-request
+        timeout (seconds); `model` only labels the metrics.
+        """
+        timeout = deadline or self.timeout_seconds
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise LLMUnavailable("circuit_open", self.name)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                self._call_with_retries(call), timeout=timeout
+            )
+        except asyncio.CancelledError:
+            # E.g. the losing side of a hedged request: neither a success nor
+            # a failure, but a half-open trial must not stay taken
+            self.breaker.release_trial()
+            self._observe(model, "cancelled", started)
+            raise
+        except asyncio.TimeoutError:
+            if deadline is not None and deadline < self.timeout_seconds:
+                # Only the caller's shorter budget ran out (e.g. the small
+                # tier's): no verdict on the provider, which may still answer
+                # the escalated call in time
+                self.breaker.release_trial()
+            else:
+                self.breaker.record_failure()
+            self._observe(model, "timeout", started)
+            raise LLMUnavailable("timeout", f"{self.name}: no response within {timeout}s")
+        except Exception as e:
+            self._observe(model, "error", started)
+            if self.is_transient(e):
+                self.breaker.record_failure()
+                raise LLMUnavailable("error", f"{self.name}: {e}") from e
+            # Request errors (4xx) say nothing about the provider's health
+            self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        self._observe(model, "ok", started)
+        return response
+
+    async def _call_with_retries(self, call: Callable[[], Awaitable]):
+        attempt = 0
+        async with self._semaphore:
+            self._in_flight += 1
+            try:
+                while True:
+                    attempt += 1
+                    try:
+                        return await call()
+                    except Exception as e:
+                        if not self.is_transient(e) or attempt > self.max_retries:
+                            raise
+                        metrics.counter(
+                            "llm_retries_total",
+                            "Retried LLM calls",
+                            provider=self.name,
+                            error=type(e).__name__,
+                        ).inc()
+                        await asyncio.sleep(self._backoff(attempt))
+            finally:
+                self._in_flight -= 1
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(4.0, 0.25 * 2 ** (attempt - 1)) * (0.5 + random.random() / 2)
+
+    def _count(self, outcome: str):
+        metrics.counter(
+            "llm_requests_total", "LLM calls by outcome", provider=self.name, outcome=outcome
+        ).inc()
+
+    def _observe(self, model: str, outcome: str, started: float):
+        self._count(outcome)
+        metrics.histogram(
+            "llm_request_seconds",
+            "LLM call latency including queueing and retries",
+            provider=self.name,
+            model=model,
+            outcome=outcome,
+        ).observe(time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.name,
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            **{
+                outcome: int(
+                    metrics.counter(
+                        "llm_requests_total", provider=self.name, outcome=outcome
+                    ).value
+                )
+                for outcome in ("ok", "error", "timeout", "rejected")
+            },
+            "latency_seconds": {
+                f"{labels['model']}:{labels['outcome']}": metric.snapshot()
+                for kind, name, labels, metric in metrics.collect()
+                if name == "llm_request_seconds" and labels.get("provider") == self.name
+            },
+        }
+
@@ -0,0 +1,421 @@
+"""
+LLM providers for intent parsing, and hedged calls across two of them.
+
+Every provider turns the prompt messages (backend/utils/llm_prompt.py) into a
+validated `LLMMultiResponse` for a model tier ("small" or "large", see
+backend/utils/model_router.py):
+
+    review = await provider.parse(messages, tier="small", deadline=8.0)
+
+- `GroqProvider`   — Groq chat completions with a JSON-schema response format.
+- `GeminiProvider` — Google Gemini via google-genai, with the same schema.
+- `FakeProvider`   — canned responses with configurable latency and failures,
+                     for offline tests and load tests.
+
+Real providers call through their own `LLMGateway` (deadline, concurrency cap,
+retries, circuit breaker), so one provider failing doesn't trip the other.
+
+`HedgedProvider` wraps a primary and a secondary provider.  If the primary
+hasn't answered within a hedge delay — the LLM_HEDGE_PERCENTILE latency of
+the primary's recent successful calls for that tier, clamped to
+[LLM_HEDGE_MIN_DELAY_SECONDS, LLM_HEDGE_MAX_DELAY_SECONDS] — or if it fails
+first, the same request is sent to the secondary.  Whichever valid response
+arrives first wins and the other call is cancelled.
+"""
+
+import asyncio
+import json
+import random
+import time
+from typing import Callable
+
+import httpx
+from google import genai
+from google.genai import errors as genai_errors
+from google.genai import types as genai_types
+from groq import AsyncGroq, BadRequestError
+
+from backend.adapters.llm_gateway import (
+    CircuitBreaker,
+    LLMGateway,
+    LLMUnavailable,
+    is_transient_groq_error,
+)
+from backend.config import settings
+from backend.db.models import IntentEnum, LLMMultiResponse
+from backend.utils import metrics, tracing
+from backend.utils.llm_prompt import RESPONSE_FORMAT
+
+
+def record_usage(
+    prompt_tokens: int | None, cached_tokens: int | None, completion_tokens: int | None
+):
+    """
+    Count prompt tokens served from the provider's prompt cache vs uncached,
+    and add the call's token counts to the current trace span (llm_call).
+    """
+    prompt, cached = prompt_tokens or 0, cached_tokens or 0
+    tracing.add_counts(
+        prompt_tokens=prompt,
+        cached_prompt_tokens=cached,
+        completion_tokens=completion_tokens or 0,
+    )
+    tokens = "LLM prompt tokens by provider prompt-cache outcome"
+    metrics.counter("llm_prompt_tokens_total", tokens, cache="hit").inc(cached)
+    metrics.counter("llm_prompt_tokens_total", tokens, cache="miss").inc(prompt - cached)
+    metrics.counter("llm_completion_tokens_total", "LLM completion tokens").inc(
+        completion_tokens or 0
+    )
+
+
+class LLMProvider:
+    """Base class: subclasses implement `_complete` and return the raw JSON text."""
+
+    name = "base"
+
+    def __init__(self, models: dict[str, str], gateway: LLMGateway | None = None):
+        self.models = models  # tier -> model name
+        self.gateway = gateway
+
+    async def _complete(self, messages: list, model: str, deadline: float | None) -> str:
+        raise NotImplementedError
+
+    async def parse(self, messages: list, tier: str, deadline: float | None = None) -> LLMMultiResponse:
+        """Call the tier's model and validate its JSON output against our Pydantic schema."""
+        started = time.perf_counter()
+        content = await self._complete(messages, self.models[tier], deadline)
+        with tracing.span("validation", tier=tier):
+            review = LLMMultiResponse.model_validate(json.loads(content))
+        # Only successful calls feed the latency used for hedging
+        metrics.histogram(
+            "llm_provider_seconds",
+            "Latency of successful provider calls",
+            provider=self.name,
+            tier=tier,
+        ).observe(time.perf_counter() - started)
+        return review
+
+    def stats(self) -> dict:
+        return self.gateway.stats() if self.gateway else {"provider": self.name}
+
+
+class InvalidModelOutput(ValueError):
+    """The provider rejected the model's output for not matching the response schema."""
+
+
+# Groq answers 400 when the model's output doesn't fit the JSON schema: bad
+# model output (the large tier may do better), not a bad request
+_GROQ_SCHEMA_ERROR_CODES = ("json_validate_failed", "tool_use_failed")
+
+
+def is_groq_schema_error(e: Exception) -> bool:
+    if not isinstance(e, BadRequestError):
+        return False
+    error = e.body.get("error") if isinstance(e.body, dict) else None
+    code = error.get("code") if isinstance(error, dict) else None
+    return code in _GROQ_SCHEMA_ERROR_CODES or "failed to generate json" in str(e).lower()
+
+
+class GroqProvider(LLMProvider):
+    name = "groq"
+
+    def __init__(self, api_key: str, models: dict[str, str], gateway: LLMGateway):
+        super().__init__(models, gateway)
+        self.client = AsyncGroq(
+            api_key=api_key,
+            max_retries=0,  # The gateway retries itself, within the deadline
+            timeout=gateway.timeout_seconds,
+        )
+
+    async def _complete(self, messages: list, model: str, deadline: float | None) -> str:
+        try:
+            response = await self.gateway.run(
+                lambda: self.client.chat.completions.create(
+                    model=model, messages=messages, response_format=RESPONSE_FORMAT
+                ),
+                deadline=deadline,
+                model=model,
+            )
+        except BadRequestError as e:
+            if is_groq_schema_error(e):
+                raise InvalidModelOutput(f"groq: {e}") from e
+            raise
+        usage = response.usage
+        if usage is not None:
+            details = getattr(usage, "prompt_tokens_details", None)
+            record_usage(
+                usage.prompt_tokens,
+                getattr(details, "cached_tokens", None) if details else None,
+                usage.completion_tokens,
+            )
+        return response.choices[0].message.content
+
+
+def is_transient_gemini_error(e: Exception) -> bool:
+    return (
+        isinstance(e, (genai_errors.ServerError, httpx.TransportError))
+        or (isinstance(e, genai_errors.ClientError) and e.code == 429)
+    )
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, api_key: str, models: dict[str, str], gateway: LLMGateway):
+        super().__init__(models, gateway)
+        self.client = genai.Client(api_key=api_key)
+
+    async def _complete(self, messages: list, model: str, deadline: float | None) -> str:
+        # System messages become the system instruction; the rest is the conversation
+        config = genai_types.GenerateContentConfig(
+            system_instruction="\n\n".join(
+                m["content"] for m in messages if m["role"] == "system"
+            ),
+            response_mime_type="application/json",
+            response_json_schema=RESPONSE_FORMAT["json_schema"]["schema"],
+        )
+        contents = [
+            genai_types.Content(
+                role="user" if m["role"] == "user" else "model",
+                parts=[genai_types.Part(text=m["content"])],
+            )
+            for m in messages
+            if m["role"] != "system"
+        ]
+        response = await self.gateway.run(
+            lambda: self.client.aio.models.generate_content(
+                model=model, contents=contents, config=config
+            ),
+            deadline=deadline,
+            model=model,
+        )
+        usage = response.usage_metadata
+        if usage is not None:
+            record_usage(
+                usage.prompt_token_count,
+                usage.cached_content_token_count,
+                usage.candidates_token_count,
+            )
+        return response.text
+
+
+class FakeProviderError(Exception):
+    """Injected failure from FakeProvider (treated as transient by its gateway)."""
+
+
+def _default_fake_response(messages: list, model: str) -> str:
+    return LLMMultiResponse(
+        actions=[
+            {
+                "intent": IntentEnum.GET_ATTENDANCE_STATS,
+                "method": "GET",
+                "params": {},
+            }
+        ],
+        confirmation_message="Fetch attendance stats for all subjects. Confirm?",
+    ).model_dump_json()
+
+
+class FakeProvider(LLMProvider):
+    """
+    Offline provider.  `responder(messages, model)` returns the JSON text
+    (default: a get_attendance_stats action); latency and failures are
+    simulated with `latency_seconds` + uniform `jitter_seconds` and `failure_rate`.
+    """
+
+    def __init__(
+        self,
+        responder: Callable[[list, str], str] | None = None,
+        latency_seconds: float = 0.0,
+        jitter_seconds: float = 0.0,
+        failure_rate: float = 0.0,
+        name: str = "fake",
+        gateway: LLMGateway | None = None,
+        seed: int | None = None,
+    ):
+        super().__init__({"small": f"{name}-small", "large": f"{name}-large"}, gateway)
+        self.name = name
+        self.responder = responder or _default_fake_response
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    async def _respond(self, messages: list, model: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency_seconds + self._rng.random() * self.jitter_seconds)
+        if self._rng.random() < self.failure_rate:
+            raise FakeProviderError(f"{self.name}: injected failure")
+        return self.responder(messages, model)
+
+    async def _complete(self, messages: list, model: str, deadline: float | None) -> str:
+        if self.gateway is None:
+            return await self._respond(messages, model)
+        return await self.gateway.run(
+            lambda: self._respond(messages, model), deadline=deadline, model=model
+        )
+
+
+class HedgedProvider:
+    """Primary provider, hedged by a secondary when the primary is slow or fails."""
+
+    def __init__(
+        self,
+        primary: LLMProvider,
+        secondary: LLMProvider,
+        percentile: float = 95.0,
+        min_delay_seconds: float = 0.5,
+        max_delay_seconds: float = 5.0,
+        default_delay_seconds: float = 2.0,
+        min_samples: int = 20,
+    ):
+        self.primary = primary
+        self.secondary = secondary
+        self.percentile = percentile
+        self.min_delay_seconds = min_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.default_delay_seconds = default_delay_seconds
+        self.min_samples = min_samples
+        self.name = f"{primary.name}+{secondary.name}"
+        self.models = primary.models
+
+    def hedge_delay(self, tier: str) -> float:
+        """How long to wait for the primary before also asking the secondary."""
+        latency = metrics.histogram(
+            "llm_provider_seconds", provider=self.primary.name, tier=tier
+        )
+        if latency.count < self.min_samples:
+            return self.default_delay_seconds
+        return min(
+            self.max_delay_seconds,
+            max(self.min_delay_seconds, latency.percentile(self.percentile)),
+        )
+
+    async def parse(self, messages: list, tier: str, deadline: float | None = None) -> LLMMultiResponse:
+        started = time.perf_counter()
+        roles = {
+            asyncio.create_task(self.primary.parse(messages, tier, deadline)): "primary"
+        }
+        errors = []
+        done, _ = await asyncio.wait(roles, timeout=self.hedge_delay(tier))
+        for task in done:
+            try:
+                return task.result()
+            except Exception as e:
+                errors.append(e)
+
+        metrics.counter(
+            "llm_hedges_total",
+            "Requests also sent to the secondary provider",
+            reason="failed" if errors else "slow",
+        ).inc()
+        remaining = deadline - (time.perf_counter() - started) if deadline else None
+        roles[
+            asyncio.create_task(
+                self.secondary.parse(
+                    messages, tier, max(0.1, remaining) if remaining else None
+                )
+            )
+        ] = "secondary"
+        pending = {task for task in roles if not task.done()}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    try:
+                        review = task.result()
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    metrics.counter(
+                        "llm_hedge_wins_total",
+                        "Hedged requests by the provider that answered first",
+                        winner=roles[task],
+                    ).inc()
+                    return review
+        finally:
+            for task in pending:
+                task.cancel()
+        # Both failed: prefer an error that isn't just an open breaker
+        for e in errors:
+            if not (isinstance(e, LLMUnavailable) and e.reason == "circuit_open"):
+                raise e
+        raise errors[0]
+
+    def stats(self) -> dict:
+        return {
+            "primary": self.primary.stats(),
+            "secondary": self.secondary.stats(),
+            "hedge": {
+                "delay_seconds": {
+                    tier: round(self.hedge_delay(tier), 3) for tier in self.models
+                },
+                "fired": {
+                    reason: int(metrics.counter("llm_hedges_total", reason=reason).value)
+                    for reason in ("slow", "failed")
+                },
+                "wins": {
+                    role: int(metrics.counter("llm_hedge_wins_total", winner=role).value)
+                    for role in ("primary", "secondary")
+                },
+            },
+        }
+
+
+def _gateway(name: str, is_transient: Callable[[Exception], bool]) -> LLMGateway:
+    return LLMGateway(
+        name,
+        timeout_seconds=settings.LLM_TIMEOUT_SECONDS,
+        max_concurrency=settings.LLM_MAX_CONCURRENCY,
+        max_retries=settings.LLM_MAX_RETRIES,
+        breaker=CircuitBreaker(
+            settings.LLM_BREAKER_FAILURE_THRESHOLD, settings.LLM_BREAKER_RESET_SECONDS
+        ),
+        is_transient=is_transient,
+    )
+
+
+def build_provider(name: str) -> LLMProvider:
+    """Construct a provider by its settings name ("groq", "gemini" or "fake")."""
+    if name == "groq":
+        return GroqProvider(
+            settings.GROQ_API_KEY,
+            {"small": settings.LLM_SMALL_MODEL, "large": settings.LLM_LARGE_MODEL},
+            _gateway("groq", is_transient_groq_error),
+        )
+    if name == "gemini":
+        if not settings.GEMINI_API_KEY:
+            raise ValueError("GEMINI_API_KEY is required for the gemini LLM provider")
+        return GeminiProvider(
+            settings.GEMINI_API_KEY,
+            {"small": settings.GEMINI_SMALL_MODEL, "large": settings.GEMINI_LARGE_MODEL},
+            _gateway("gemini", is_transient_gemini_error),
+        )
+    if name == "fake":
+        return FakeProvider(
+            gateway=_gateway("fake", lambda e: isinstance(e, FakeProviderError))
+        )
+    raise ValueError(f"Unknown LLM provider '{name}'")
+
+
+def build_intent_provider():
+    """The provider read_main uses: the primary, hedged by the secondary if one is set."""
+    primary = build_provider(settings.LLM_PRIMARY_PROVIDER)
+    if settings.LLM_SECONDARY_PROVIDER == "none":
+        return primary
+    return HedgedProvider(
+        primary,
+        build_provider(settings.LLM_SECONDARY_PROVIDER),
+        percentile=settings.LLM_HEDGE_PERCENTILE,
+        min_delay_seconds=settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+        max_delay_seconds=settings.LLM_HEDGE_MAX_DELAY_SECONDS,
+        default_delay_seconds=settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+        min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+    )
+
+
+# Shared provider used by read_main
+intent_provider = build_intent_provider()
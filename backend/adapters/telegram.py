@@ -4,20 +4,39 @@ Telegram adapter — webhook receiver and message handler.
 Exposes endpoints to:
 - Receive Telegram webhook updates  (POST /webhook)
 - Register / delete the webhook URL  (GET /set-webhook, /delete-webhook)
+- Inspect the update scheduler      (GET /queue-stats)
 
 Message flow:
-1. Telegram sends an update to /webhook.
-2. `process_message` checks for pending actions (yes/no confirmation).
-3. If no pending action, the message is sent to the LLM via `read_main`.
-4. A confirmation prompt is sent back to the user.
+1. Telegram sends an update to /webhook; it is queued on the sender's lane and
+   acked immediately (or processed inline when WEBHOOK_ASYNC_PROCESSING is off).
+2. The lane worker runs `process_update`:
+   - messages go to `process_message`, which checks for pending actions
+     (yes/no confirmation); otherwise the text is sent to the LLM via
+     `read_main` and a confirmation prompt is sent back to the user
+     (read-only requests are answered straight away).
+     `/today` instead replies with a day card (inline keyboard).
+   - button presses on a day card (`callback_query`) go to
+     `process_callback_query`, which marks the slot directly — no LLM —
+     and edits the card in place.
 """
 
+import logging
 from backend.db.database import get_session
-from backend.db.models import ChatID, User
+from backend.db.models import AttendanceStatus, ChatID, DayEnum, TimetableSlots, User
+from backend.utils.attendanceManagement import (
+    get_attendance_logs,
+    get_daily_timetable_user,
+    get_reminder_audience,
+    mark_attendance,
+)
+from backend.adapters.telegram_keyboards import (
+    parse_attendance_callback,
+    render_day_card,
+)
 
 from fastapi import APIRouter, Header, Request, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi_crons import Crons, get_cron_router
-from teleapi.httpx_transport import httpx_teleapi_factory
 from backend.config import settings
 from backend.utils.userManagement import read_user
 from backend.utils.flags import is_telegram_bot_down
@@ -29,11 +48,22 @@ from backend.utils.verify_secret_token import verify_secret_header
 from backend.utils.verify_secret_token import verify_api_secret
 from backend.app_instance import app
 from backend.app_instance import crons
+from backend.adapters.update_queue import ShardedUpdateScheduler
+from backend.utils.dedup import UpdateDeduplicator
+from backend.db.redis import get_redis_client
+from backend.adapters.telegram_client import outbox, telegram_client
+from backend.utils.background_loop import io_loop
+from backend.utils.broadcast import broadcast_engine
+from backend.utils.stats_reconciliation import reconcile_attendance_stats
+from backend.utils import tracing
+from backend.db.profiling import profile_queries
+from datetime import date
+
+logger = logging.getLogger(__name__)
 
 app.include_router(get_cron_router())
 
 router = APIRouter()
-bot = httpx_teleapi_factory(settings.TELEGRAM_BOT_KEY)  # Telegram bot API client
 
 
 def get_db_session():
@@ -57,6 +87,8 @@ HELP_TEXT = (
     '• "I attended DC lecture today"\n'
     '• "I bunked BDA lab on Monday"\n'
     '• "OS was cancelled yesterday"\n\n'
+    "⚡ QUICK MARKING\n"
+    "• /today — tap a button to mark each of today's classes\n\n"
     "📅 TIMETABLE\n"
     '• "Add DC lecture on Tue 11:00 to 12:00"\n'
     '• "Change DC on Tue to 10:00-11:00"\n\n'
@@ -66,10 +98,114 @@ HELP_TEXT = (
 )
 
 
-async def process_message(message: dict):
+def build_day_card(user_id: int, on_date: date, session: Session):
+    """Return (text, reply_markup) for the user's regular slots on a date, or None if there are none."""
+    try:
+        slots = get_daily_timetable_user(user_id, DayEnum(on_date.strftime("%a")), session)
+    except HTTPException:
+        return None
+    marked = {
+        log["slot"]["id"]: AttendanceStatus(log["attendance"]["status"])
+        for log in get_attendance_logs(user_id, on_date, session)
+    }
+    return render_day_card(
+        sorted(slots, key=lambda slot: slot.start_time), on_date, marked
+    )
+
+
+def process_update(update: dict):
+    """Dispatch one Telegram update to the message or button-press handler."""
+    # Root span: every stage below (and the replies the outbox sends later) joins this trace.
+    # The update is also one query-profiling scope, checked against the DB budget.
+    with tracing.trace(
+        "telegram_update", update_id=update.get("update_id")
+    ), profile_queries("telegram_update"):
+        if update.get("callback_query"):
+            process_callback_query(update["callback_query"])
+        elif update.get("message"):
+            process_message(update["message"])
+
+
+def process_callback_query(callback_query: dict):
+    """
+    Handle a Present / Absent / Cancelled button press on a day card.
+
+    Marks the slot with a single `mark_attendance` call (no LLM, no
+    confirmation turn), answers the callback so the button stops spinning,
+    and edits the original card in place to show the new status.
+    """
+    callback_id = callback_query["id"]
+    contact_id = str(callback_query["from"]["id"])
+    card_message = callback_query.get("message") or {}
+    parsed = parse_attendance_callback(callback_query.get("data"))
+    if not parsed:
+        outbox.call("answerCallbackQuery", callback_query_id=callback_id)
+        return
+    slot_id, status, on_date = parsed
+
+    session: Session = get_db_session()
+    try:
+        user = read_user(contact_id, session)
+        slot = session.get(TimetableSlots, slot_id)
+        if not slot or slot.user_id != user.id:
+            outbox.call(
+                "answerCallbackQuery",
+                callback_query_id=callback_id,
+                text="This class is no longer in your timetable.",
+            )
+            return
+        try:
+            mark_attendance(
+                user_id=user.id,
+                subject_code=slot.subject_code,
+                day=slot.day,
+                start_time=slot.start_time,
+                end_time=slot.end_time,
+                status=status,
+                classType=slot.class_type,
+                session=session,
+                date_of_slot=on_date,
+                slot_id=slot.id,
+            )
+        except HTTPException as e:
+            # e.g. "Attendance already marked for this class" — nothing to redraw
+            outbox.call(
+                "answerCallbackQuery", callback_query_id=callback_id, text=e.detail
+            )
+            return
+        outbox.call(
+            "answerCallbackQuery",
+            callback_query_id=callback_id,
+            text=f"{slot.subject_code} {slot.class_type.value} marked {status.value}",
+        )
+        card = build_day_card(user.id, on_date, session)
+        if card and card_message.get("message_id"):
+            text, reply_markup = card
+            outbox.call(
+                "editMessageText",
+                chat_id=card_message["chat"]["id"],
+                message_id=card_message["message_id"],
+                text=text,
+                reply_markup=reply_markup,
+            )
+    except HTTPException:
+        outbox.call(
+            "answerCallbackQuery",
+            callback_query_id=callback_id,
+            text="Sorry, I couldn't find you.",
+        )
+    finally:
+        session.close()
+
+
+def process_message(message: dict):
     """
     Handle a single incoming Telegram message.
 
+    Runs on a worker thread (never on the event loop) because the DB queries
+    and the LLM call below are blocking.  Replies go through the outbox and
+    never wait on Telegram.
+
     - If the user has a pending action, treats the message as a yes/no confirmation.
     - Otherwise, sends the text through the LLM pipeline (read_main) and
       stores the result as a new pending action awaiting confirmation.
@@ -82,53 +218,71 @@ async def process_message(message: dict):
     user_contact_id = message["from"]["id"]
     contact_id = str(user_contact_id)
 
-    session: Session = get_db_session()
-
     if is_telegram_bot_down():
-        bot.sendMessage(chat_id=chat_id, text="Sorry, bot is temporarily down.")
+        outbox.send_message(chat_id=chat_id, text="Sorry, bot is temporarily down.")
         return
 
     # Handle /start and /help commands
     if text.strip().lower() in ["/start", "/help"]:
-        bot.sendMessage(chat_id=chat_id, text=HELP_TEXT)
+        outbox.send_message(chat_id=chat_id, text=HELP_TEXT)
         return
 
+    session: Session = get_db_session()
     try:
-        user = read_user(str(user_contact_id), session)
-        print(f"Received message from user {user.name} ({user_contact_id}): {text}")
+        with tracing.span("user_lookup"):
+            user = read_user(str(user_contact_id), session)
+        logger.info("Received message", extra={"user_id": user.id})
         # check if contact_id, chat_id pair exists
-        chat_id_record = session.exec(
-            select(ChatID).where(
-                ChatID.contact_id == contact_id, ChatID.adapter == "telegram"
-            )
-        ).first()
-        if not chat_id_record:
-            # If no mapping exists, create one
-            new_chat_id = ChatID(
-                contact_id=contact_id, user_id=user.id, adapter="telegram"
-            )
-            session.add(new_chat_id)
-            session.commit()
+        with tracing.span("chat_id_upsert") as upsert:
+            chat_id_record = session.exec(
+                select(ChatID).where(
+                    ChatID.contact_id == contact_id, ChatID.adapter == "telegram"
+                )
+            ).first()
+            upsert.attributes["created"] = not chat_id_record
+            if not chat_id_record:
+                # If no mapping exists, create one
+                new_chat_id = ChatID(
+                    contact_id=contact_id, user_id=user.id, adapter="telegram"
+                )
+                session.add(new_chat_id)
+                session.commit()
+        # --- /today: one-tap marking card, no LLM involved ---
+        if text.strip().lower() == "/today":
+            card = build_day_card(user.id, date.today(), session)
+            if card:
+                card_text, reply_markup = card
+                outbox.send_message(
+                    chat_id=chat_id, text=card_text, reply_markup=reply_markup
+                )
+            else:
+                outbox.send_message(
+                    chat_id=chat_id, text="You have no classes in your timetable today."
+                )
+            return
         # --- Check for an existing pending action (confirmation flow) ---
-        get_pending = get_pending_action(str(user_contact_id), session)
+        with tracing.span("pending_lookup"):
+            get_pending = get_pending_action(str(user_contact_id), session)
         message = (
             None  # Initialize message variable for error handling in confirmation flow
         )
         if get_pending:
             if text.lower() in ["yes", "y", "yep", "confirm", "yez", "yeah", "correct"]:
+                # Read before the confirm commit expires the row
+                contact_id = get_pending.contact_id
+                intent_json = get_pending.intent_json
                 confirm_pending_action(get_pending, session)
-                print("Performing intent for pending action:", get_pending.intent_json)
                 try:
                     message = perform_intent(
-                        contact_id=get_pending.contact_id,
-                        review=get_pending.intent_json,
+                        contact_id=contact_id,
+                        review=intent_json,
                         session=session,
                     ).get("message", "Action performed successfully!")
-                    bot.sendMessage(chat_id=chat_id, text=message)
+                    outbox.send_message(chat_id=chat_id, text=message)
                 except Exception as e:
-                    print("Error performing intent for pending action:", e)
+                    logger.warning("Error performing intent for pending action: %s", e)
                     # Send an error message to the user, explaining the error if possible
-                    bot.sendMessage(
+                    outbox.send_message(
                         chat_id=chat_id,
                         text=(
                             message
@@ -138,7 +292,7 @@ async def process_message(message: dict):
                     )
             else:
                 cancel_pending_action(get_pending, session)
-                bot.sendMessage(chat_id=chat_id, text="Action cancelled.")
+                outbox.send_message(chat_id=chat_id, text="Action cancelled.")
             return
         # --- No pending action — run the message through the LLM pipeline ---
         try:
@@ -146,18 +300,21 @@ async def process_message(message: dict):
             review = response.get("review")
             contact_id = response.get("contact_id")
         except Exception as e:
-            print("There was an error:", e)
+            logger.exception("Error parsing message")
             response = {"error": str(e)}
-        # Send the confirmation prompt back to the user
+        # Send the confirmation prompt (or the answer, for read-only requests) back to the user
         response_text = response.get(
             "confirmation_message", "There was an error processing your request."
         )
-        print(f"Sending response to user {contact_id}: {response_text}")
-        bot.sendMessage(chat_id=chat_id, text=response_text)
-        # User's next message will be handled by the pending-action branch above
+        outbox.send_message(chat_id=chat_id, text=response_text)
+        # Unless it was answered right away, the user's next message will be
+        # handled by the pending-action branch above
     except Exception as e:
-        print("Error processing message:", e)
-        bot.sendMessage(chat_id=chat_id, text="Sorry, I couldn't find you.")
+        # An unknown user is expected; anything else gets a traceback
+        logger.warning(
+            "Error processing message: %s", e, exc_info=not isinstance(e, HTTPException)
+        )
+        outbox.send_message(chat_id=chat_id, text="Sorry, I couldn't find you.")
     finally:
         session.close()
 
@@ -173,34 +330,133 @@ def verify_telegram_secret(x_telegram_bot_api_secret_token: str = Header(None)):
 # import depends
 from fastapi import Depends
 
+def notify_dropped_update(update: dict):
+    """
+    Tell the sender that an update they sent was evicted from a full lane
+    ("drop_oldest" overflow).  It was already acknowledged, so Telegram
+    won't resend it; the user has to.
+    """
+    event = update.get("message") or update.get("callback_query") or {}
+    contact_id = event.get("from", {}).get("id")
+    chat = event.get("chat") or event.get("message", {}).get("chat") or {}
+    logger.warning(
+        "Dropped queued Telegram update",
+        extra={"update_id": update.get("update_id"), "contact_id": contact_id},
+    )
+    if chat.get("id") is None:
+        return
+    text = event.get("text")
+    outbox.send_message(
+        chat_id=chat["id"],
+        text=(
+            f'Sorry, I was too busy to handle your message "{text}". Please send it again.'
+            if text
+            else "Sorry, I was too busy to handle that. Please try again."
+        ),
+    )
+
+
+# Per-contact ordered lanes, drained off the event loop (see backend/adapters/update_queue.py)
+update_scheduler = ShardedUpdateScheduler(
+    handler=process_update,
+    lanes=settings.WEBHOOK_WORKERS,
+    lane_depth=settings.WEBHOOK_LANE_DEPTH,
+    overflow_policy=settings.WEBHOOK_OVERFLOW_POLICY,
+    overflow_wait_seconds=settings.WEBHOOK_OVERFLOW_WAIT_SECONDS,
+    on_drop=notify_dropped_update,
+)
+
+
+# Drops Telegram re-deliveries of an update_id we already accepted
+update_dedup = UpdateDeduplicator(
+    max_size=settings.UPDATE_DEDUP_MAX_SIZE,
+    ttl_seconds=settings.UPDATE_DEDUP_TTL_SECONDS,
+    redis_client=(
+        get_redis_client() if settings.UPDATE_DEDUP_BACKEND == "redis" else None
+    ),
+)
+
+
+@router.on_event("startup")
+async def start_update_scheduler():
+    """Spawn the lane workers when async processing is enabled."""
+    if settings.WEBHOOK_ASYNC_PROCESSING:
+        update_scheduler.start()
+
+
+@router.on_event("shutdown")
+async def stop_update_scheduler():
+    """Let the lanes and then the outbox finish what is queued before the process exits."""
+    await update_scheduler.stop(timeout=settings.WEBHOOK_DRAIN_TIMEOUT_SECONDS)
+    await outbox.drain(timeout=settings.WEBHOOK_DRAIN_TIMEOUT_SECONDS)
+
 
 @router.post("/webhook")
 async def telegram_webhook(
     request: Request,
     _=Depends(verify_telegram_secret),
 ):
-    """Receive updates directly from Telegram"""
+    """
+    Receive updates directly from Telegram.
+
+    In async mode the update is only queued here (on the sender's lane), so the
+    response goes out within milliseconds.  A rejected update returns 503 so
+    Telegram retries later.  Re-deliveries of an update_id that was already
+    accepted are acked without doing any work.
+    """
+    update_id = None
     try:
         data = await request.json()
-        print("Incoming Telegram webhook:", data)
 
-        message = data.get("message")
-        if message:
-            await process_message(message)
+        update_id = data.get("update_id")
+        if await update_dedup.is_duplicate(update_id):
+            logger.info("Duplicate Telegram update ignored", extra={"update_id": update_id})
+            return {"ok": True}
+
+        # Plain messages and inline-keyboard button presses are handled
+        event = data.get("message") or data.get("callback_query")
+        if event:
+            if settings.WEBHOOK_ASYNC_PROCESSING:
+                contact_id = str(event.get("from", {}).get("id", ""))
+                if not await update_scheduler.submit(data, key=contact_id):
+                    # Let Telegram's retry of this update through
+                    await update_dedup.forget(update_id)
+                    raise HTTPException(status_code=503, detail="Update queue is full")
+            else:
+                await run_in_threadpool(process_update, data)
 
         return {"ok": True}
 
+    except HTTPException:
+        raise
     except Exception as e:
-        print("Webhook error:", e)
+        logger.exception("Webhook error")
+        await update_dedup.forget(update_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/queue-stats")
+async def queue_stats(_=Depends(verify_api_secret)):
+    """Queue depth, counters, latency and per-lane utilization of the update scheduler"""
+    return {
+        **update_scheduler.stats(),
+        "dedup": update_dedup.stats(),
+        "outbox": outbox.stats(),
+    }
+
+
 @router.get("/set-webhook")
 async def set_webhook(_=Depends(verify_api_secret)):
     """Manually set the Telegram webhook (requires API key)"""
     webhook_url = f"{settings.BASE_URL}/adapters/telegram/webhook"
     try:
-        bot.setWebhook(url=webhook_url, secret_token=settings.WEBHOOK_SECRET_TOKEN)
+        await io_loop.run_async(
+            telegram_client.call(
+                "setWebhook",
+                url=webhook_url,
+                secret_token=settings.WEBHOOK_SECRET_TOKEN,
+            )
+        )
         return {"status": "Webhook set successfully", "url": webhook_url}
     except Exception as e:
         return {"status": "Failed", "error": str(e)}
@@ -210,7 +466,7 @@ async def set_webhook(_=Depends(verify_api_secret)):
 async def delete_webhook(_=Depends(verify_api_secret)):
     """Delete the Telegram webhook (requires API key)"""
     try:
-        bot.deleteWebhook()
+        await io_loop.run_async(telegram_client.call("deleteWebhook"))
         return {"status": "Webhook deleted"}
     except Exception as e:
         return {"status": "Failed", "error": str(e)}
@@ -218,23 +474,52 @@ async def delete_webhook(_=Depends(verify_api_secret)):
 
 @crons.cron("0 23 * * *", name="bot_message")
 def send_scheduled_message():
-    """Example cron job that sends a message every 1 minutes (for testing)"""
-    # get all chat IDs from the database where adapter is telegram and send a message to each
+    """
+    Nightly reminder (23:00) to mark today's attendance.
+
+    Only users who still have unmarked slots today are messaged, and the
+    message lists those slots with one-tap Present / Absent / Cancelled
+    buttons.  The audience comes from one set-based query
+    (`get_reminder_audience`).
+
+    Runs through the broadcast engine: concurrent, rate limited, failures isolated
+    per recipient.  Progress is keyed by today's date, so triggering the job again
+    the same day (e.g. after a crash) only messages users who were not reached.
+    """
+    today = date.today()
     session: Session = get_db_session()
-    chat_ids = session.exec(
-        select(ChatID, User)
-        .join(User, ChatID.user_id == User.id)
-        .where(ChatID.adapter == "telegram")
-    ).all()
-    print(chat_ids)
     try:
-        # Notify the user at 11:00pm every day to mark attendance for the day
-        for chat_id, user in chat_ids:
-            bot.sendMessage(
-                chat_id=chat_id.contact_id,
-                text=f"Hi {user.name}! Don't forget to mark your attendance for today if you haven't already.",
-            )
-        print("Scheduled message sent to all Telegram users.")
+        audience = get_reminder_audience(DayEnum(today.strftime("%a")), today, session)
+    finally:
+        session.close()
+    messages = []
+    for recipient in audience:
+        text, reply_markup = render_day_card(
+            recipient["slots"],
+            today,
+            header=f"Hi {recipient['name']}! You haven't marked these classes today — tap to mark:",
+        )
+        messages.append((recipient["contact_id"], text, {"reply_markup": reply_markup}))
+    return broadcast_engine.run(f"bot_message:{today.isoformat()}", messages)
 
-    except Exception as e:
-        print("Error sending scheduled message:", e)
+
+def reconcile_stats_job():
+    """
+    Scheduled repair of AttendanceStats: recount every user's counters from
+    attendance_logs and write back only the rows that drifted
+    (backend/utils/stats_reconciliation.py).
+    """
+    session: Session = get_db_session()
+    try:
+        return reconcile_attendance_stats(
+            session, lower_counts=settings.STATS_RECONCILE_LOWER_COUNTS
+        )
+    finally:
+        session.close()
+
+
+# Opt-in: only scheduled when STATS_RECONCILE_CRON is set
+if settings.STATS_RECONCILE_CRON:
+    crons.cron(settings.STATS_RECONCILE_CRON, name="stats_reconcile")(
+        reconcile_stats_job
+    )
@@ -0,0 +1,351 @@
+"""
+Async Telegram Bot API client and outbound send queue.
+
+`TelegramClient`
+    One shared `httpx.AsyncClient` (keep-alive connection pool) for every Bot
+    API call.  Sends are paced by a global limiter (Telegram allows ~30 msg/s
+    per bot) and a per-chat limiter (~1 msg/s per chat).  A 429 response is
+    retried after the server-given `retry_after`, and both limiters hold
+    every other send (to that chat, and globally) back for as long;
+    network errors and 5xx are retried with exponential backoff.
+
+`TelegramOutbox`
+    A queue in front of `TelegramClient.send_message`.  Handlers call
+    `outbox.send_message(...)` from any thread and return immediately; a few
+    sender tasks on the shared I/O loop deliver the replies.  Calls are
+    hashed by chat_id onto the senders, so one chat's replies go out one at
+    a time, in order, even across retries.  Each send is traced as a
+    `telegram_send` span in the trace of the update that queued it.
+
+Both live on `io_loop` (backend/utils/background_loop.py), so sync code on
+worker threads never blocks on an HTTPS round trip.
+"""
+
+import logging
+import asyncio
+import random
+import threading
+import time
+import zlib
+
+import httpx
+
+from backend.config import settings
+from backend.utils import metrics, tracing
+from backend.utils.background_loop import BackgroundLoop, io_loop
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramAPIError(Exception):
+    """The Bot API answered ok=false (after retries, if the error was retryable)."""
+
+    def __init__(self, method: str, error_code: int | None, description: str):
+        self.method = method
+        self.error_code = error_code
+        self.description = description
+        super().__init__(f"{method} failed ({error_code}): {description}")
+
+
+class RateLimiter:
+    """
+    Reservation-based pacing: each caller reserves the next free slot and sleeps
+    until it.  Reservations are handed out in call order, so messages to the same
+    chat keep their order.
+    """
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next: dict = {}  # key -> monotonic time of the next free slot
+        self._paused: dict = {}  # key -> monotonic time a 429 pause ends
+
+    async def acquire(self, key=None):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next.get(key, now))
+        self._next[key] = slot + self.interval
+        if len(self._next) > 10000:
+            # Forget chats whose reservations are already in the past
+            self._next = {k: v for k, v in self._next.items() if v > now}
+            self._paused = {k: v for k, v in self._paused.items() if v > now}
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        # A pause that started while we waited also holds back this reservation
+        paused = self._paused.get(key, 0.0) - time.monotonic()
+        if paused > 0:
+            await asyncio.sleep(paused)
+
+    def defer(self, seconds: float, key=None):
+        """Hold every send on `key` back for `seconds` (Telegram's 429 retry_after)."""
+        until = time.monotonic() + seconds
+        self._paused[key] = max(self._paused.get(key, 0.0), until)
+        self._next[key] = max(self._next.get(key, until), until)
+
+
+class TelegramClient:
+    """Async Bot API client on one keep-alive connection pool."""
+
+    def __init__(
+        self,
+        bot_token: str,
+        api_url: str = "https://api.telegram.org",
+        timeout: float = 15.0,
+        max_connections: int = 20,
+        global_rate: float = 30.0,
+        per_chat_rate: float = 1.0,
+        max_retries: int = 3,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.base_url = f"{api_url.rstrip('/')}/bot{bot_token}/"
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.transport = transport
+        self.global_limiter = RateLimiter(global_rate)
+        self.chat_limiter = RateLimiter(per_chat_rate)
+        self._http: httpx.AsyncClient | None = None
+
+    def _client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the loop that first uses it (io_loop)
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=self.transport,
+            )
+        return self._http
+
+    async def call(self, method: str, **params):
+        """Call a Bot API method and return its `result`, retrying 429/5xx/network errors."""
+        payload = {k: v for k, v in params.items() if v is not None}
+        attempt = 0
+        while True:
+            attempt += 1
+            started = time.perf_counter()
+            try:
+                resp = await self._client().post(method, json=payload)
+                data = resp.json()
+            except (httpx.TransportError, ValueError) as e:
+                metrics.counter(
+                    "telegram_api_errors_total",
+                    "Failed Bot API calls by method and kind",
+                    method=method,
+                    kind="network",
+                ).inc()
+                if attempt > self.max_retries:
+                    raise TelegramAPIError(method, None, str(e)) from e
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            finally:
+                metrics.histogram(
+                    "telegram_api_seconds", "Bot API round trip", method=method
+                ).observe(time.perf_counter() - started)
+
+            if data.get("ok"):
+                return data.get("result")
+
+            error_code = data.get("error_code", resp.status_code)
+            description = data.get("description", resp.text)
+            if error_code == 429:
+                metrics.counter("telegram_429_total", "Bot API 429 responses").inc()
+                retry_after = (data.get("parameters") or {}).get("retry_after", 1)
+                if attempt > self.max_retries:
+                    raise TelegramAPIError(method, error_code, description)
+                logger.warning(
+                    "Telegram 429, retrying",
+                    extra={"method": method, "retry_after": retry_after},
+                )
+                # Keep the other senders out of the same flood wait
+                self.global_limiter.defer(retry_after)
+                if payload.get("chat_id") is not None:
+                    self.chat_limiter.defer(retry_after, str(payload["chat_id"]))
+                await asyncio.sleep(retry_after)
+                continue
+            if error_code >= 500 and attempt <= self.max_retries:
+                metrics.counter(
+                    "telegram_api_errors_total", method=method, kind="server"
+                ).inc()
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            metrics.counter(
+                "telegram_api_errors_total", method=method, kind="client"
+            ).inc()
+            raise TelegramAPIError(method, error_code, description)
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(10.0, 0.5 * 2 ** (attempt - 1)) * (0.5 + random.random() / 2)
+
+    async def send(self, method: str, **params):
+        """
+        Call a chat-bound method (sendMessage, editMessageText, ...) paced by the
+        global and per-chat rate limits.  Methods without a chat_id
+        (e.g. answerCallbackQuery) are not counted against the message limits.
+        """
+        if params.get("chat_id") is not None:
+            await self.global_limiter.acquire()
+            await self.chat_limiter.acquire(str(params["chat_id"]))
+        started = time.perf_counter()
+        try:
+            return await self.call(method, **params)
+        finally:
+            metrics.histogram(
+                "telegram_send_seconds",
+                "Outbound Bot API latency including retries",
+                method=method,
+            ).observe(time.perf_counter() - started)
+
+    async def send_message(self, chat_id, text: str, **params):
+        """sendMessage, paced by the global and per-chat rate limits."""
+        return await self.send("sendMessage", chat_id=chat_id, text=text, **params)
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+class TelegramOutbox:
+    """Fire-and-forget reply queue drained by sender tasks on the I/O loop."""
+
+    def __init__(
+        self,
+        client: TelegramClient,
+        io: BackgroundLoop,
+        concurrency: int = 8,
+        max_size: int = 10000,
+    ):
+        self.client = client
+        self.io = io
+        self.concurrency = max(1, concurrency)
+        self.max_size = max_size
+        self._queues: list[asyncio.Queue] = []  # One per sender
+        self._tasks: list[asyncio.Task] = []
+        self._lock = threading.Lock()
+        self._wait = metrics.histogram(
+            "telegram_outbox_wait_seconds", "Time a reply waited in the outbox"
+        )
+        metrics.gauge(
+            "telegram_outbox_depth", "Replies waiting to be sent", fn=self.depth
+        )
+
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def _start(self):
+        self._queues = [
+            asyncio.Queue(maxsize=max(1, self.max_size // self.concurrency))
+            for _ in range(self.concurrency)
+        ]
+        self._tasks = [asyncio.create_task(self._sender(q)) for q in self._queues]
+
+    def _ensure_started(self):
+        if not self._queues:
+            with self._lock:
+                if not self._queues:
+                    self.io.run(self._start())
+
+    def call(self, method: str, **params):
+        """Queue any chat-bound Bot API call. Safe to call from any thread; never blocks."""
+        self._ensure_started()
+        self.io.call_soon(
+            self._enqueue,
+            (time.perf_counter(), method, params, tracing.current_span()),
+        )
+
+    def send_message(self, chat_id, text: str, **params):
+        """Queue a reply. Safe to call from any thread; never blocks on the network."""
+        self.call("sendMessage", chat_id=chat_id, text=text, **params)
+
+    def _enqueue(self, item):
+        params = item[2]
+        # Same chat → same sender (calls without a chat go by callback id)
+        key = params.get("chat_id", params.get("callback_query_id"))
+        queue = self._queues[zlib.crc32(str(key).encode()) % len(self._queues)]
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            metrics.counter("telegram_outbox_total", outcome="dropped").inc()
+            logger.warning(
+                "Telegram outbox full, dropping %s to chat %s", item[1], item[2].get("chat_id")
+            )
+
+    async def _sender(self, queue: asyncio.Queue):
+        while True:
+            queued_at, method, params, parent = await queue.get()
+            waited = time.perf_counter() - queued_at
+            self._wait.observe(waited)
+            try:
+                with tracing.span(
+                    "telegram_send",
+                    parent=parent,
+                    method=method,
+                    outbox_wait_ms=round(1000 * waited, 3),
+                ):
+                    await self.client.send(method, **params)
+                metrics.counter("telegram_outbox_total", outcome="sent").inc()
+            except Exception as e:
+                metrics.counter("telegram_outbox_total", outcome="failed").inc()
+                logger.warning(
+                    "Failed Telegram %s to chat %s: %s", method, params.get("chat_id"), e
+                )
+            finally:
+                queue.task_done()
+
+    async def _drain(self, timeout: float):
+        if not self._queues:
+            await self.client.aclose()
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Telegram outbox drain timed out; %s replies dropped", self.depth())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queues = []
+        await self.client.aclose()
+
+    async def drain(self, timeout: float):
+        """Send what is queued (up to `timeout`), then stop the senders and close the pool."""
+        await self.io.run_async(self._drain(timeout))
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth(),
+            **{
+                outcome: int(
+                    metrics.counter("telegram_outbox_total", outcome=outcome).value
+                )
+                for outcome in ("sent", "failed", "dropped")
+            },
+            "retries_429": int(metrics.counter("telegram_429_total").value),
+            "wait_seconds": self._wait.snapshot(),
+            "send_seconds": metrics.histogram(
+                "telegram_send_seconds", method="sendMessage"
+            ).snapshot(),
+        }
+
+
+# Shared instances used by the adapter, crons and scripts
+telegram_client = TelegramClient(
+    settings.TELEGRAM_BOT_KEY,
+    api_url=settings.TELEGRAM_API_URL,
+    timeout=settings.TELEGRAM_TIMEOUT_SECONDS,
+    max_connections=settings.TELEGRAM_MAX_CONNECTIONS,
+    global_rate=settings.TELEGRAM_GLOBAL_RATE,
+    per_chat_rate=settings.TELEGRAM_PER_CHAT_RATE,
+    max_retries=settings.TELEGRAM_MAX_RETRIES,
+)
+outbox = TelegramOutbox(
+    telegram_client, io_loop, concurrency=settings.TELEGRAM_SEND_CONCURRENCY
+)
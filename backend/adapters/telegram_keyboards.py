@@ -0,0 +1,81 @@
+"""
+Inline keyboards for one-tap attendance marking.
+
+A "day card" is a message listing a user's slots for one date, with a row of
+Present / Absent / Cancelled buttons per slot.  Pressing a button sends a
+`callback_query` whose data encodes the slot, the status and the date:
+
+    att:<slot_id>:<p|a|c>:<YYYYMMDD>
+
+(well under Telegram's 64-byte callback_data limit).  The webhook marks the
+slot directly — no LLM call, no confirmation turn — and edits the card in
+place to show the new status.
+"""
+
+from datetime import date, datetime
+
+from backend.db.models import AttendanceStatus
+
+CALLBACK_PREFIX = "att"
+
+_STATUS_CODES = {
+    AttendanceStatus.PRESENT: "p",
+    AttendanceStatus.ABSENT: "a",
+    AttendanceStatus.CANCELLED: "c",
+}
+_CODE_STATUSES = {code: status for status, code in _STATUS_CODES.items()}
+_STATUS_ICONS = {
+    AttendanceStatus.PRESENT: "✅",
+    AttendanceStatus.ABSENT: "❌",
+    AttendanceStatus.CANCELLED: "🚫",
+}
+
+
+def attendance_callback_data(slot_id: int, status: AttendanceStatus, on_date: date) -> str:
+    """Encode a button press as callback_data."""
+    return f"{CALLBACK_PREFIX}:{slot_id}:{_STATUS_CODES[status]}:{on_date.strftime('%Y%m%d')}"
+
+
+def parse_attendance_callback(data: str):
+    """Decode callback_data into (slot_id, status, date), or None if it isn't ours / is malformed."""
+    parts = (data or "").split(":")
+    if len(parts) != 4 or parts[0] != CALLBACK_PREFIX or parts[2] not in _CODE_STATUSES:
+        return None
+    try:
+        return int(parts[1]), _CODE_STATUSES[parts[2]], datetime.strptime(parts[3], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def render_day_card(slots, on_date: date, marked: dict | None = None, header: str | None = None):
+    """
+    Build (text, reply_markup) for a day card.
+
+    `slots` are TimetableSlots rows; `marked` maps slot_id -> AttendanceStatus
+    for slots that already have a log on `on_date`.
+    """
+    marked = marked or {}
+    lines = [header or f"Your classes on {on_date.strftime('%A, %d %B %Y')}:"]
+    keyboard = []
+    for idx, slot in enumerate(slots, start=1):
+        status = marked.get(slot.id)
+        status_note = f" — {_STATUS_ICONS[status]} {status.value}" if status else ""
+        lines.append(
+            f"{idx}. {slot.subject_code} {slot.class_type.value} "
+            f"{slot.start_time.strftime('%H:%M')}-{slot.end_time.strftime('%H:%M')}{status_note}"
+        )
+        keyboard.append(
+            [
+                {
+                    "text": f"{idx}. {_STATUS_ICONS[s]}",
+                    "callback_data": attendance_callback_data(slot.id, s, on_date),
+                }
+                for s in (
+                    AttendanceStatus.PRESENT,
+                    AttendanceStatus.ABSENT,
+                    AttendanceStatus.CANCELLED,
+                )
+            ]
+        )
+    lines.append("\n✅ present · ❌ absent · 🚫 cancelled")
+    return "\n".join(lines), {"inline_keyboard": keyboard}
@@ -0,0 +1,249 @@
+"""
+Per-contact ordered scheduler for incoming Telegram updates.
+
+The webhook only validates the secret and hands the update to the scheduler,
+so Telegram gets its `{"ok": true}` within milliseconds.  Updates are hashed
+by contact_id onto N serial lanes:
+
+- every lane has its own bounded queue and exactly one worker, so messages
+  from the same user are handled strictly in order (a "yes" always reaches
+  `get_pending_action` after the message that created the pending action);
+- different lanes run concurrently on a dedicated thread pool, so one user's
+  slow LLM call never delays users on other lanes.
+
+When a lane is full the overflow policy decides what happens:
+- "reject"      — refuse the new update (the webhook answers 503, Telegram retries)
+- "drop_oldest" — evict the oldest queued update of that lane and accept the new
+                  one.  The evicted update was already acknowledged, so it is
+                  lost for good; `on_drop(item)` is called to tell its sender
+- "wait"        — wait up to WEBHOOK_OVERFLOW_WAIT_SECONDS for space, then reject
+
+Metrics (see backend.utils.metrics), labelled by lane:
+- update_lane_depth / update_lane_utilization
+- update_queue_wait_seconds, update_processing_seconds
+- update_queue_total{outcome=queued|rejected|dropped|processed|failed}
+"""
+
+import logging
+import asyncio
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from backend.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("reject", "drop_oldest", "wait")
+
+
+class _Lane:
+    """One serial queue + worker. Tracks busy time for utilization reporting."""
+
+    def __init__(self, index: int, depth: int):
+        self.index = index
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=depth)
+        self.task: asyncio.Task | None = None
+        self.started_at = time.perf_counter()
+        self.busy_seconds = 0.0
+        self.busy_since: float | None = None
+        self.processed = 0
+        self.max_depth_seen = 0
+
+    def utilization(self) -> float:
+        """Fraction of wall time since start that this lane spent handling updates."""
+        now = time.perf_counter()
+        busy = self.busy_seconds + (now - self.busy_since if self.busy_since else 0.0)
+        elapsed = now - self.started_at
+        return busy / elapsed if elapsed > 0 else 0.0
+
+
+class ShardedUpdateScheduler:
+    """Hashes items onto N ordered lanes and runs `handler(item)` off the event loop."""
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Any],
+        lanes: int,
+        lane_depth: int,
+        overflow_policy: str = "reject",
+        overflow_wait_seconds: float = 2.0,
+        on_drop: Callable[[Any], Any] | None = None,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Invalid overflow policy '{overflow_policy}'. Must be one of: {', '.join(OVERFLOW_POLICIES)}"
+            )
+        self.handler = handler
+        self.lane_count = max(1, lanes)
+        self.lane_depth = lane_depth
+        self.overflow_policy = overflow_policy
+        self.overflow_wait_seconds = overflow_wait_seconds
+        self.on_drop = on_drop  # Called with each item evicted by "drop_oldest"
+        self._lanes: list[_Lane] = []
+        self._executor: ThreadPoolExecutor | None = None
+        self._accepting = False
+
+        self._wait = metrics.histogram(
+            "update_queue_wait_seconds", "Time an update spent queued"
+        )
+        self._processing = metrics.histogram(
+            "update_processing_seconds", "Time spent handling one update"
+        )
+        metrics.gauge(
+            "update_queue_depth", "Updates waiting across all lanes", fn=self.depth
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    def depth(self) -> int:
+        return sum(lane.queue.qsize() for lane in self._lanes)
+
+    def lane_for(self, key: str) -> int:
+        """Stable lane index for a key (same contact_id → same lane, across restarts)."""
+        return zlib.crc32(str(key).encode()) % self.lane_count
+
+    def start(self):
+        """Create the lanes and spawn one worker per lane. Must run inside the event loop."""
+        if self._accepting:
+            return
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.lane_count, thread_name_prefix="update-lane"
+        )
+        self._lanes = [_Lane(i, self.lane_depth) for i in range(self.lane_count)]
+        for lane in self._lanes:
+            lane.task = asyncio.create_task(self._worker(lane))
+            metrics.gauge(
+                "update_lane_depth",
+                "Updates waiting in a lane",
+                fn=lane.queue.qsize,
+                lane=str(lane.index),
+            )
+            metrics.gauge(
+                "update_lane_utilization",
+                "Fraction of time a lane spent processing",
+                fn=lane.utilization,
+                lane=str(lane.index),
+            )
+        self._accepting = True
+        logger.info(
+            "Update scheduler started",
+            extra={
+                "lanes": self.lane_count,
+                "lane_depth": self.lane_depth,
+                "overflow_policy": self.overflow_policy,
+            },
+        )
+
+    async def submit(self, item: Any, key: str) -> bool:
+        """Enqueue an item on the lane for `key`. Returns False if it was rejected."""
+        if not self._accepting:
+            return False
+        lane = self._lanes[self.lane_for(key)]
+        entry = (time.perf_counter(), item)
+        try:
+            lane.queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            if self.overflow_policy == "drop_oldest":
+                try:
+                    _, dropped = lane.queue.get_nowait()
+                    lane.queue.task_done()
+                    metrics.counter("update_queue_total", outcome="dropped").inc()
+                    logger.warning("Update lane %s full: dropped its oldest update", lane.index)
+                    if self.on_drop is not None:
+                        try:
+                            self.on_drop(dropped)
+                        except Exception:
+                            logger.exception("on_drop failed")
+                except asyncio.QueueEmpty:
+                    pass
+                lane.queue.put_nowait(entry)
+            elif self.overflow_policy == "wait":
+                try:
+                    await asyncio.wait_for(
+                        lane.queue.put(entry), timeout=self.overflow_wait_seconds
+                    )
+                except asyncio.TimeoutError:
+                    metrics.counter("update_queue_total", outcome="rejected").inc()
+                    return False
+            else:
+                metrics.counter("update_queue_total", outcome="rejected").inc()
+                return False
+        lane.max_depth_seen = max(lane.max_depth_seen, lane.queue.qsize())
+        metrics.counter("update_queue_total", outcome="queued").inc()
+        return True
+
+    async def _worker(self, lane: _Lane):
+        loop = asyncio.get_running_loop()
+        while True:
+            enqueued_at, item = await lane.queue.get()
+            started = time.perf_counter()
+            self._wait.observe(started - enqueued_at)
+            lane.busy_since = started
+            try:
+                await loop.run_in_executor(self._executor, self.handler, item)
+                metrics.counter("update_queue_total", outcome="processed").inc()
+            except Exception:
+                metrics.counter("update_queue_total", outcome="failed").inc()
+                logger.exception("Update lane %s failed to process update", lane.index)
+            finally:
+                finished = time.perf_counter()
+                self._processing.observe(finished - started)
+                lane.busy_seconds += finished - started
+                lane.busy_since = None
+                lane.processed += 1
+                lane.queue.task_done()
+
+    async def stop(self, timeout: float):
+        """Stop accepting updates, drain what is queued (up to `timeout`), then stop workers."""
+        if not self._accepting:
+            return
+        self._accepting = False
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(lane.queue.join() for lane in self._lanes)),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Update queue drain timed out after %ss; %s updates dropped",
+                timeout,
+                self.depth(),
+            )
+        for lane in self._lanes:
+            lane.task.cancel()
+        await asyncio.gather(*(lane.task for lane in self._lanes), return_exceptions=True)
+        # Handlers already running in the pool finish off the event loop
+        await asyncio.to_thread(self._executor.shutdown, wait=True)
+        logger.info("Update scheduler stopped")
+
+    def stats(self) -> dict:
+        """Queue depth, counters, latency percentiles and per-lane utilization."""
+        return {
+            "running": self._accepting,
+            "lanes": self.lane_count,
+            "lane_depth": self.lane_depth,
+            "overflow_policy": self.overflow_policy,
+            "depth": self.depth(),
+            **{
+                outcome: int(
+                    metrics.counter("update_queue_total", outcome=outcome).value
+                )
+                for outcome in ("queued", "rejected", "dropped", "processed", "failed")
+            },
+            "wait_seconds": self._wait.snapshot(),
+            "processing_seconds": self._processing.snapshot(),
+            "per_lane": [
+                {
+                    "lane": lane.index,
+                    "depth": lane.queue.qsize(),
+                    "max_depth_seen": lane.max_depth_seen,
+                    "processed": lane.processed,
+                    "utilization": round(lane.utilization(), 4),
+                }
+                for lane in self._lanes
+            ],
+        }
@@ -0,0 +1,148 @@
+"""
+Shared helpers for the benchmark scripts in this package.
+
+Benchmarks run against a throwaway database (an SQLite file in the temp
+directory by default, or any SQLAlchemy URL passed with --db, e.g. a local
+Postgres).  `configure_env` must be called before anything from `backend` is
+imported, because the settings singleton and the engine are created at
+import time.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+DEFAULT_DB = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'attendomatic-bench.db')}"
+
+
+def bench_args(description: str, **extra) -> argparse.Namespace:
+    """Parse the common --db flag plus any extra `--name default` int flags."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLAlchemy database URL")
+    for name, default in extra.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+    return parser.parse_args()
+
+
+def configure_env(db_url: str):
+    """Point the app at the benchmark database and fill required settings with dummies."""
+    os.environ["PG_DB"] = db_url
+    for key in (
+        "GROQ_API_KEY",
+        "TELEGRAM_BOT_KEY",
+        "WEBHOOK_SECRET_TOKEN",
+        "BASE_URL",
+        "API_SECRET_KEY",
+    ):
+        os.environ.setdefault(key, "bench")
+
+
+def reset_database():
+    """Drop and recreate every table on the configured engine (with SQL echo off)."""
+    from sqlmodel import SQLModel
+    from backend.db.database import engine, create_db_and_tables
+
+    engine.echo = False
+    SQLModel.metadata.drop_all(engine)
+    create_db_and_tables()
+
+
+SUBJECTS = ["DC", "BDA", "OS", "CN", "DBMS", "ML", "SE", "TOC"]
+SEED_DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+
+
+def seed_users(n_users: int, slots_per_day: int = 5) -> list[int]:
+    """
+    Bulk-insert subjects, `n_users` users with Telegram chat ids and a weekly
+    timetable of `slots_per_day` hourly slots (from 09:00) on Mon-Sat.
+    Returns the new user ids.
+    """
+    from datetime import time as dtime
+    from sqlalchemy import insert, select
+    from sqlmodel import Session
+    from backend.db.database import engine
+    from backend.db.models import (
+        ChatID,
+        ClassType,
+        DayEnum,
+        Subjects,
+        TimetableSlots,
+        User,
+    )
+
+    with Session(engine) as session:
+        session.execute(
+            insert(Subjects),
+            [{"subject_code": c, "subject_name": f"Subject {c}"} for c in SUBJECTS],
+        )
+        session.execute(
+            insert(User),
+            [
+                {
+                    "uid": f"U{i:06d}",
+                    "name": f"Student {i}",
+                    "div": "A",
+                    "year": 3,
+                    "batch": "B1",
+                    "branch": "COMPS",
+                    "contact_id": str(10_000_000 + i),
+                    "adminStatus": False,
+                }
+                for i in range(n_users)
+            ],
+        )
+        users = session.execute(select(User.id, User.contact_id)).all()
+        session.execute(
+            insert(ChatID),
+            [{"contact_id": c, "user_id": uid, "adapter": "telegram"} for uid, c in users],
+        )
+        slots = []
+        for uid, _ in users:
+            for day in SEED_DAYS:
+                for k in range(slots_per_day):
+                    slots.append(
+                        {
+                            "user_id": uid,
+                            "day": DayEnum(day),
+                            "start_time": dtime(9 + k),
+                            "end_time": dtime(10 + k),
+                            "class_type": (
+                                ClassType.LAB
+                                if k == slots_per_day - 1
+                                else ClassType.LECTURE
+                            ),
+                            "subject_code": SUBJECTS[(uid + k) % len(SUBJECTS)],
+                            "is_temporary": False,
+                        }
+                    )
+        for start in range(0, len(slots), 20_000):
+            session.execute(insert(TimetableSlots), slots[start : start + 20_000])
+        session.commit()
+        return [uid for uid, _ in users]
+
+
+@contextmanager
+def count_queries(engine):
+    """Count statements executed on `engine` inside the block: `with count_queries(e) as n: ...; n[0]`."""
+    from sqlalchemy import event
+
+    counter = [0]
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        counter[0] += 1
+
+    event.listen(engine, "before_cursor_execute", _before)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", _before)
+
+
+@contextmanager
+def timed(label: str, results: dict):
+    """Store the wall time of the block (seconds) under results[label]."""
+    started = time.perf_counter()
+    yield
+    results[label] = time.perf_counter() - started
@@ -0,0 +1,201 @@
+"""
+Benchmark: mark_attendance — select/delete/insert write path vs one upsert.
+
+Seeds N users (default 200) with a Mon-Sat timetable and marks every class of
+the last few weeks (one session per mark, like one request each), then marks
+a share of them again with a different status (corrections).  Runs the same
+marks through:
+
+- legacy: the previous write path (slot, duplicate, previous-log and stats
+  SELECTs, DELETE + INSERT, commit, two refreshes), kept below for comparison
+- upsert: `mark_attendance` (slot SELECT, INSERT ... ON CONFLICT ... RETURNING,
+  one counter UPDATE, one commit)
+
+and reports marks/sec and statements per mark for each.  Pass a Postgres URL
+with --db to measure real round trips; SQLite numbers mostly show the
+statement count.
+
+    python -m backend.benchmarks.mark_attendance [--db URL] [--users 200] [--weeks 2]
+"""
+
+from backend.benchmarks.common import bench_args, configure_env
+
+args = bench_args(__doc__.splitlines()[1], users=200, weeks=2, corrections_pct=25)
+configure_env(args.db)
+
+import os
+import random
+from datetime import date, timedelta
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi import HTTPException
+from sqlmodel import Session, select
+
+from backend.benchmarks.common import count_queries, reset_database, seed_users, timed
+from backend.db.database import engine
+from backend.db.models import (
+    AttendanceLog,
+    AttendanceStats,
+    AttendanceStatus,
+    TimetableSlots,
+)
+from backend.utils.attendanceManagement import mark_attendance
+
+
+def legacy_mark_attendance(
+    user_id, subject_code, day, start_time, end_time, status, classType, session, date_of_slot
+):
+    """The write path before the upsert (temporary-slot branch omitted: never taken here)."""
+    slot = session.exec(
+        select(TimetableSlots).where(
+            TimetableSlots.user_id == user_id,
+            TimetableSlots.subject_code == subject_code,
+            TimetableSlots.day == day,
+            TimetableSlots.start_time == start_time,
+            TimetableSlots.end_time == end_time,
+            TimetableSlots.class_type == classType,
+        )
+    ).first()
+    existing_log = session.exec(
+        select(AttendanceLog).where(
+            AttendanceLog.slot_id == slot.id,
+            AttendanceLog.date_log == date_of_slot,
+            AttendanceLog.status == status,
+        )
+    ).first()
+    if existing_log:
+        raise HTTPException(status_code=400, detail="Attendance already marked for this class")
+    previously_marked_log = session.exec(
+        select(AttendanceLog).where(
+            AttendanceLog.slot_id == slot.id,
+            AttendanceLog.date_log == date_of_slot,
+        )
+    ).first()
+    attendance = session.exec(
+        select(AttendanceStats).where(
+            AttendanceStats.user_id == user_id,
+            AttendanceStats.subject_code == subject_code,
+            AttendanceStats.classType == classType,
+        )
+    ).first()
+    if not attendance:
+        attendance = AttendanceStats(
+            user_id=user_id,
+            subject_code=subject_code,
+            total_classes=0,
+            attended_classes=0,
+            classType=classType,
+        )
+        session.add(attendance)
+    if previously_marked_log:
+        if previously_marked_log.status == AttendanceStatus.PRESENT:
+            attendance.attended_classes -= 1
+            attendance.total_classes -= 1
+        elif previously_marked_log.status == AttendanceStatus.ABSENT:
+            attendance.total_classes -= 1
+        session.delete(previously_marked_log)
+        # The unit of work inserts before it deletes, which the unique
+        # (slot_id, date_log) index now rejects; flushing here only reorders
+        # the same DELETE
+        session.flush()
+    attendance_log = AttendanceLog(slot_id=slot.id, status=status, date_log=date_of_slot)
+    if status == AttendanceStatus.PRESENT:
+        attendance.total_classes += 1
+        attendance.attended_classes += 1
+    elif status == AttendanceStatus.ABSENT:
+        attendance.total_classes += 1
+    session.add_all([attendance, attendance_log])
+    session.commit()
+    session.refresh(attendance_log)
+    session.refresh(attendance)
+    return attendance_log
+
+
+def build_workload() -> tuple[list, list]:
+    """(first marks, corrections): mark kwargs for every seeded class in the last `weeks` weeks."""
+    rng = random.Random(42)
+    with Session(engine) as session:
+        slots = session.exec(select(TimetableSlots)).all()
+    by_day = {}
+    for slot in slots:
+        by_day.setdefault(slot.day.value, []).append(slot)
+    marks = []
+    for offset in range(1, 7 * args.weeks + 1):
+        on = date.today() - timedelta(days=offset)
+        for slot in by_day.get(on.strftime("%a"), []):
+            marks.append(
+                {
+                    "user_id": slot.user_id,
+                    "subject_code": slot.subject_code,
+                    "day": slot.day,
+                    "start_time": slot.start_time,
+                    "end_time": slot.end_time,
+                    "status": rng.choice([AttendanceStatus.PRESENT, AttendanceStatus.ABSENT]),
+                    "classType": slot.class_type,
+                    "date_of_slot": on,
+                }
+            )
+    rng.shuffle(marks)
+    corrections = [
+        {
+            **mark,
+            "status": (
+                AttendanceStatus.ABSENT
+                if mark["status"] == AttendanceStatus.PRESENT
+                else AttendanceStatus.CANCELLED
+            ),
+        }
+        for mark in rng.sample(marks, len(marks) * args.corrections_pct // 100)
+    ]
+    return marks, corrections
+
+
+def run(label: str, mark, workload: list, results: dict) -> int:
+    with count_queries(engine) as queries, timed(label, results):
+        for kwargs in workload:
+            with Session(engine) as session:
+                mark(session=session, **kwargs)
+    return queries[0]
+
+
+def stats_snapshot() -> list:
+    with Session(engine) as session:
+        return session.exec(
+            select(
+                AttendanceStats.user_id,
+                AttendanceStats.subject_code,
+                AttendanceStats.classType,
+                AttendanceStats.total_classes,
+                AttendanceStats.attended_classes,
+            ).order_by(
+                AttendanceStats.user_id, AttendanceStats.subject_code, AttendanceStats.classType
+            )
+        ).all()
+
+
+def main():
+    results, queries, snapshots = {}, {}, {}
+    for label, mark in (("legacy", legacy_mark_attendance), ("upsert", mark_attendance)):
+        reset_database()
+        seed_users(args.users)
+        marks, corrections = build_workload()
+        queries[f"{label}_first"] = run(f"{label}_first", mark, marks, results)
+        queries[f"{label}_fix"] = run(f"{label}_fix", mark, corrections, results)
+        snapshots[label] = stats_snapshot()
+    assert snapshots["legacy"] == snapshots["upsert"], "write paths disagree on the counters"
+
+    print(f"db: {engine.url.get_backend_name()}, marks: {len(marks)}, corrections: {len(corrections)}")
+    for phase, n in (("first", len(marks)), ("fix", len(corrections))):
+        for label in ("legacy", "upsert"):
+            key = f"{label}_{phase}"
+            print(
+                f"{label:<7} {phase:<6} {n / results[key]:>9.1f} marks/s  "
+                f"{queries[key] / n:>5.2f} statements/mark"
+            )
+        speedup = results[f"legacy_{phase}"] / results[f"upsert_{phase}"]
+        print(f"        {phase:<6} {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark: nightly reminder audience — per-user lookups vs one set-based query.
+
+Seeds N users (default 10k) with a Mon-Sat timetable, marks today's classes
+for a share of them (fully / partially / not at all), then compares:
+
+- per-user: for each Telegram user, `get_daily_timetable_user` + `get_attendance_logs`
+  (what computing the audience looked like without a dedicated query).  This is
+  N+1 and slow, so it runs on a sample of users and is extrapolated to N.
+- set-based: one `get_reminder_audience` query
+
+and reports wall time, DB round trips and how many reminders would be sent
+compared with messaging every user.
+
+    python -m backend.benchmarks.reminder_audience [--db URL] [--users 10000]
+"""
+
+from backend.benchmarks.common import bench_args, configure_env
+
+args = bench_args(
+    __doc__.splitlines()[1], users=10000, slots_per_day=5, per_user_sample=500
+)
+configure_env(args.db)
+
+import random
+from datetime import date, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlmodel import select
+from sqlmodel import Session
+
+from backend.benchmarks.common import count_queries, reset_database, seed_users, timed
+from backend.db.database import engine
+from backend.db.models import AttendanceLog, AttendanceStatus, ChatID, DayEnum, TimetableSlots
+from backend.utils.attendanceManagement import (
+    get_attendance_logs,
+    get_daily_timetable_user,
+    get_reminder_audience,
+)
+
+
+def main():
+    reset_database()
+    seed_users(args.users, args.slots_per_day)
+
+    # Pick a weekday that has classes so the benchmark is meaningful any day of the week
+    today = date.today()
+    while today.strftime("%a") == "Sun":
+        today -= timedelta(days=1)
+    day = DayEnum(today.strftime("%a"))
+
+    rng = random.Random(42)
+    with Session(engine) as session:
+        slots = session.execute(
+            select(TimetableSlots.id, TimetableSlots.user_id).where(TimetableSlots.day == day)
+        ).all()
+        by_user = {}
+        for slot_id, user_id in slots:
+            by_user.setdefault(user_id, []).append(slot_id)
+        logs = []
+        for user_id, slot_ids in by_user.items():
+            r = rng.random()
+            marked = slot_ids if r < 0.6 else slot_ids[: len(slot_ids) // 2] if r < 0.8 else []
+            logs += [
+                {"slot_id": s, "status": AttendanceStatus.PRESENT, "date_log": today}
+                for s in marked
+            ]
+        for start in range(0, len(logs), 20_000):
+            session.execute(insert(AttendanceLog), logs[start : start + 20_000])
+        session.commit()
+
+    results = {}
+    with Session(engine) as session:
+        with count_queries(engine) as per_user_queries, timed("per_user", results):
+            per_user_audience = 0
+            users = session.exec(
+                select(ChatID.user_id)
+                .where(ChatID.adapter == "telegram")
+                .order_by(ChatID.user_id)
+                .limit(args.per_user_sample)
+            ).all()
+            for user_id in users:
+                try:
+                    timetable = get_daily_timetable_user(user_id, day, session)
+                except HTTPException:
+                    continue
+                marked = {log["slot"]["id"] for log in get_attendance_logs(user_id, today, session)}
+                if any(slot.id not in marked for slot in timetable):
+                    per_user_audience += 1
+
+    with Session(engine) as session:
+        with count_queries(engine) as set_queries, timed("set_based", results):
+            audience = get_reminder_audience(day, today, session)
+
+    sampled = set(users)
+    assert sum(1 for a in audience if a["user_id"] in sampled) == per_user_audience
+    scale = args.users / len(users)
+    print(f"users: {args.users}, day: {day.value} {today}")
+    print(f"reminders sent before (everyone): {args.users}")
+    print(
+        f"reminders sent now (unmarked only): {len(audience)} "
+        f"({100 * (1 - len(audience) / args.users):.1f}% fewer sends)"
+    )
+    print(
+        f"per-user lookups: {results['per_user'] * scale:.3f}s, {int(per_user_queries[0] * scale)} queries "
+        f"(extrapolated from {len(users)} users)"
+    )
+    print(f"set-based query:  {results['set_based']:.3f}s, {set_queries[0]} queries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Load test: replay a corpus of Telegram updates through the full pipeline.
+
+Starts the FastAPI app in-process against a throwaway database (SQLite by
+default, or any URL passed with --db, e.g. a local Postgres), seeds users
+with timetables and swaps the external services for in-process fakes:
+
+- the LLM provider -> FakeProvider (--llm-latency/--llm-jitter/--llm-error-rate)
+- the Telegram Bot API -> FakeTelegramAPI (--tg-latency/--tg-error-rate/--tg-429-rate)
+
+It then posts the corpus to /adapters/telegram/webhook at --rate updates per
+second and waits for every reply.  The report has the throughput, the webhook
+ack and end-to-end (update posted -> reply sent) latency, p50/p95/p99 per
+pipeline stage and error rates.
+
+The corpus is JSONL in the same shape as requests.jsonl — one JSON object per
+line — with either a full Telegram update under "update", or a message:
+
+    {"request_id": "r1", "body": "attended DC lecture today", "contact_id": "10000003"}
+
+(`text` may be used instead of `body`; without a contact_id the lines are
+spread across the seeded users.)  Without --corpus a synthetic corpus of
+--updates messages is generated; --write-corpus saves it for reuse.
+
+    python -m backend.benchmarks.replay_load [--db URL] [--corpus FILE] [--rate 20] [--updates 500]
+"""
+
+import argparse
+
+from backend.benchmarks.common import DEFAULT_DB, configure_env
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+parser.add_argument("--db", default=DEFAULT_DB, help="SQLAlchemy database URL")
+parser.add_argument("--corpus", help="JSONL corpus to replay (default: synthetic)")
+parser.add_argument("--write-corpus", help="Save the synthetic corpus to this file")
+parser.add_argument("--updates", type=int, default=500, help="Synthetic corpus size")
+parser.add_argument("--users", type=int, default=50)
+parser.add_argument("--rate", type=float, default=20.0, help="Updates posted per second")
+parser.add_argument("--senders", type=int, default=8, help="Concurrent webhook posters")
+parser.add_argument("--llm-latency", type=float, default=0.8)
+parser.add_argument("--llm-jitter", type=float, default=0.6)
+parser.add_argument("--llm-error-rate", type=float, default=0.0)
+parser.add_argument("--tg-latency", type=float, default=0.05)
+parser.add_argument("--tg-error-rate", type=float, default=0.0)
+parser.add_argument("--tg-429-rate", type=float, default=0.0)
+parser.add_argument("--drain-timeout", type=float, default=60.0)
+parser.add_argument("--no-llm-cache", action="store_true", help="Disable the LLM response cache")
+parser.add_argument("--verbose", action="store_true", help="Keep the app's INFO logs")
+args = parser.parse_args()
+configure_env(args.db)
+
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+if args.no_llm_cache:
+    os.environ["LLM_CACHE_BACKEND"] = "off"
+if not args.verbose:
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi.testclient import TestClient
+
+from backend.adapters.fake_telegram import FakeTelegramAPI
+from backend.adapters.llm_gateway import LLM_UNAVAILABLE_MESSAGE
+from backend.adapters.llm_providers import FakeProvider, FakeProviderError, _gateway
+from backend.adapters.telegram_client import telegram_client
+from backend.benchmarks.common import SUBJECTS, reset_database, seed_users
+from backend.config import settings
+from backend.utils import metrics
+
+# Histograms reported as pipeline stages, in pipeline order
+STAGES = [
+    "pipeline_stage_seconds",
+    "update_queue_wait_seconds",
+    "update_processing_seconds",
+    "intent_parse_seconds",
+    "llm_tier_seconds",
+    "llm_request_seconds",
+    "telegram_outbox_wait_seconds",
+    "telegram_send_seconds",
+    "telegram_api_seconds",
+]
+ERROR_REPLIES = {
+    LLM_UNAVAILABLE_MESSAGE: "llm_unavailable",
+    "There was an error processing your request.": "pipeline_error",
+    "Sorry, I couldn't find you.": "pipeline_error",
+}
+
+
+def synthetic_corpus(n: int, contact_ids: list[str]) -> list[dict]:
+    """A mix of fast-path phrasings, LLM-bound requests, confirmations and commands."""
+    rng = random.Random(11)
+    templates = [
+        (30, "attended {s} lecture today"),
+        (10, "bunked {s} lab yesterday"),
+        (10, "show timetable for {d}"),
+        (10, "attendance stats for {s}"),
+        (15, "I went to {s} and then skipped the {t} lab"),
+        (10, "what did I attend on {d}?"),
+        (10, "yes"),
+        (3, "/today"),
+        (2, "/help"),
+    ]
+    weights = [w for w, _ in templates]
+    corpus = []
+    for i in range(n):
+        template = rng.choices([t for _, t in templates], weights)[0]
+        corpus.append(
+            {
+                "request_id": f"r{i + 1}",
+                "contact_id": rng.choice(contact_ids),
+                "body": template.format(
+                    s=rng.choice(SUBJECTS),
+                    t=rng.choice(SUBJECTS),
+                    d=rng.choice(["mon", "tue", "wed", "thu", "fri"]),
+                ),
+            }
+        )
+    return corpus
+
+
+def load_corpus(path: str) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def to_update(entry: dict, update_id: int, contact_ids: list[str]) -> dict:
+    if "update" in entry:
+        return entry["update"]
+    contact_id = int(entry.get("contact_id") or contact_ids[update_id % len(contact_ids)])
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "from": {"id": contact_id, "is_bot": False, "first_name": "Load"},
+            "chat": {"id": contact_id, "type": "private"},
+            "date": int(time.time()),
+            "text": entry.get("body") or entry.get("text", ""),
+        },
+    }
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, round(q / 100 * (len(values) - 1)))]
+    return {"count": len(values), "p50": pick(50), "p95": pick(95), "p99": pick(99)}
+
+
+def fmt(stats: dict) -> str:
+    if not stats.get("count"):
+        return "     n=0"
+    return (
+        f"n={stats['count']:<6} p50={1000 * stats['p50']:8.1f}ms "
+        f"p95={1000 * stats['p95']:8.1f}ms p99={1000 * stats['p99']:8.1f}ms"
+    )
+
+
+def main():
+    reset_database()
+    user_ids = seed_users(args.users)
+    contact_ids = [str(10_000_000 + i) for i in range(len(user_ids))]
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.updates, contact_ids)
+    if args.write_corpus:
+        with open(args.write_corpus, "w") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in corpus)
+    updates = [to_update(entry, i + 1, contact_ids) for i, entry in enumerate(corpus)]
+
+    # Post time of each update still waiting for a reply, per chat (replies come back in order)
+    waiting: dict[str, deque] = defaultdict(deque)
+    e2e, ack, errors = [], [], defaultdict(int)
+    lock = threading.Lock()
+    last_reply = [0.0]
+
+    def on_send(method: str, payload: dict):
+        if method != "sendMessage":
+            return
+        now = time.perf_counter()
+        with lock:
+            queue = waiting.get(str(payload.get("chat_id")))
+            if queue:
+                e2e.append(now - queue.popleft())
+            last_reply[0] = now
+            kind = ERROR_REPLIES.get(payload.get("text"))
+            if kind:
+                errors[kind] += 1
+
+    fake_telegram = FakeTelegramAPI(
+        latency_seconds=args.tg_latency,
+        jitter_seconds=args.tg_latency,
+        error_rate=args.tg_error_rate,
+        rate_limit_rate=args.tg_429_rate,
+        on_send=on_send,
+        seed=5,
+    )
+    telegram_client.transport = fake_telegram.transport
+
+    import backend.main as app_module
+    from backend.routers import index
+
+    index.model_router.provider = FakeProvider(
+        latency_seconds=args.llm_latency,
+        jitter_seconds=args.llm_jitter,
+        failure_rate=args.llm_error_rate,
+        gateway=_gateway("fake", lambda e: isinstance(e, FakeProviderError)),
+        seed=3,
+    )
+
+    headers = {"X-Telegram-Bot-Api-Secret-Token": settings.WEBHOOK_SECRET_TOKEN}
+    with TestClient(app_module.app) as client:
+
+        def post(update: dict):
+            chat = str(update["message"]["chat"]["id"]) if "message" in update else None
+            started = time.perf_counter()
+            if chat:
+                with lock:
+                    waiting[chat].append(started)
+            response = client.post("/adapters/telegram/webhook", json=update, headers=headers)
+            ack.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                with lock:
+                    errors[f"webhook_{response.status_code}"] += 1
+                    if chat and waiting[chat]:
+                        waiting[chat].pop()
+
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.senders) as senders:
+            for i, update in enumerate(updates):
+                # Open-loop pacing: send on schedule regardless of how fast earlier ones finished
+                delay = began + i / args.rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                senders.submit(post, update)
+        posted = time.perf_counter()
+
+        deadline = posted + args.drain_timeout
+        while time.perf_counter() < deadline:
+            with lock:
+                if not any(waiting.values()):
+                    break
+            time.sleep(0.05)
+    with lock:
+        missing = sum(len(q) for q in waiting.values())
+    finished = last_reply[0] or time.perf_counter()
+
+    stage_stats = defaultdict(dict)
+    for kind, name, labels, metric in metrics.collect():
+        if kind == "histogram" and name in STAGES and metric.count:
+            label = ",".join(f"{k}={v}" for k, v in labels.items())
+            stage_stats[name][label] = metric
+    total = len(updates)
+    print(f"updates: {total} at {args.rate}/s target, users: {args.users}, db: {args.db}")
+    print(f"posting took {posted - began:.1f}s ({total / (posted - began):.1f}/s achieved)")
+    print(f"replies: {len(e2e)} in {finished - began:.1f}s -> throughput {len(e2e) / (finished - began):.1f} replies/s")
+    print(f"{'webhook ack':<60} {fmt(percentiles(ack))}")
+    print(f"{'end to end (post -> reply sent)':<60} {fmt(percentiles(e2e))}")
+    for name in STAGES:
+        for label, metric in sorted(stage_stats.get(name, {}).items()):
+            snap = metric.snapshot()
+            title = f"{name}{{{label}}}" if label else name
+            print(f"{title:<60} {fmt(snap)}")
+    print("errors:")
+    errors["no_reply"] = missing
+    for _, name, labels, metric in metrics.collect():
+        if name in ("telegram_api_errors_total", "telegram_429_total") or (
+            name in ("llm_requests_total", "telegram_outbox_total")
+            and labels.get("outcome") not in ("ok", "sent")
+        ):
+            errors[f"{name}{labels or ''}"] += int(metric.value)
+    for kind, n in sorted(errors.items()):
+        if n:
+            print(f"  {kind:<60} {n:>6}  ({100 * n / total:.2f}% of updates)")
+    if not any(errors.values()):
+        print("  none")
+    print("fake telegram calls:", fake_telegram.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark: slot handles in the LLM context — prompt size and slot lookups.
+
+Seeds N users with a Mon-Sat timetable and compares:
+
+- prompt size: the weekly timetable context as it was rendered before
+  ("Mon: 09:00:00-10:00:00 DC (lecture)") and with slot handles
+  ("#12 Mon 09:00-10:00 DC (lecture)"), in characters and approximate
+  tokens, next to the static system prompt + schema prefix
+- lookups: `resolve_slot` by composite match without the
+  (user_id, day, start_time) index, with it, and by handle (primary key)
+- resolution when the LLM gets a time slightly wrong (start 5 minutes off):
+  composite match, handle with the wrong time (rejected as a mix-up, falls
+  back to the composite match) and handle without times
+
+    python -m backend.benchmarks.slot_handles [--db URL] [--users 5000] [--lookups 5000]
+"""
+
+from backend.benchmarks.common import bench_args, configure_env
+
+args = bench_args(__doc__.splitlines()[1], users=5000, slots_per_day=5, lookups=5000)
+configure_env(args.db)
+
+import json
+import os
+import random
+import re
+from datetime import datetime, timedelta
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from sqlalchemy import Index
+from sqlmodel import Session, select
+
+from backend.benchmarks.common import count_queries, reset_database, seed_users, timed
+from backend.db.database import engine
+from backend.db.models import TimetableSlots
+from backend.utils.attendanceManagement import resolve_slot
+from backend.utils.llm_prompt import RESPONSE_FORMAT, SYSTEM_PROMPT
+from backend.utils.timetable_context import load_weekly_context
+
+
+def approx_tokens(text: str) -> int:
+    """Words and punctuation marks: a rough, tokenizer-free proxy for BPE tokens."""
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def old_context(context) -> str:
+    """The weekly context as rendered before slot handles."""
+    return "\n".join(
+        f"{slot.day.value}: {slot.start_time}-{slot.end_time} "
+        f"{slot.subject_code} ({slot.class_type.value})"
+        for slot in context.slots
+    )
+
+
+def lookups(label: str, sample: list, results: dict, queries: dict, **overrides) -> int:
+    """Resolve every sampled slot; returns how many were found."""
+    found = 0
+    with Session(engine) as session:
+        with count_queries(engine) as n, timed(label, results):
+            for slot in sample:
+                kwargs = {
+                    "subject_code": slot.subject_code,
+                    "day": slot.day,
+                    "start_time": slot.start_time,
+                    "end_time": slot.end_time,
+                    "class_type": slot.class_type,
+                    "slot_id": None,
+                }
+                kwargs.update({k: v(slot) for k, v in overrides.items()})
+                found += resolve_slot(session, slot.user_id, **kwargs) is not None
+    queries[label] = n[0]
+    return found
+
+
+def main():
+    reset_database()
+    user_ids = seed_users(args.users, args.slots_per_day)
+    rng = random.Random(3)
+
+    with Session(engine) as session:
+        contexts = [load_weekly_context(uid, session) for uid in rng.sample(user_ids, 200)]
+        slots = session.exec(select(TimetableSlots)).all()
+    before = [old_context(c) for c in contexts]
+    after = [c.text for c in contexts]
+    prefix = SYSTEM_PROMPT + json.dumps(RESPONSE_FORMAT)
+    avg = lambda texts, f: sum(map(f, texts)) / len(texts)
+    print(f"db: {engine.url.get_backend_name()}, users: {args.users}, slots: {len(slots)}")
+    print(f"static prefix (system prompt + schema): {len(prefix)} chars, ~{approx_tokens(prefix)} tokens")
+    for label, texts in (("before", before), ("after", after)):
+        print(
+            f"timetable context {label:<6}: {avg(texts, len):>6.0f} chars, "
+            f"~{avg(texts, approx_tokens):>4.0f} tokens per user"
+        )
+
+    sample = rng.sample(slots, min(args.lookups, len(slots)))
+    results, queries = {}, {}
+    index = Index(
+        "ix_timetable_slots_user_id_day_start_time",
+        TimetableSlots.user_id,
+        TimetableSlots.day,
+        TimetableSlots.start_time,
+    )
+    index.drop(engine, checkfirst=True)
+    lookups("composite_no_index", sample, results, queries)
+    index.create(engine, checkfirst=True)
+    lookups("composite_indexed", sample, results, queries)
+    lookups("handle", sample, results, queries, slot_id=lambda s: s.id)
+    for label in ("composite_no_index", "composite_indexed", "handle"):
+        per_lookup = 1e6 * results[label] / len(sample)
+        print(
+            f"{label:<19} {per_lookup:>8.1f} us/lookup  "
+            f"{queries[label] / len(sample):.2f} queries/lookup"
+        )
+
+    # The LLM read the start time 5 minutes off
+    late = lambda s: (datetime.combine(datetime.min, s.start_time) + timedelta(minutes=5)).time()
+    composite = lookups("off_composite", sample, results, queries, start_time=late)
+    handle = lookups("off_handle", sample, results, queries, start_time=late, slot_id=lambda s: s.id)
+    bare = lookups(
+        "handle_no_times",
+        sample,
+        results,
+        queries,
+        slot_id=lambda s: s.id,
+        start_time=lambda s: None,
+        end_time=lambda s: None,
+    )
+    print(
+        f"start time 5 min off: composite found {composite}/{len(sample)}, "
+        f"handle + wrong time found {handle}/{len(sample)}; "
+        f"handle without times found {bare}/{len(sample)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
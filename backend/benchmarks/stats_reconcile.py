@@ -0,0 +1,149 @@
+"""
+Benchmark: AttendanceStats rebuild and drift reconciliation at semester scale.
+
+Seeds N users (default 10k) with a Mon-Sat timetable and a semester of
+attendance logs (default 18 weeks, every class marked), then times
+`reconcile_attendance_stats`:
+
+- rebuild: empty attendance_stats, so every counter row is inserted
+- repair: after corrupting a sample of rows (wrong counts, deleted rows,
+  counts on rows with no logs), with `lower_counts` so overcounts and
+  orphans are fixed too
+- clean: a second pass that must find no drift
+
+and reports wall time, statements and drift counts for each.
+
+    python -m backend.benchmarks.stats_reconcile [--db URL] [--users 10000] [--weeks 18]
+"""
+
+from backend.benchmarks.common import bench_args, configure_env
+
+args = bench_args(__doc__.splitlines()[1], users=10000, weeks=18, slots_per_day=5, drift=1000)
+configure_env(args.db)
+
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from sqlalchemy import delete, insert, update
+from sqlmodel import Session, select
+
+from backend.benchmarks.common import count_queries, reset_database, seed_users, timed
+from backend.db.database import engine
+from backend.db.models import (
+    AttendanceLog,
+    AttendanceStats,
+    AttendanceStatus,
+    ClassType,
+    TimetableSlots,
+)
+from backend.utils.stats_reconciliation import reconcile_attendance_stats
+
+STATUSES = [AttendanceStatus.PRESENT] * 16 + [AttendanceStatus.ABSENT] * 3 + [
+    AttendanceStatus.CANCELLED
+]
+
+
+def seed_logs(rng: random.Random) -> int:
+    """Mark every class of the last `weeks` weeks; returns the number of logs."""
+    days = [date.today() - timedelta(days=d) for d in range(1, 7 * args.weeks + 1)]
+    by_weekday = {}
+    for on in days:
+        by_weekday.setdefault(on.strftime("%a"), []).append(on)
+    total = 0
+    with Session(engine) as session:
+        slots = session.execute(select(TimetableSlots.id, TimetableSlots.day)).all()
+        batch = []
+        for slot_id, day in slots:
+            for on in by_weekday.get(day.value, []):
+                batch.append({"slot_id": slot_id, "status": rng.choice(STATUSES), "date_log": on})
+            if len(batch) >= 20_000:
+                session.execute(insert(AttendanceLog), batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            session.execute(insert(AttendanceLog), batch)
+            total += len(batch)
+        session.commit()
+    return total
+
+
+def inject_drift(rng: random.Random) -> int:
+    """Corrupt `drift` stats rows: a third miscounted, a third deleted, a third orphaned."""
+    with Session(engine) as session:
+        rows = session.exec(select(AttendanceStats)).all()
+        sample = rng.sample(rows, min(args.drift, len(rows)))
+        third = len(sample) // 3
+        miscounted, deleted, orphaned = sample[:third], sample[third : 2 * third], sample[2 * third :]
+        session.execute(
+            update(AttendanceStats)
+            .where(AttendanceStats.id.in_([row.id for row in miscounted]))
+            .values(total_classes=AttendanceStats.total_classes + 1)
+        )
+        session.execute(
+            delete(AttendanceStats).where(AttendanceStats.id.in_([row.id for row in deleted]))
+        )
+        # No seeded class is a tutorial, so no logs back these rows
+        session.execute(
+            insert(AttendanceStats),
+            [
+                {
+                    "user_id": row.user_id,
+                    "subject_code": row.subject_code,
+                    "classType": ClassType.TUTORIAL,
+                    "total_classes": 3,
+                    "attended_classes": 1,
+                }
+                for row in orphaned
+            ],
+        )
+        session.commit()
+    return len(sample)
+
+
+def run(label: str, results: dict, queries: dict, dry_run: bool = False) -> dict:
+    with Session(engine) as session:
+        with count_queries(engine) as n, timed(label, results):
+            report = reconcile_attendance_stats(
+                session, dry_run=dry_run, lower_counts=True
+            )
+    queries[label] = n[0]
+    return report
+
+
+def main():
+    rng = random.Random(42)
+    reset_database()
+    seed_users(args.users, args.slots_per_day)
+    logs = seed_logs(rng)
+    print(f"db: {engine.url.get_backend_name()}, users: {args.users}, logs: {logs}")
+
+    results, queries = {}, {}
+    reports = {"rebuild": run("rebuild", results, queries)}
+    corrupted = inject_drift(rng)
+    reports["dry_run"] = run("dry_run", results, queries, dry_run=True)
+    reports["repair"] = run("repair", results, queries)
+    reports["clean"] = run("clean", results, queries)
+
+    for label, report in reports.items():
+        print(
+            f"{label:<8} {results[label]:>7.2f}s  {queries[label]:>3} statements  "
+            f"checked={report['rows_checked']} drifted={report['drifted']} "
+            f"missing={report['missing']} orphaned={report['orphaned']} "
+            f"held={report['held']} "
+            f"updated={report['updated']} inserted={report['inserted']}"
+        )
+    repair = reports["repair"]
+    found = repair["drifted"] + repair["missing"] + repair["orphaned"]
+    ok = found == corrupted and not any(
+        reports["clean"][k] for k in ("drifted", "missing", "orphaned")
+    )
+    print(f"corrupted {corrupted} rows, repair found {found}: {'ok' if ok else 'MISMATCH'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
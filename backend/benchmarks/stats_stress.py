@@ -0,0 +1,168 @@
+"""
+Stress check: concurrent mark_attendance keeps AttendanceStats exact.
+
+Seeds a few users and hammers `mark_attendance` from many threads (one
+session each, like parallel webhook workers) with random statuses for a
+small set of classes and dates, so the same log is marked, re-marked and
+corrected concurrently.  Each user also gets an extra class that is not in
+their timetable, so concurrent marks race to create its temporary slot.
+Then recounts every user's counters from attendance_logs
+(`recount_attendance_stats`), compares them with attendance_stats and exits
+non-zero on any difference, duplicate stats row or duplicate temporary slot:
+
+    python -m backend.benchmarks.stats_stress [--db URL] [--threads 16] [--marks 4000]
+
+Use a Postgres URL to exercise real row locking; SQLite serialises writers,
+so there it mostly checks the counting logic.
+"""
+
+from backend.benchmarks.common import bench_args, configure_env
+
+args = bench_args(__doc__.splitlines()[1], users=3, threads=16, marks=4000, dates=3)
+configure_env(args.db)
+
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date, time as dtime, timedelta
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi import HTTPException
+from sqlmodel import Session, select
+
+from backend.benchmarks.common import reset_database, seed_users
+from backend.db.database import engine
+from backend.db.models import (
+    AttendanceStats,
+    AttendanceStatus,
+    ClassType,
+    DayEnum,
+    TimetableSlots,
+)
+from backend.utils.attendanceManagement import mark_attendance
+from backend.utils.stats_reconciliation import recount_attendance_stats
+
+
+def targets() -> list[dict]:
+    """Every seeded class on each of the last `dates` class days, as mark kwargs."""
+    days, on = [], date.today()
+    while len(days) < args.dates:
+        on -= timedelta(days=1)
+        if on.strftime("%a") != "Sun":
+            days.append(on)
+    with Session(engine) as session:
+        slots = session.exec(select(TimetableSlots)).all()
+    work = [
+        {
+            "user_id": slot.user_id,
+            "subject_code": slot.subject_code,
+            "day": slot.day,
+            "start_time": slot.start_time,
+            "end_time": slot.end_time,
+            "classType": slot.class_type,
+            "date_of_slot": on,
+        }
+        for on in days
+        for slot in slots
+        if slot.day.value == on.strftime("%a")
+    ]
+    # An evening extra class, outside every seeded timetable
+    extra = [
+        {
+            "user_id": user_id,
+            "subject_code": "DC",
+            "day": DayEnum(days[0].strftime("%a")),
+            "start_time": dtime(18),
+            "end_time": dtime(19),
+            "classType": ClassType.TUTORIAL,
+            "date_of_slot": days[0],
+        }
+        for user_id in {slot.user_id for slot in slots}
+    ]
+    # Weighted so the temporary-slot race is hit early and often
+    return work + extra * max(1, len(work) // (4 * len(extra)))
+
+
+def hammer(worker: int, work: list[dict], outcomes: Counter, lock: threading.Lock):
+    rng = random.Random(worker)
+    local = Counter()
+    for _ in range(args.marks // args.threads):
+        kwargs = rng.choice(work)
+        status = rng.choice(list(AttendanceStatus))
+        try:
+            with Session(engine) as session:
+                mark_attendance(session=session, status=status, **kwargs)
+            local["marked"] += 1
+        except HTTPException:
+            local["already_marked"] += 1
+        except Exception as e:  # e.g. SQLite "database is locked"
+            local[type(e).__name__] += 1
+    with lock:
+        outcomes.update(local)
+
+
+def main():
+    reset_database()
+    seed_users(args.users)
+    work = targets()
+
+    outcomes, lock = Counter(), threading.Lock()
+    threads = [
+        threading.Thread(target=hammer, args=(i, work, outcomes, lock))
+        for i in range(args.threads)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with Session(engine) as session:
+        rows = session.exec(select(AttendanceStats)).all()
+    keys = Counter((r.user_id, r.subject_code, r.classType) for r in rows)
+    duplicates = [key for key, n in keys.items() if n > 1]
+    stored = {
+        (r.user_id, r.subject_code, r.classType): (r.total_classes, r.attended_classes)
+        for r in rows
+        if r.total_classes or r.attended_classes
+    }
+    with Session(engine) as session:
+        expected = {
+            key: counts
+            for key, counts in recount_attendance_stats(session).items()
+            if any(counts)
+        }
+    wrong = {
+        key: (stored.get(key), expected.get(key))
+        for key in stored.keys() | expected.keys()
+        if stored.get(key) != expected.get(key)
+    }
+
+    print(
+        f"db: {engine.url.get_backend_name()}, threads: {args.threads}, "
+        f"classes x dates: {len(work)}, {elapsed:.2f}s"
+    )
+    print("outcomes: " + ", ".join(f"{k}={v}" for k, v in sorted(outcomes.items())))
+    with Session(engine) as session:
+        temporary = session.exec(
+            select(TimetableSlots).where(TimetableSlots.is_temporary == True)
+        ).all()
+    temp_keys = Counter(
+        (t.user_id, t.subject_code, t.day, t.start_time, t.end_time, t.class_type)
+        for t in temporary
+    )
+    temp_duplicates = [key for key, n in temp_keys.items() if n > 1]
+    print(f"stats rows: {len(rows)}, duplicate keys: {len(duplicates)}, mismatches: {len(wrong)}")
+    print(f"temporary slots: {len(temporary)}, duplicates: {len(temp_duplicates)}")
+    for key, (got, want) in sorted(wrong.items(), key=str)[:20]:
+        print(f"  {key}: stored {got}, recount {want}")
+    sys.exit(1 if wrong or duplicates or temp_duplicates else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: weekly timetable context for the LLM prompt.
+
+Seeds N users with a Mon-Sat timetable and builds the prompt's weekly
+timetable context for a sample of messages, comparing:
+
+- per-day: seven `get_daily_timetable_user` calls (Sunday raising and
+  catching HTTPException), which is how `read_main` used to build it
+- single query: `load_weekly_context`, one grouped SELECT
+- cached: `get_weekly_context` on a warm cache (a user's follow-up messages)
+
+and reports the build time and DB round trips per message.
+
+    python -m backend.benchmarks.timetable_context [--db URL] [--users 1000] [--messages 2000]
+"""
+
+from backend.benchmarks.common import bench_args, configure_env
+
+args = bench_args(__doc__.splitlines()[1], users=1000, slots_per_day=5, messages=2000)
+configure_env(args.db)
+
+import random
+
+from fastapi import HTTPException
+from sqlmodel import Session
+
+from backend.benchmarks.common import count_queries, reset_database, seed_users, timed
+from backend.db.database import engine
+from backend.utils.attendanceManagement import get_daily_timetable_user
+from backend.utils.timetable_context import get_weekly_context, load_weekly_context
+
+
+def per_day_context(user_id: int, session: Session) -> str:
+    """The old read_main loop (minus its stale timetable_str bug)."""
+    lines = []
+    for day in ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]:
+        try:
+            timetable = get_daily_timetable_user(user_id, day, session)
+        except HTTPException:
+            continue
+        lines += [
+            f"{day}: {slot.start_time}-{slot.end_time} {slot.subject_code} ({slot.class_type.value})"
+            for slot in timetable
+        ]
+    return "\n".join(lines)
+
+
+def main():
+    reset_database()
+    user_ids = seed_users(args.users, args.slots_per_day)
+    rng = random.Random(7)
+    sample = [rng.choice(user_ids) for _ in range(args.messages)]
+
+    results, queries = {}, {}
+    variants = [
+        ("per_day", per_day_context),
+        ("single_query", lambda uid, s: load_weekly_context(uid, s).text),
+        ("cached", lambda uid, s: get_weekly_context(uid, s).text),
+    ]
+    with Session(engine) as session:
+        # Same output from every variant; also warms the cache for "cached"
+        for uid in set(sample):
+            assert per_day_context(uid, session) == get_weekly_context(uid, session).text
+        for label, build in variants:
+            with count_queries(engine) as n, timed(label, results):
+                for uid in sample:
+                    build(uid, session)
+            queries[label] = n[0]
+
+    print(f"users: {args.users}, messages: {args.messages}")
+    for label, _ in variants:
+        print(
+            f"{label:>12}: {1000 * results[label] / args.messages:.3f} ms/message, "
+            f"{queries[label] / args.messages:.2f} queries/message"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,13 @@
 Application configuration loaded from environment variables.
 
 Uses pydantic-settings to read values from a `.env` file in the project root.
-All fields are required — the app will fail to start if any are missing.
+The connection/credential fields are required — the app will fail to start if
+any are missing.  Tuning knobs further down have defaults and can be overridden
+the same way.
 """
 
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -17,6 +21,99 @@ class Settings(BaseSettings):
     )
     BASE_URL: str  # Public URL prefix (e.g. https://yourdomain.com)
     API_SECRET_KEY: str  # Secret key for authenticating API requests (custom header)
+
+    # --- Webhook processing (optional, sensible defaults) ---
+    # When True the webhook acks immediately and a worker pool handles the update
+    WEBHOOK_ASYNC_PROCESSING: bool = True
+    # Number of serial lanes; updates are hashed onto a lane by contact_id
+    WEBHOOK_WORKERS: int = 4
+    WEBHOOK_LANE_DEPTH: int = 250  # Max queued updates per lane
+    # What to do when a lane is full: "reject", "drop_oldest" or "wait".
+    # "drop_oldest" loses messages that were already acknowledged (Telegram
+    # won't resend them) and lets the sender's later messages run without
+    # them; the sender is only told to send the dropped message again.
+    WEBHOOK_OVERFLOW_POLICY: Literal["reject", "drop_oldest", "wait"] = "reject"
+    WEBHOOK_OVERFLOW_WAIT_SECONDS: float = 2.0  # Max wait for space with "wait"
+    WEBHOOK_DRAIN_TIMEOUT_SECONDS: float = 30.0  # Max wait for the queue on shutdown
+
+    # --- Webhook update_id dedup ---
+    UPDATE_DEDUP_MAX_SIZE: int = 10000  # Update ids remembered in memory
+    UPDATE_DEDUP_TTL_SECONDS: int = 3600  # How long an update id counts as seen
+    # "memory" (per process) or "redis" (shared between workers via REDIS_URL)
+    UPDATE_DEDUP_BACKEND: Literal["memory", "redis"] = "memory"
+
+    # --- Telegram Bot API client ---
+    TELEGRAM_API_URL: str = "https://api.telegram.org"
+    TELEGRAM_TIMEOUT_SECONDS: float = 15.0  # Per-request timeout
+    TELEGRAM_MAX_CONNECTIONS: int = 20  # Size of the shared keep-alive pool
+    TELEGRAM_GLOBAL_RATE: float = 30.0  # Max messages per second across all chats
+    TELEGRAM_PER_CHAT_RATE: float = 1.0  # Max messages per second to one chat
+    TELEGRAM_MAX_RETRIES: int = 3  # Retries on 429 / 5xx / network errors
+    TELEGRAM_SEND_CONCURRENCY: int = 8  # Outbox sender tasks
+    BROADCAST_CONCURRENCY: int = 20  # In-flight sends during a broadcast run
+
+    # --- LLM prompt context ---
+    TIMETABLE_CONTEXT_CACHE_SIZE: int = 5000  # Users whose weekly context is cached
+    TIMETABLE_CONTEXT_TTL_SECONDS: int = 600  # Upper bound on staleness across workers
+    # LLM response cache: "off", "memory" (per process) or "redis" (shared via REDIS_URL)
+    LLM_CACHE_BACKEND: Literal["off", "memory", "redis"] = "memory"
+    LLM_CACHE_MAX_SIZE: int = 5000  # Responses kept in memory
+    LLM_CACHE_TTL_SECONDS: int = 21600  # How long a cached response is reused
+
+    # --- LLM gateway ---
+    LLM_TIMEOUT_SECONDS: float = 20.0  # Deadline per parse, including queueing and retries
+    LLM_MAX_CONCURRENCY: int = 8  # In-flight LLM calls
+    LLM_MAX_RETRIES: int = 2  # Retries on timeouts, connection errors, 429 and 5xx
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive failures that open the breaker
+    LLM_BREAKER_RESET_SECONDS: float = 30.0  # How long the breaker stays open
+
+    # --- Tiered model routing ---
+    # When True, messages go to the small model first and escalate to the large one
+    LLM_TIERED_ROUTING: bool = True
+    LLM_SMALL_MODEL: str = "openai/gpt-oss-20b"  # Groq model names
+    LLM_LARGE_MODEL: str = "openai/gpt-oss-120b"
+    LLM_SMALL_TIMEOUT_SECONDS: float = 8.0  # Deadline for the small tier before escalating
+
+    # --- LLM providers and hedging ---
+    LLM_PRIMARY_PROVIDER: Literal["groq", "gemini", "fake"] = "groq"
+    # Hedge target when the primary is slow or failing ("none" disables hedging)
+    LLM_SECONDARY_PROVIDER: Literal["none", "groq", "gemini", "fake"] = "none"
+    LLM_HEDGE_PERCENTILE: float = 95.0  # Primary latency percentile used as the hedge delay
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 0.5
+    LLM_HEDGE_MAX_DELAY_SECONDS: float = 5.0
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = 2.0  # Until enough samples are recorded
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    GEMINI_API_KEY: str = ""  # Only needed when a Gemini provider is configured
+    GEMINI_SMALL_MODEL: str = "gemini-2.5-flash-lite"
+    GEMINI_LARGE_MODEL: str = "gemini-2.5-flash"
+
+    # --- AttendanceStats reconciliation ---
+    # Cron for the recount of the counters from the logs, e.g. "30 3 * * *" ("" = off)
+    STATS_RECONCILE_CRON: str = ""
+    # Let the cron lower counters too; deleted slots take their logs with them
+    STATS_RECONCILE_LOWER_COUNTS: bool = False
+    STATS_RECONCILE_BATCH_SIZE: int = 5000  # Rows per batched UPDATE / INSERT
+
+    # --- Logging ---
+    LOG_LEVEL: str = "INFO"  # Root level for the JSON logger
+    # Per-logger overrides as JSON, e.g. '{"backend.adapters": "DEBUG"}'
+    LOG_LEVELS: dict[str, str] = {}
+    LOG_QUEUE_SIZE: int = 10000  # Records buffered for the writer thread; more are dropped
+    # Log SQL statements slower than this many milliseconds (0 = off)
+    SLOW_QUERY_LOG_MS: float = 0
+
+    # --- DB query budget (per HTTP request / Telegram update) ---
+    DB_QUERY_BUDGET: int = 20  # Statements before a request is flagged
+    DB_TIME_BUDGET_MS: float = 250.0  # DB time before a request is flagged
+    # Raise QueryBudgetExceeded instead of logging (for CI, never in production)
+    DB_QUERY_BUDGET_STRICT: bool = False
+
+    # --- Tracing ---
+    TRACING_BUFFER_SIZE: int = 5000  # Finished spans kept in memory for /metrics/traces
+    TRACING_EXPORT_PATH: str = ""  # Also append finished spans to this JSONL file
+
+    REDIS_URL: str = "redis://localhost:6379/0"  # Used by features with a Redis backend
+
     model_config = SettingsConfigDict(
         env_file=".env",
     )
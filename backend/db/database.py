@@ -5,18 +5,128 @@ Creates a SQLAlchemy engine from the PG_DB connection string and provides
 a generator-based session dependency for FastAPI routes.
 """
 
+import logging
 from typing import Generator, Annotated
 from fastapi import Depends
+from sqlalchemy import delete, func, inspect, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import make_url
 from sqlmodel import Session, SQLModel, create_engine
 from backend.config import settings
+from backend.db.pool_metrics import InstrumentedQueuePool, register_pool_gauges
+from backend.db.profiling import install_query_profiling
 
-# echo=True logs all SQL statements to stdout (useful for debugging)
-engine = create_engine(settings.PG_DB, echo=True)
+logger = logging.getLogger(__name__)
+
+
+def _pool_options(url: str) -> dict:
+    """Use the instrumented QueuePool wherever SQLAlchemy would pick a QueuePool."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}  # In-memory SQLite keeps its single-connection pool
+    return {"poolclass": InstrumentedQueuePool}
+
+
+# SQL is not echoed; set SLOW_QUERY_LOG_MS to log only the slow statements
+engine = create_engine(settings.PG_DB, echo=False, **_pool_options(settings.PG_DB))
+register_pool_gauges(engine)
+# Per-request query counts and DB time (backend/db/profiling.py)
+install_query_profiling(engine, slow_query_ms=settings.SLOW_QUERY_LOG_MS)
 
 
 def create_db_and_tables():
     """Create all tables defined by SQLModel metadata if they don't already exist."""
     SQLModel.metadata.create_all(engine)
+    dedupe_attendance_logs()
+    merge_duplicate_attendance_stats()
+    create_missing_indexes()
+
+
+def create_missing_indexes():
+    """
+    Create indexes that were added to the models after their table already existed.
+
+    `create_all` skips existing tables entirely, so without this an index added
+    to a model would only ever exist on fresh databases.
+    """
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def dedupe_attendance_logs():
+    """
+    Prepare an existing attendance_logs table for its unique (slot_id, date_log) index.
+
+    Older databases only had a plain index there, and concurrent marks could
+    leave two logs for the same class and date.  Keeps the newest log of each
+    pair and drops the old index; a no-op once the unique index exists.
+    """
+    from backend.db.models import AttendanceLog
+
+    indexes = {ix["name"] for ix in inspect(engine).get_indexes("attendance_logs")}
+    if "uq_attendance_logs_slot_id_date_log" in indexes:
+        return
+    with engine.begin() as conn:
+        newest = select(func.max(AttendanceLog.id)).group_by(
+            AttendanceLog.slot_id, AttendanceLog.date_log
+        )
+        removed = conn.execute(
+            delete(AttendanceLog).where(AttendanceLog.id.not_in(newest))
+        ).rowcount
+        if "ix_attendance_logs_slot_id_date_log" in indexes:
+            conn.execute(text("DROP INDEX ix_attendance_logs_slot_id_date_log"))
+    if removed:
+        logger.warning("Removed %d duplicate attendance logs", removed)
+
+
+def merge_duplicate_attendance_stats():
+    """
+    Prepare an existing attendance_stats table for its unique (user_id, subject_code, classType) index.
+
+    Racing first marks could create two counter rows for one key, each holding
+    part of the counts.  Adds the duplicates' counters into the oldest row of
+    each key and deletes the rest; a no-op once the unique index exists.
+    """
+    from backend.db.models import AttendanceStats
+
+    indexes = {ix["name"] for ix in inspect(engine).get_indexes("attendance_stats")}
+    if "uq_attendance_stats_user_id_subject_code_classType" in indexes:
+        return
+    key = (AttendanceStats.user_id, AttendanceStats.subject_code, AttendanceStats.classType)
+    other = AttendanceStats.__table__.alias("other")
+    same_key = (
+        (other.c.user_id == AttendanceStats.user_id)
+        & (other.c.subject_code == AttendanceStats.subject_code)
+        & (other.c.classType == AttendanceStats.classType)
+    )
+    oldest = select(func.min(AttendanceStats.id)).group_by(*key)
+    with engine.begin() as conn:
+        conn.execute(
+            update(AttendanceStats)
+            .where(AttendanceStats.id.in_(oldest.having(func.count() > 1)))
+            .values(
+                total_classes=select(func.sum(other.c.total_classes))
+                .where(same_key)
+                .scalar_subquery(),
+                attended_classes=select(func.sum(other.c.attended_classes))
+                .where(same_key)
+                .scalar_subquery(),
+            )
+        )
+        removed = conn.execute(
+            delete(AttendanceStats).where(AttendanceStats.id.not_in(oldest))
+        ).rowcount
+    if removed:
+        logger.warning("Merged %d duplicate attendance stats rows", removed)
+
+
+def dialect_insert(session: Session, table):
+    """INSERT construct with ON CONFLICT support (upserts) for the session's database."""
+    if session.get_bind().dialect.name == "postgresql":
+        return pg_insert(table)
+    return sqlite_insert(table)
 
 
 def get_session() -> Generator[Session, None, None]:
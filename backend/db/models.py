@@ -2,7 +2,8 @@
 Database table definitions (SQLModel) and Pydantic schemas used by the LLM.
 
 Contains:
-- User, Subjects, TimetableSlots, AttendanceLog, AttendanceStats, PendingAction  (DB tables)
+- User, Subjects, TimetableSlots, AttendanceLog, AttendanceStats, PendingAction,
+  ChatID, BroadcastDelivery  (DB tables)
 - IntentEnum, LLMResponseSchema, LLMMultiResponse  (Pydantic models for LLM output)
 - Params, Slot, UpdatedSlot  (supporting parameter schemas)
 """
@@ -10,6 +11,7 @@ Contains:
 from typing import Annotated
 from fastapi.params import Depends
 from sqlmodel import Field, Session, SQLModel, UniqueConstraint, create_engine, select
+from sqlalchemy import Index
 
 
 from sqlmodel import Field, SQLModel
@@ -81,6 +83,12 @@ class TimetableSlots(SQLModel, table=True):
     """
 
     __tablename__ = "timetable_slots"
+    # Serves the composite (user, day, start, ...) match used when an action
+    # carries no slot handle
+    __table_args__ = (
+        Index("ix_timetable_slots_user_id_day_start_time", "user_id", "day", "start_time"),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="users.id", ondelete="CASCADE")
     day: DayEnum = Field(index=True)
@@ -108,6 +116,11 @@ class AttendanceLog(SQLModel, table=True):
     """A single attendance record tying a timetable slot to a date and status."""
 
     __tablename__ = "attendance_logs"
+    # One log per slot per date; mark_attendance upserts on it.  Also serves
+    # "is this slot marked on this date?" lookups (reminders)
+    __table_args__ = (
+        Index("uq_attendance_logs_slot_id_date_log", "slot_id", "date_log", unique=True),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
     slot_id: Annotated[int, Field(foreign_key="timetable_slots.id", ondelete="CASCADE")]
@@ -123,6 +136,16 @@ class AttendanceStats(SQLModel, table=True):
     """
 
     __tablename__ = "attendance_stats"
+    # One row per key; mark_attendance upserts on it
+    __table_args__ = (
+        Index(
+            "uq_attendance_stats_user_id_subject_code_classType",
+            "user_id",
+            "subject_code",
+            "classType",
+            unique=True,
+        ),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="users.id", ondelete="CASCADE")
@@ -189,6 +212,25 @@ class ChatID(SQLModel, table=True):
     )  # In case we add more adapters in the future
 
 
+class BroadcastDelivery(SQLModel, table=True):
+    """
+    Per-recipient progress of a broadcast run (e.g. the nightly reminder).
+
+    One row per (run_key, contact_id).  A re-run with the same run_key skips
+    recipients already marked 'sent', so an interrupted run resumes where it stopped.
+    """
+
+    __tablename__ = "broadcast_deliveries"
+    __table_args__ = (UniqueConstraint("run_key", "contact_id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    run_key: str = Field(index=True)  # e.g. "bot_message:2026-02-17"
+    contact_id: str = Field()  # Adapter contact ID the message went to
+    status: str = Field(default="sent")  # 'sent' or 'failed'
+    error: Optional[str] = Field(default=None)
+    attempted_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 # ───────────────────────────────────────────────
 # LLM Intent / Response Schemas (Pydantic only)
 # ───────────────────────────────────────────────
@@ -257,7 +299,14 @@ class Params(BaseModel):
     end_time: Optional[time] = None
     status: Optional[AttendanceStatus] = None
     classType: Optional[ClassType] = None
-    slot_id: Optional[int] = None
+    slot_id: Optional[int] = Field(
+        default=None,
+        description=(
+            "Handle of the timetable slot the action refers to: the number after '#' "
+            "on the slot's line in the user's timetable (e.g. 12 for '#12 Mon ...'). "
+            "null when the class is not in the timetable."
+        ),
+    )
     updatedSlot: Optional[UpdatedSlot] = None
     day_of_slot: Optional[DayEnum] = None
     confusion_flag: Optional[bool] = (
@@ -0,0 +1,181 @@
+"""
+Per-request query profiling.
+
+Cursor-level event hooks on the engine record, for the request being
+handled, how many statements it ran, the total time spent in the database
+and its slowest statements (with their parameters):
+
+    with profile_queries("telegram_update"):
+        process_message(message)
+
+Scopes are opened by the HTTP middleware (one per request, labelled by
+router) and around each Telegram update; sessions need no changes because
+the hooks sit on the engine and find the current scope through a contextvar.
+When a scope closes it observes `db_queries_per_request{scope}` and
+`db_time_per_request_seconds{scope}`.  A scope over DB_QUERY_BUDGET
+statements or DB_TIME_BUDGET_MS is counted in
+`db_query_budget_exceeded_total{scope}` and logged with its slowest
+statements.  Every statement also adds to the `db_queries` count of the
+current trace span (backend/utils/tracing.py), so /metrics/traces shows
+which stage ran which queries.
+
+In tests and benchmarks, `query_budget` turns a budget into an assertion so
+that N+1 regressions fail loudly (the per-flow budgets of the Telegram
+message flows are in tests/test_query_budget.py):
+
+    with query_budget(max_queries=4):
+        mark_attendance(...)
+
+Setting DB_QUERY_BUDGET_STRICT makes every profiled scope raise the same way
+(meant for CI runs, not production).
+
+The same hooks log statements slower than SLOW_QUERY_LOG_MS (0 = off) to
+the `backend.db.slow_query` logger.
+"""
+
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from backend.config import settings
+from backend.utils import metrics, tracing
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("backend.db.slow_query")
+
+SLOWEST_KEPT = 5  # Statements kept per scope for the report
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A profiled block ran more queries (or spent longer in the DB) than allowed."""
+
+
+def _describe(statement: str, parameters) -> dict:
+    return {
+        "statement": " ".join(statement.split())[:1000],
+        "parameters": repr(parameters)[:300],
+    }
+
+
+class QueryProfile:
+    """Statement count, DB time and slowest statements of one scope (and its parents)."""
+
+    def __init__(self, scope: str, parent: "QueryProfile | None" = None):
+        self.scope = scope
+        self.parent = parent
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest: list[tuple[float, str, object]] = []  # (seconds, statement, parameters)
+
+    def record(self, seconds: float, statement: str, parameters):
+        profile = self
+        while profile is not None:
+            profile.count += 1
+            profile.seconds += seconds
+            slowest = profile.slowest
+            if len(slowest) < SLOWEST_KEPT or seconds > slowest[-1][0]:
+                slowest.append((seconds, statement, parameters))
+                slowest.sort(key=lambda item: item[0], reverse=True)
+                del slowest[SLOWEST_KEPT:]
+            profile = profile.parent
+
+    def report(self) -> dict:
+        return {
+            "scope": self.scope,
+            "queries": self.count,
+            "db_ms": round(1000 * self.seconds, 3),
+            "slowest": [
+                {"ms": round(1000 * seconds, 3), **_describe(statement, parameters)}
+                for seconds, statement, parameters in self.slowest
+            ],
+        }
+
+    def over(self, max_queries: int | None, max_ms: float | None) -> bool:
+        return (max_queries is not None and self.count > max_queries) or (
+            max_ms is not None and 1000 * self.seconds > max_ms
+        )
+
+
+_current: contextvars.ContextVar[QueryProfile | None] = contextvars.ContextVar(
+    "query_profile", default=None
+)
+
+
+def current_profile() -> QueryProfile | None:
+    return _current.get()
+
+
+@contextmanager
+def profile_queries(scope: str):
+    """Profile the statements run inside the block as one request."""
+    profile = QueryProfile(scope, _current.get())
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+        metrics.histogram(
+            "db_queries_per_request",
+            "Statements run per request",
+            buckets=(1, 2, 3, 5, 8, 13, 20, 50, 100),
+            scope=scope,
+        ).observe(profile.count)
+        metrics.histogram(
+            "db_time_per_request_seconds", "Time spent in the DB per request", scope=scope
+        ).observe(profile.seconds)
+        tracing.set_attributes(db_queries=profile.count, db_ms=round(1000 * profile.seconds, 3))
+        if profile.over(settings.DB_QUERY_BUDGET, settings.DB_TIME_BUDGET_MS):
+            metrics.counter(
+                "db_query_budget_exceeded_total",
+                "Requests over the query-count or DB-time budget",
+                scope=scope,
+            ).inc()
+            logger.warning("Request over DB budget", extra=profile.report())
+            if settings.DB_QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(_budget_message(profile))
+
+
+@contextmanager
+def query_budget(max_queries: int | None = None, max_ms: float | None = None):
+    """Raise QueryBudgetExceeded if the block runs more than `max_queries` statements or `max_ms` of DB time."""
+    with profile_queries("query_budget") as profile:
+        yield profile
+    if profile.over(max_queries, max_ms):
+        raise QueryBudgetExceeded(_budget_message(profile, max_queries, max_ms))
+
+
+def _budget_message(profile: QueryProfile, max_queries=None, max_ms=None) -> str:
+    report = profile.report()
+    limits = f" (budget: {max_queries} queries, {max_ms} ms)" if max_queries or max_ms else ""
+    lines = [f"{report['scope']}: {report['queries']} queries, {report['db_ms']} ms{limits}"]
+    lines += [f"  {s['ms']} ms  {s['statement']}  {s['parameters']}" for s in report["slowest"]]
+    return "\n".join(lines)
+
+
+def install_query_profiling(engine: Engine, slow_query_ms: float = 0):
+    """Attach the cursor hooks that feed profiles, span counts and the slow-query log."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_started
+        profile = _current.get()
+        if profile is not None:
+            profile.record(elapsed, statement, parameters)
+        tracing.add_counts(db_queries=1)
+        if slow_query_ms and 1000 * elapsed >= slow_query_ms:
+            slow_query_logger.warning(
+                "Slow query",
+                extra={
+                    "duration_ms": round(1000 * elapsed, 3),
+                    "executemany": executemany,
+                    **_describe(statement, parameters),
+                },
+            )
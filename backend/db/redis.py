@@ -1,13 +1,16 @@
 """
 Redis client setup.
 
-Planned for future use to store conversation context and improve
-LLM multi-turn interaction quality.  Not actively used yet.
+Used as the optional shared store for cross-worker state (e.g. webhook
+update_id dedup when UPDATE_DEDUP_BACKEND="redis").  The client connects
+lazily, so nothing talks to Redis unless a feature is configured to use it.
 """
 
 import redis
 
-redis_client = redis.Redis(host="localhost", port=6379, db=0)
+from backend.config import settings
+
+redis_client = redis.Redis.from_url(settings.REDIS_URL)
 
 
 def get_redis_client():
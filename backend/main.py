@@ -1,16 +1,32 @@
+import logging
 from fastapi import FastAPI
 from backend.config import settings
 from backend.db.database import create_db_and_tables
+from backend.app_instance import app
+from backend.routers import metricsRouter
+from backend.utils.http_metrics import RequestMetricsMiddleware
+from backend.utils.structured_logging import configure_logging
+
+# JSON logs, written from a background thread
+configure_logging()
+
+# Request count and latency per router, served on /metrics
+app.add_middleware(RequestMetricsMiddleware)
+
+# Registered before the Telegram adapter is imported: that import adds the cron
+# router, whose catch-all GET /{job_name} would otherwise shadow /metrics
+app.include_router(metricsRouter.router, prefix="/metrics")
+
 from backend.routers import index, attendanceRouter, userRouter
 from backend.adapters.telegram import router as telegram_router
 
-from backend.app_instance import app
+logger = logging.getLogger(__name__)
 
 
 @app.on_event("startup")
 async def on_startup():
     create_db_and_tables()
-    print("Database and tables created!")
+    logger.info("Database and tables created")
 
 
 app.include_router(index.router, prefix="/index")
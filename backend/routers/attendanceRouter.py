@@ -18,7 +18,10 @@ from backend.utils.attendanceManagement import (
     get_attendance_logs,
     get_daily_timetable_user,
     mark_attendance,
+    resolve_slot,
 )
+from backend.utils.stats_reconciliation import reconcile_attendance_stats
+from backend.utils.timetable_context import invalidate_weekly_context
 import json
 from backend.utils.verify_secret_token import verify_api_secret
 
@@ -107,6 +110,7 @@ def add_slot(slots: TimetableSlots, session: Session = Depends(get_session)):
     session.add(slots)
     session.commit()
     session.refresh(slots)
+    invalidate_weekly_context(slots.user_id)
     return {"message": "Timetable slot added successfully!"}
 
 
@@ -125,7 +129,7 @@ def mark_attendance_route(
     session: Session = Depends(get_session),
 ):
     """Mark attendance for a specific slot. Delegates to the utility function."""
-    attendance_log = mark_attendance(
+    marked = mark_attendance(
         user_id,
         subject_code,
         day,
@@ -137,10 +141,29 @@ def mark_attendance_route(
     )
     return {
         "message": "Attendance marked successfully!",
-        "attendance_log": attendance_log,
+        "attendance_log": marked.log,
+        "temporary_slot_created": marked.created_slot,
     }
 
 
+@router.post("/reconcile_stats")
+def reconcile_stats(
+    dry_run: bool = False,
+    lower_counts: bool = False,
+    session: Session = Depends(get_session),
+):
+    """
+    Recompute every user's AttendanceStats from the attendance logs and fix
+    the rows that drifted (admin; same job as the stats_reconcile cron).
+    With dry_run=true, only reports the drift.  Counters the recount would
+    lower (e.g. after a slot and its logs were deleted) are only lowered
+    with lower_counts=true.
+    """
+    return reconcile_attendance_stats(
+        session, dry_run=dry_run, lower_counts=lower_counts
+    )
+
+
 # ──────────── GET ROUTES ────────────
 
 
@@ -184,9 +207,6 @@ def get_attendance_stats(
                 AttendanceStats.classType == classType,
             )
         ).first()
-        print(
-            f"Queried attendance record for user_id={user_id}, subject_code={subject_code}, classType={classType}: {attendance_record}"
-        )
         if not attendance_record:
             raise HTTPException(
                 status_code=404,
@@ -210,32 +230,35 @@ def get_attendance_stats(
 @router.put("/update_slot/{slot_id}")
 def update_slot(
     user_id: int,
-    day: DayEnum,
-    start_time: time,
-    end_time: time,
-    classType: ClassType,
-    subject_code: str,
     updated_slot: TimetableSlots,
+    day: DayEnum | None = None,
+    start_time: time | None = None,
+    end_time: time | None = None,
+    classType: ClassType | None = None,
+    subject_code: str | None = None,
     session: Session = Depends(get_session),
+    slot_id: int | None = None,
 ):
     """
     Update an existing timetable slot.
 
-    Finds the slot by (user_id, day, start_time, end_time, classType, subject_code),
-    checks for conflicts with the new values, then applies the update.
+    Finds the slot by `slot_id` (falling back to (user_id, day, start_time,
+    end_time, classType, subject_code) if it doesn't match), checks for
+    conflicts with the new values, then applies the update.
     """
     if not user_id:
         raise HTTPException(status_code=400, detail="Missing user_id")
-    if not day:
-        raise HTTPException(status_code=400, detail="Missing day")
-    if not start_time:
-        raise HTTPException(status_code=400, detail="Missing start_time")
-    if not end_time:
-        raise HTTPException(status_code=400, detail="Missing end_time")
-    if not classType:
-        raise HTTPException(status_code=400, detail="Missing classType")
-    if not subject_code:
-        raise HTTPException(status_code=400, detail="Missing subject_code")
+    if slot_id is None:
+        if not day:
+            raise HTTPException(status_code=400, detail="Missing day")
+        if not start_time:
+            raise HTTPException(status_code=400, detail="Missing start_time")
+        if not end_time:
+            raise HTTPException(status_code=400, detail="Missing end_time")
+        if not classType:
+            raise HTTPException(status_code=400, detail="Missing classType")
+        if not subject_code:
+            raise HTTPException(status_code=400, detail="Missing subject_code")
     if not updated_slot:
         raise HTTPException(status_code=400, detail="Missing updated_slot data")
     if (
@@ -247,16 +270,9 @@ def update_slot(
             status_code=400,
             detail=f"Updated start_time ({updated_slot.start_time}) must be before end_time ({updated_slot.end_time})",
         )
-    slot = session.exec(
-        select(TimetableSlots).where(
-            TimetableSlots.user_id == user_id,
-            TimetableSlots.day == day,
-            TimetableSlots.start_time == start_time,
-            TimetableSlots.end_time == end_time,
-            TimetableSlots.class_type == classType,
-            TimetableSlots.subject_code == subject_code,
-        )
-    ).first()
+    slot = resolve_slot(
+        session, user_id, slot_id, subject_code, day, start_time, end_time, classType
+    )
     if not slot:
         raise HTTPException(status_code=404, detail="Slot not found")
     conflict_slot = session.exec(
@@ -283,6 +299,7 @@ def update_slot(
     session.add(slot)
     session.commit()
     session.refresh(slot)
+    invalidate_weekly_context(user_id)
     return {"message": "Timetable slot updated successfully!"}
 
 
@@ -311,40 +328,36 @@ def delete_subject(
 @router.delete("/delete_slot/{slot_id}")
 def delete_slot(
     user_id: int,
-    subject_code: str,
-    day: DayEnum,
-    start_time: time,
-    end_time: time,
-    classType: ClassType,
+    subject_code: str | None = None,
+    day: DayEnum | None = None,
+    start_time: time | None = None,
+    end_time: time | None = None,
+    classType: ClassType | None = None,
     session: Session = Depends(get_session),
+    slot_id: int | None = None,
 ):
-    """Delete a single timetable slot identified by its composite key."""
+    """Delete a single timetable slot identified by `slot_id` or, failing that, its composite key."""
     if not user_id:
         raise HTTPException(status_code=400, detail="Missing user_id")
-    if not subject_code:
-        raise HTTPException(status_code=400, detail="Missing subject_code")
-    if not day:
-        raise HTTPException(status_code=400, detail="Missing day")
-    if not start_time:
-        raise HTTPException(status_code=400, detail="Missing start_time")
-    if not end_time:
-        raise HTTPException(status_code=400, detail="Missing end_time")
-    if not classType:
-        raise HTTPException(status_code=400, detail="Missing classType")
-    slot = session.exec(
-        select(TimetableSlots).where(
-            TimetableSlots.user_id == user_id,
-            TimetableSlots.subject_code == subject_code,
-            TimetableSlots.day == day,
-            TimetableSlots.start_time == start_time,
-            TimetableSlots.end_time == end_time,
-            TimetableSlots.class_type == classType,
-        )
-    ).first()
+    if slot_id is None:
+        if not subject_code:
+            raise HTTPException(status_code=400, detail="Missing subject_code")
+        if not day:
+            raise HTTPException(status_code=400, detail="Missing day")
+        if not start_time:
+            raise HTTPException(status_code=400, detail="Missing start_time")
+        if not end_time:
+            raise HTTPException(status_code=400, detail="Missing end_time")
+        if not classType:
+            raise HTTPException(status_code=400, detail="Missing classType")
+    slot = resolve_slot(
+        session, user_id, slot_id, subject_code, day, start_time, end_time, classType
+    )
     if not slot:
         raise HTTPException(status_code=404, detail="Slot not found")
     session.delete(slot)
     session.commit()
+    invalidate_weekly_context(user_id)
     return {"message": "Timetable slot deleted successfully!"}
 
 
@@ -357,8 +370,4 @@ def get_attendance_log_for_date(
         raise HTTPException(status_code=400, detail="Missing user_id")
     if not date_of_slot:
         raise HTTPException(status_code=400, detail="Missing date_of_slot")
-    logs = get_attendance_logs(user_id, date_of_slot, session)
-    print(
-        f"Queried attendance logs for user_id={user_id} on date={date_of_slot}: {logs}"
-    )
-    return logs
+    return get_attendance_logs(user_id, date_of_slot, session)
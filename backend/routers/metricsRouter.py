@@ -0,0 +1,39 @@
+"""
+Metrics router — exposes the in-process metrics and recent pipeline traces.
+
+- GET /metrics         — every counter, gauge and histogram in the Prometheus
+                         text format, for scraping.  Among them:
+                         http_requests_total / http_request_seconds per router,
+                         db_pool_* (checkouts, wait time, overflow),
+                         llm_request_seconds and llm_*_tokens_total,
+                         telegram_send_seconds and telegram_429_total,
+                         pending_actions, update_queue_depth and
+                         telegram_outbox_depth, and the per-stage
+                         pipeline_stage_seconds.  Gauges are computed at
+                         scrape time; everything else is updated in place.
+- GET /metrics/traces  — the most recent traces from the local span exporter
+                         (backend/utils/tracing.py) as JSON.
+"""
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from backend.utils import metrics, tracing
+from backend.utils.verify_secret_token import verify_api_secret
+
+# All routes in this router require the X-Api-Secret-Key header
+router = APIRouter(dependencies=[Depends(verify_api_secret)])
+
+
+@router.get("", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(
+        metrics.render_prometheus(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@router.get("/traces")
+def recent_traces(limit: int = 20):
+    """The most recent traces, each with its spans (stage, duration, attributes)."""
+    return {"traces": tracing.exporter.recent_traces(limit)}
@@ -0,0 +1,259 @@
+"""
+Dry run of parsed actions before they are offered for confirmation.
+
+`read_main` turns a message into actions; before the user is asked to
+confirm them, `plan_actions` checks each one against the database the way
+executing it would, but without writing anything:
+
+- mark_attendance / update_slot / delete_slot: the slot is resolved (by its
+  handle if the slot agrees with the subject, day, times and class type the
+  action gives, else by those fields) and its id written into the action's
+  `slot_id`, so execution finds it by primary key; a handle naming another
+  class is reported
+- subjects referenced by add_slot, update_slot, temporary-slot marks and
+  delete_subject must exist; create_subject must not clash
+- add_slot / update_slot must not overlap the user's other slots (or an
+  earlier add_slot in the same message)
+- delete_subject needs an admin; a mark must not repeat the stored status
+
+The checks use the cached weekly context plus at most two queries (the
+subjects and the existing logs involved).  The plan — one entry per action,
+with its problems — is stored next to the actions in
+`PendingAction.intent_json`, problems are listed in the confirmation
+message, and `perform_intent` skips the actions that have them.
+"""
+
+from datetime import date
+
+from sqlalchemy import or_
+from sqlmodel import Session, select
+
+from backend.db.models import (
+    AttendanceLog,
+    DayEnum,
+    IntentEnum,
+    LLMMultiResponse,
+    Subjects,
+    User,
+)
+from backend.utils.timetable_context import get_weekly_context
+
+# Intents whose action names an existing slot
+SLOT_INTENTS = {IntentEnum.MARK_ATTENDANCE, IntentEnum.UPDATE_SLOT, IntentEnum.DELETE_SLOT}
+
+
+def plan_actions(review: LLMMultiResponse, user: User, session: Session) -> list[dict]:
+    """
+    Dry-run every action of `review` for `user`; returns one entry per action:
+    {"intent": ..., "slot_id": resolved id or None, "problems": [...]}.
+
+    Resolved slot ids are also written into the actions' params.
+    """
+    slots = get_weekly_context(user.id, session).slots
+    actions = list(review.actions)
+    plan = [
+        {"intent": item.intent.value, "slot_id": None, "problems": []} for item in actions
+    ]
+
+    for item, entry in zip(actions, plan):
+        if item.params.date_of_slot and not item.params.day_of_slot:
+            item.params.day_of_slot = DayEnum(item.params.date_of_slot.strftime("%a"))
+        if item.intent in SLOT_INTENTS and not item.params.confusion_flag:
+            slot, mixup = _match_slot(item.params, slots)
+            if slot is not None:
+                item.params.slot_id = entry["slot_id"] = slot.id
+                # Fill what the model left out from the slot itself
+                item.params.subject_code = item.params.subject_code or slot.subject_code
+                item.params.classType = item.params.classType or slot.class_type
+            elif mixup is not None:
+                entry["problems"].append(mixup)
+
+    subjects = _load_subjects(actions, plan, session)
+    marked = _load_marks(actions, plan, session)
+    added = []  # (day, start, end) of earlier add_slot actions in this message
+
+    for item, entry in zip(actions, plan):
+        params, problems = item.params, entry["problems"]
+        if params.confusion_flag:
+            continue
+        if item.intent == IntentEnum.MARK_ATTENDANCE:
+            if entry["slot_id"] is None:
+                # Not in the timetable: a temporary slot will be created
+                if params.subject_code and params.subject_code not in subjects["codes"]:
+                    problems.append(_missing_subject(params.subject_code))
+                if params.start_time is None or params.end_time is None:
+                    problems.append(
+                        f"{params.subject_code} is not in your timetable for "
+                        f"{_day_name(params)}, and no class time was given."
+                    )
+            else:
+                on = params.date_of_slot or date.today()
+                if params.status and marked.get((entry["slot_id"], on)) == params.status:
+                    problems.append(
+                        f"{params.subject_code} {_kind(params)} on {on} is already "
+                        f"marked {params.status.value}."
+                    )
+        elif item.intent == IntentEnum.ADD_SLOT:
+            if params.subject_code not in subjects["codes"]:
+                problems.append(_missing_subject(params.subject_code))
+            problems += _time_problems(
+                params.day_of_slot, params.start_time, params.end_time, slots, added
+            )
+            added.append((params.day_of_slot, params.start_time, params.end_time))
+        elif item.intent == IntentEnum.UPDATE_SLOT:
+            if entry["slot_id"] is None:
+                problems.append(f"No matching {params.subject_code} slot in your timetable.")
+            updated = params.updatedSlot
+            if updated is None:
+                problems.append("The new slot details are missing.")
+            else:
+                if updated.subject_code and updated.subject_code not in subjects["codes"]:
+                    problems.append(_missing_subject(updated.subject_code))
+                problems += _time_problems(
+                    updated.day,
+                    updated.start_time,
+                    updated.end_time,
+                    [s for s in slots if s.id != entry["slot_id"]],
+                    added,
+                )
+        elif item.intent == IntentEnum.DELETE_SLOT:
+            if entry["slot_id"] is None:
+                problems.append(f"No matching {params.subject_code} slot in your timetable.")
+        elif item.intent == IntentEnum.CREATE_SUBJECT:
+            if params.subject_code in subjects["codes"] or (
+                params.subject_name in subjects["names"]
+            ):
+                problems.append(
+                    f"A subject with code {params.subject_code} or name "
+                    f"'{params.subject_name}' already exists."
+                )
+        elif item.intent == IntentEnum.DELETE_SUBJECT:
+            if not user.adminStatus:
+                problems.append("Only admins can delete subjects.")
+            elif params.subject_code not in subjects["codes"]:
+                problems.append(f"Subject {params.subject_code} does not exist.")
+    return plan
+
+
+def describe_problems(plan: list[dict]) -> str:
+    """Problems of a plan as lines for the confirmation message ("" if none)."""
+    lines = []
+    for number, entry in enumerate(plan, 1):
+        for problem in entry["problems"]:
+            lines.append(f"- {number}. {problem}" if len(plan) > 1 else f"- {problem}")
+    return "\n".join(lines)
+
+
+def _match_slot(params, slots):
+    """
+    The weekly-context slot an action refers to, as (slot, mix-up note).
+
+    By handle when the slot agrees with every field the action gives, else by
+    composite match.  A handle that names a different class and has no
+    composite match comes back as (None, note).
+    """
+    mixup = None
+    if params.slot_id is not None:
+        for slot in slots:
+            if slot.id != params.slot_id:
+                continue
+            given = (
+                (params.subject_code or None, slot.subject_code),
+                (params.day_of_slot, slot.day),
+                (params.start_time, slot.start_time),
+                (params.end_time, slot.end_time),
+                (params.classType, slot.class_type),
+            )
+            if all(value is None or value == actual for value, actual in given):
+                return slot, None
+            described = " ".join(filter(None, [params.subject_code, _kind(params)]))
+            mixup = (
+                f"#{slot.id} is {slot.subject_code} {slot.class_type.value} on "
+                f"{slot.day.value} {slot.start_time:%H:%M}-{slot.end_time:%H:%M}, "
+                f"not the {described} you described."
+            )
+    for slot in slots:
+        if (
+            slot.subject_code == params.subject_code
+            and slot.day == params.day_of_slot
+            and slot.start_time == params.start_time
+            and slot.end_time == params.end_time
+            and slot.class_type == params.classType
+        ):
+            return slot, None
+    return None, mixup
+
+
+def _load_subjects(actions, plan, session: Session) -> dict:
+    """Existing subject codes and names among those the checks need (one query)."""
+    codes, names = set(), set()
+    for item, entry in zip(actions, plan):
+        params = item.params
+        if item.intent == IntentEnum.MARK_ATTENDANCE and entry["slot_id"] is None:
+            codes.add(params.subject_code)
+        elif item.intent in (IntentEnum.ADD_SLOT, IntentEnum.DELETE_SUBJECT):
+            codes.add(params.subject_code)
+        elif item.intent == IntentEnum.CREATE_SUBJECT:
+            codes.add(params.subject_code)
+            names.add(params.subject_name)
+        elif item.intent == IntentEnum.UPDATE_SLOT and params.updatedSlot is not None:
+            codes.add(params.updatedSlot.subject_code)
+    codes.discard(None)
+    names.discard(None)
+    if not codes and not names:
+        return {"codes": set(), "names": set()}
+    condition = Subjects.subject_code.in_(codes)
+    if names:
+        condition = or_(condition, Subjects.subject_name.in_(names))
+    rows = session.exec(
+        select(Subjects.subject_code, Subjects.subject_name).where(condition)
+    ).all()
+    return {"codes": {code for code, _ in rows}, "names": {name for _, name in rows}}
+
+
+def _load_marks(actions, plan, session: Session) -> dict:
+    """(slot_id, date) -> stored status for the marks the actions would make (one query)."""
+    keys = {
+        (entry["slot_id"], item.params.date_of_slot or date.today())
+        for item, entry in zip(actions, plan)
+        if item.intent == IntentEnum.MARK_ATTENDANCE and entry["slot_id"] is not None
+    }
+    if not keys:
+        return {}
+    rows = session.exec(
+        select(AttendanceLog.slot_id, AttendanceLog.date_log, AttendanceLog.status).where(
+            AttendanceLog.slot_id.in_({slot_id for slot_id, _ in keys}),
+            AttendanceLog.date_log.in_({on for _, on in keys}),
+        )
+    ).all()
+    return {(slot_id, on): status for slot_id, on, status in rows}
+
+
+def _time_problems(day, start, end, slots, added) -> list[str]:
+    """Missing or inverted times, or an overlap with another slot on the same day."""
+    if day is None or start is None or end is None:
+        return ["The day or class time is missing."]
+    if start >= end:
+        return [f"The start time ({start:%H:%M}) must be before the end time ({end:%H:%M})."]
+    for slot in slots:
+        if slot.day == day and slot.start_time < end and slot.end_time > start:
+            return [
+                f"It overlaps {slot.subject_code} ({slot.start_time:%H:%M}-"
+                f"{slot.end_time:%H:%M}) on {day.value}."
+            ]
+    for other_day, other_start, other_end in added:
+        if other_day == day and other_start and other_end and other_start < end and other_end > start:
+            return ["It overlaps another slot added in the same message."]
+    return []
+
+
+def _missing_subject(subject_code: str) -> str:
+    return f"Subject {subject_code} does not exist. Create it first."
+
+
+def _day_name(params) -> str:
+    return params.day_of_slot.value if params.day_of_slot else "that day"
+
+
+def _kind(params) -> str:
+    return params.classType.value if params.classType else "class"
@@ -6,11 +6,14 @@ and the LLM intent dispatcher:
 - get_all_users          — list every user
 - get_daily_timetable_user — return regular (non-temporary) slots for a day
 - mark_attendance        — record present/absent/cancelled with auto-stat tracking
+- resolve_slot           — find an action's slot by handle, else by composite match
+- get_reminder_audience  — users with unmarked slots on a date (nightly reminder)
 """
 
+import logging
 from fastapi import APIRouter, Depends, HTTPException
 from requests import session
-from backend.db.database import get_session
+from backend.db.database import dialect_insert, get_session
 from sqlmodel import Session, select
 from backend.db.models import (
     AttendanceLog,
@@ -19,6 +22,9 @@ from backend.db.models import (
     TimetableSlots,
     User,
 )
+from backend.utils.timetable_context import invalidate_weekly_context
+
+logger = logging.getLogger(__name__)
 
 
 def get_all_users(session: Session = Depends(get_session)):
@@ -59,68 +65,109 @@ def get_daily_timetable_user(
     #         TimetableSlots.is_temporary == True,
     #     )
     # ).all()
-    print(day, timetable)
     if not timetable:
         raise HTTPException(status_code=404, detail="No timetable found for " + day)
     return timetable
 
 
 from datetime import date, time
+from typing import NamedTuple
 
+from sqlalchemy import and_, delete, false
 from backend.db.models import ClassType, DayEnum, AttendanceStatus
+from backend.utils import metrics
+
+
+class MarkedAttendance(NamedTuple):
+    log: AttendanceLog  # Detached copy of the written log
+    created_slot: bool  # The class was not in the timetable; a temporary slot was made
 
 
 def mark_attendance(
     user_id: int,
-    subject_code: str,
-    day: DayEnum,
-    start_time: time,
-    end_time: time,
+    subject_code: str | None,
+    day: DayEnum | None,
+    start_time: time | None,
+    end_time: time | None,
     status: AttendanceStatus,
-    classType: ClassType,
+    classType: ClassType | None,
     session: Session = Depends(get_session),
-    date_of_slot: date = date.today(),
-):
+    date_of_slot: date | None = None,
+    slot_id: int | None = None,
+) -> MarkedAttendance:
     """
     Mark attendance for a specific class on a given date.
 
     Behaviour:
+    - The slot is found by `slot_id` (its handle) when given, otherwise — or
+      if the handle doesn't match — by subject, day, times and class type.
     - If the timetable slot doesn't exist, a temporary slot is auto-created.
     - If attendance was already marked with the SAME status, raises 400.
     - If attendance was marked with a DIFFERENT status, the old record is
       replaced and the AttendanceStats counters are adjusted accordingly.
     - AttendanceStats (total_classes, attended_classes) are updated
       incrementally based on the new status.
+    - `date_of_slot` defaults to today.
+    - Returns the log and whether a temporary slot was created for it.
+
+    Everything is committed together: a slot lookup (which also locks the
+    slot), one upsert of the log on its unique (slot_id, date_log) index, one
+    upsert of the counters with in-database increments, and the commit.  A
+    class not in the timetable first locks the user's row and looks again
+    before its temporary slot is inserted.  Concurrent marks of the same
+    class therefore neither lose counter updates, create duplicate stats
+    rows, nor create two temporary slots.
     """
-    # print everything
-    # check for every parameter and raise error of missing parameter
     if not user_id:
         raise HTTPException(status_code=400, detail="Missing user_id")
-    if not subject_code:
-        raise HTTPException(status_code=400, detail="Missing subject_code")
-    if not day:
-        raise HTTPException(status_code=400, detail="Missing day")
-    if not start_time:
-        raise HTTPException(status_code=400, detail="Missing start_time")
-    if not end_time:
-        raise HTTPException(status_code=400, detail="Missing end_time")
     if not status:
         raise HTTPException(status_code=400, detail="Missing status")
-    if not classType:
-        raise HTTPException(status_code=400, detail="Missing classType")
-    # Get the timetable slot for the given parameters
-    slot = session.exec(
-        select(TimetableSlots).where(
-            TimetableSlots.user_id == user_id,
-            TimetableSlots.subject_code == subject_code,
-            TimetableSlots.day == day,
-            TimetableSlots.start_time == start_time,
-            TimetableSlots.end_time == end_time,
-            TimetableSlots.class_type == classType,
+    if status not in _COUNTED:
+        raise HTTPException(status_code=400, detail="Invalid attendance status")
+    date_of_slot = date_of_slot or date.today()
+    # Get the timetable slot, row-locking it (SELECT ... FOR UPDATE):
+    # concurrent marks of the same class queue up here, so each one reads
+    # the log as the previous one committed it
+    locked = None
+    if slot_id is not None:
+        locked = _lock_slot(
+            session,
+            _slot_by_handle(
+                user_id, slot_id, subject_code, day, start_time, end_time, classType
+            ),
         )
-    ).first()
-    if not slot:
-        # Slot not in regular timetable — create a temporary one on the fly
+    if locked is None:
+        # check for every parameter and raise error of missing parameter
+        if not subject_code:
+            raise HTTPException(status_code=400, detail="Missing subject_code")
+        if not day:
+            raise HTTPException(status_code=400, detail="Missing day")
+        if not start_time:
+            raise HTTPException(status_code=400, detail="Missing start_time")
+        if not end_time:
+            raise HTTPException(status_code=400, detail="Missing end_time")
+        if not classType:
+            raise HTTPException(status_code=400, detail="Missing classType")
+        composite = _slot_by_composite(
+            user_id, subject_code, day, start_time, end_time, classType
+        )
+        locked = _lock_slot(session, composite)
+        if locked is None:
+            # About to create a temporary slot: serialise that per user and
+            # look again, in case a concurrent mark of the same class made it
+            _lock_user(session, user_id)
+            locked = _lock_slot(session, composite)
+        _count_slot_lookup("composite" if locked else "missing")
+    else:
+        _count_slot_lookup("handle")
+    slot_id = None
+    if locked is not None:
+        # Counters are keyed by the slot's own subject and class type
+        slot_id, subject_code, classType = locked
+    created_slot = slot_id is None
+    if created_slot:
+        # Slot not in regular timetable — create a temporary one on the fly,
+        # committed together with the log below
         temp_slot = TimetableSlots(
             user_id=user_id,
             subject_code=subject_code,
@@ -129,81 +176,213 @@ def mark_attendance(
             end_time=end_time,
             class_type=classType,
             is_temporary=True,
-            date_of_slot=date_of_slot,
         )
         session.add(temp_slot)
-        session.commit()
-        session.refresh(temp_slot)
-        slot = temp_slot
-    # Prevent duplicate attendance with the same status
-    existing_log = session.exec(
-        select(AttendanceLog).where(
-            AttendanceLog.slot_id == slot.id,
-            AttendanceLog.date_log == date_of_slot,
-            AttendanceLog.status == status,
-        )
-    ).first()
-    if existing_log:
+        session.flush()
+        slot_id = temp_slot.id
+    # Insert the log, or replace a log with a different status for the same
+    # class and date (a correction)
+    upserted = _upsert_attendance_log(session, slot_id, date_of_slot, status)
+    if upserted is None:
+        session.rollback()
         raise HTTPException(
             status_code=400, detail="Attendance already marked for this class"
         )
-    # Check if there's a previous record with a different status (for correction)
-    previously_marked_log = session.exec(
-        select(AttendanceLog).where(
-            AttendanceLog.slot_id == slot.id,
-            AttendanceLog.date_log == date_of_slot,
+    log_id, previous_status = upserted
+    # Reverse the previous status's effect on the counters and apply the new one
+    total, attended = _COUNTED[status]
+    if previous_status is not None:
+        total -= _COUNTED[previous_status][0]
+        attended -= _COUNTED[previous_status][1]
+    _add_to_stats(session, user_id, subject_code, classType, total, attended)
+    session.commit()
+    if created_slot:
+        invalidate_weekly_context(user_id)
+    return MarkedAttendance(
+        AttendanceLog(id=log_id, slot_id=slot_id, status=status, date_log=date_of_slot),
+        created_slot,
+    )
+
+
+# (total_classes, attended_classes) each status adds to AttendanceStats
+_COUNTED = {
+    AttendanceStatus.PRESENT: (1, 1),
+    AttendanceStatus.ABSENT: (1, 0),
+    AttendanceStatus.CANCELLED: (0, 0),
+}
+
+
+def resolve_slot(
+    session: Session,
+    user_id: int,
+    slot_id: int | None = None,
+    subject_code: str | None = None,
+    day: DayEnum | None = None,
+    start_time: time | None = None,
+    end_time: time | None = None,
+    class_type: ClassType | None = None,
+) -> TimetableSlots | None:
+    """
+    Find the user's slot an action refers to.
+
+    By primary key when the action carries a slot handle and the slot agrees
+    with every other field the action gives (subject, day, times, class
+    type); otherwise, or if the handle does not match, by the composite
+    (subject, day, start, end, class type) match.
+    """
+    if slot_id is not None:
+        slot = session.exec(
+            select(TimetableSlots).where(
+                _slot_by_handle(
+                    user_id, slot_id, subject_code, day, start_time, end_time, class_type
+                )
+            )
+        ).first()
+        if slot is not None:
+            _count_slot_lookup("handle")
+            return slot
+    slot = session.exec(
+        select(TimetableSlots).where(
+            _slot_by_composite(user_id, subject_code, day, start_time, end_time, class_type)
         )
     ).first()
-    # Get or create the running attendance stats row for this user + subject + classType
-    attendance = session.exec(
-        select(AttendanceStats).where(
-            AttendanceStats.user_id == user_id,
-            AttendanceStats.subject_code == subject_code,
-            AttendanceStats.classType == classType,
+    _count_slot_lookup("composite" if slot else "missing")
+    return slot
+
+
+def _slot_by_handle(
+    user_id: int,
+    slot_id: int,
+    subject_code: str | None = None,
+    day: DayEnum | None = None,
+    start_time: time | None = None,
+    end_time: time | None = None,
+    class_type: ClassType | None = None,
+):
+    conditions = [TimetableSlots.id == slot_id, TimetableSlots.user_id == user_id]
+    # A handle for another subject, day, time or class type is a mix-up
+    # (e.g. Monday's #12 for Thursday's lecture), not a match
+    for column, value in (
+        (TimetableSlots.subject_code, subject_code or None),
+        (TimetableSlots.day, day),
+        (TimetableSlots.start_time, start_time),
+        (TimetableSlots.end_time, end_time),
+        (TimetableSlots.class_type, class_type),
+    ):
+        if value is not None:
+            conditions.append(column == value)
+    return and_(*conditions)
+
+
+def _slot_by_composite(user_id, subject_code, day, start_time, end_time, class_type):
+    return and_(
+        TimetableSlots.user_id == user_id,
+        TimetableSlots.subject_code == subject_code,
+        TimetableSlots.day == day,
+        TimetableSlots.start_time == start_time,
+        TimetableSlots.end_time == end_time,
+        TimetableSlots.class_type == class_type,
+    )
+
+
+def _count_slot_lookup(via: str):
+    metrics.counter(
+        "slot_lookups_total",
+        "Slot resolutions for actions by handle, composite match, or not found",
+        via=via,
+    ).inc()
+
+
+def _lock_slot(session: Session, condition):
+    """Row-lock the matching slot; returns (id, subject_code, class_type) or None."""
+    if session.get_bind().dialect.name == "sqlite":
+        # SQLite has no row locks and ignores FOR UPDATE; its one write lock
+        # is taken by the first write of a transaction, so start with a write
+        # that matches no rows
+        session.execute(delete(AttendanceLog).where(false()))
+    return session.exec(
+        select(
+            TimetableSlots.id, TimetableSlots.subject_code, TimetableSlots.class_type
         )
+        .where(condition)
+        .with_for_update()
     ).first()
 
-    if not attendance:
-        attendance = AttendanceStats(
-            user_id=user_id,
-            subject_code=subject_code,
-            total_classes=0,
-            attended_classes=0,
-            classType=classType,
+
+def _lock_user(session: Session, user_id: int):
+    """Row-lock the user, so only one of their marks creates a temporary slot at a time."""
+    session.exec(select(User.id).where(User.id == user_id).with_for_update()).first()
+
+
+def _upsert_attendance_log(
+    session: Session, slot_id: int, on_date: date, status: AttendanceStatus
+) -> tuple[int, AttendanceStatus | None] | None:
+    """
+    Write the (slot_id, on_date) log with `status` in one INSERT ... ON CONFLICT.
+
+    Returns (log id, status it replaced or None for a new log), or None if the
+    log already had `status`.  On PostgreSQL the replaced status comes back in
+    the same statement: the RETURNING subquery reads the statement's snapshot,
+    which still holds the old row.  SQLite's subquery would see the new row,
+    so there it is read beforehand.  Either read is current only because the
+    caller holds the slot's row lock.
+    """
+    dialect = session.get_bind().dialect.name
+    table = AttendanceLog.__table__
+    statement = dialect_insert(session, table).values(
+        slot_id=slot_id, date_log=on_date, status=status
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.slot_id, table.c.date_log],
+        set_={"status": statement.excluded.status},
+        where=table.c.status != statement.excluded.status,
+    )
+    if dialect == "postgresql":
+        old = table.alias("old")
+        previous = (
+            select(old.c.status)
+            .where(old.c.slot_id == slot_id, old.c.date_log == on_date)
+            .scalar_subquery()
+        )
+        row = session.execute(statement.returning(table.c.id, previous)).first()
+        return None if row is None else (row[0], row[1])
+    previous = session.exec(
+        select(AttendanceLog.status).where(
+            AttendanceLog.slot_id == slot_id, AttendanceLog.date_log == on_date
+        )
+    ).first()
+    row = session.execute(statement.returning(table.c.id)).first()
+    return None if row is None else (row[0], previous)
+
+
+def _add_to_stats(
+    session: Session,
+    user_id: int,
+    subject_code: str,
+    classType: ClassType,
+    total: int,
+    attended: int,
+):
+    """Add to the user's running counters for the subject in one upsert (creates the row if needed)."""
+    stats = AttendanceStats.__table__
+    statement = dialect_insert(session, stats).values(
+        user_id=user_id,
+        subject_code=subject_code,
+        classType=classType,
+        total_classes=total,
+        attended_classes=attended,
+    )
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[stats.c.user_id, stats.c.subject_code, stats.c.classType],
+            set_={
+                "total_classes": stats.c.total_classes
+                + statement.excluded.total_classes,
+                "attended_classes": stats.c.attended_classes
+                + statement.excluded.attended_classes,
+            },
         )
-        session.add(attendance)
-    # If correcting a previous status, reverse its effect on the counters first
-    if previously_marked_log:
-        if previously_marked_log.status == AttendanceStatus.PRESENT:
-            attendance.attended_classes -= 1
-            attendance.total_classes -= 1
-        elif previously_marked_log.status == AttendanceStatus.ABSENT:
-            attendance.total_classes -= 1
-        elif previously_marked_log.status == AttendanceStatus.CANCELLED:
-            pass
-        session.delete(previously_marked_log)
-
-    # Create the new attendance log entry
-    attendance_log = AttendanceLog(
-        slot_id=slot.id,
-        status=status,
-        date_log=date_of_slot,
     )
-    # Apply the new status to the cumulative counters
-    if status == AttendanceStatus.PRESENT:
-        attendance.total_classes += 1
-        attendance.attended_classes += 1
-    elif status == AttendanceStatus.ABSENT:
-        attendance.total_classes += 1
-    elif status == AttendanceStatus.CANCELLED:
-        pass
-    else:
-        raise HTTPException(status_code=400, detail="Invalid attendance status")
-    session.add_all([attendance, attendance_log])
-    session.commit()
-    session.refresh(attendance_log)
-    session.refresh(attendance)
-    return attendance_log
 
 
 def get_attendance_logs(
@@ -225,7 +404,6 @@ def get_attendance_logs(
                 AttendanceLog.date_log == date,
             )
         )
-        print(logs)
         result = [
             {
                 "slot": slot.model_dump(mode="json"),
@@ -234,8 +412,57 @@ def get_attendance_logs(
             for slot, attendance in logs
         ]
     except Exception as e:
-        print(f"Error retrieving attendance logs: {e}")
+        logger.exception("Error retrieving attendance logs")
         raise HTTPException(
             status_code=500, detail="Failed to retrieve attendance logs"
         )
     return result
+
+
+from sqlalchemy import and_
+from backend.db.models import ChatID
+
+
+def get_reminder_audience(
+    day: DayEnum,
+    on_date: date,
+    session: Session = Depends(get_session),
+    adapter: str = "telegram",
+):
+    """
+    Return the users who still have unmarked regular slots on `on_date`.
+
+    One query: chat_ids ⋈ users ⋈ today's non-temporary timetable_slots, anti-joined
+    against attendance_logs for `on_date`.  Users who marked everything, or who
+    have no classes that day, are not returned.
+
+    Result: [{"contact_id", "name", "user_id", "slots": [TimetableSlots, ...]}, ...]
+    with each user's slots ordered by start time.
+    """
+    rows = session.exec(
+        select(ChatID.contact_id, User.name, TimetableSlots)
+        .join(User, ChatID.user_id == User.id)
+        .join(TimetableSlots, TimetableSlots.user_id == User.id)
+        .outerjoin(
+            AttendanceLog,
+            and_(
+                AttendanceLog.slot_id == TimetableSlots.id,
+                AttendanceLog.date_log == on_date,
+            ),
+        )
+        .where(
+            ChatID.adapter == adapter,
+            TimetableSlots.day == day,
+            TimetableSlots.is_temporary == False,
+            AttendanceLog.id.is_(None),
+        )
+        .order_by(ChatID.contact_id, TimetableSlots.start_time)
+    ).all()
+    audience = {}
+    for contact_id, name, slot in rows:
+        entry = audience.setdefault(
+            contact_id,
+            {"contact_id": contact_id, "name": name, "user_id": slot.user_id, "slots": []},
+        )
+        entry["slots"].append(slot)
+    return list(audience.values())
@@ -0,0 +1,73 @@
+"""
+A dedicated asyncio event loop running on a background thread.
+
+Most of the bot's pipeline runs on worker threads (update lanes, crons,
+FastAPI's threadpool), but its outbound I/O clients are async so that many
+requests can share one keep-alive connection pool.  `io_loop` is the single
+place those clients live: sync code hands it a coroutine and either waits
+for the result (`run`) or fires and forgets (`submit`).
+
+The loop thread is started lazily on first use and is a daemon, so scripts
+and one-off jobs can use the same clients without any setup.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class BackgroundLoop:
+    """An event loop on its own daemon thread, usable from any other thread."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    self._start()
+        return self._loop
+
+    def _start(self):
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=_run, name=self.name, daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._loop = loop
+
+    def in_loop_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro) -> Future:
+        """Schedule a coroutine on the loop and return a concurrent Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout: float | None = None):
+        """Run a coroutine on the loop and block the calling thread until it finishes."""
+        if self.in_loop_thread():
+            raise RuntimeError(f"{self.name}.run() called from its own loop thread")
+        return self.submit(coro).result(timeout)
+
+    async def run_async(self, coro):
+        """Await a coroutine on the loop from a different event loop."""
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def call_soon(self, fn, *args):
+        """Thread-safe `loop.call_soon` — schedule a plain callback on the loop."""
+        self.loop.call_soon_threadsafe(fn, *args)
+
+
+# Shared loop for outbound network clients (Telegram, LLM)
+io_loop = BackgroundLoop("io-loop")
@@ -0,0 +1,149 @@
+"""
+Concurrent, rate-limited, resumable broadcast engine.
+
+Used by the nightly reminder cron to message every Telegram user:
+
+- Sends run concurrently on the shared I/O loop through `TelegramClient`,
+  whose global limiter keeps the bot under Telegram's 30 msg/s cap.
+- A failure only affects its own recipient; everyone else still gets the message.
+- Every recipient's outcome is written to `broadcast_deliveries` in batches
+  while the run progresses.  Re-running the same run_key (e.g. triggering the
+  cron again after a crash) skips recipients that were already sent to.
+- Returns a report with sent / failed / skipped counts, duration and throughput.
+"""
+
+import logging
+import asyncio
+import time
+from datetime import datetime
+
+from sqlmodel import Session, select
+
+from backend.config import settings
+from backend.db.database import engine
+from backend.db.models import BroadcastDelivery
+from backend.adapters.telegram_client import TelegramClient, telegram_client
+from backend.utils import metrics
+from backend.utils.background_loop import BackgroundLoop, io_loop
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastEngine:
+    """Sends one message per recipient and records per-recipient progress."""
+
+    def __init__(
+        self,
+        client: TelegramClient,
+        io: BackgroundLoop,
+        concurrency: int = 20,
+        flush_every: int = 50,
+    ):
+        self.client = client
+        self.io = io
+        self.concurrency = max(1, concurrency)
+        self.flush_every = max(1, flush_every)
+
+    def run(self, run_key: str, messages: list[tuple[str, str, dict]]) -> dict:
+        """
+        Broadcast `messages` — a list of (contact_id, text, extra sendMessage params) —
+        under `run_key` and block until done.  Safe to call again with the same
+        run_key: recipients already sent to are skipped.
+        """
+        started = time.perf_counter()
+        with Session(engine) as session:
+            already_sent = set(
+                session.exec(
+                    select(BroadcastDelivery.contact_id).where(
+                        BroadcastDelivery.run_key == run_key,
+                        BroadcastDelivery.status == "sent",
+                    )
+                ).all()
+            )
+        pending = [m for m in messages if str(m[0]) not in already_sent]
+
+        results = self.io.run(self._send_all(run_key, pending))
+
+        duration = time.perf_counter() - started
+        sent = sum(1 for _, ok, _ in results if ok)
+        failed = len(results) - sent
+        report = {
+            "run_key": run_key,
+            "recipients": len(messages),
+            "skipped_already_sent": len(messages) - len(pending),
+            "sent": sent,
+            "failed": failed,
+            "duration_seconds": round(duration, 3),
+            "throughput_per_second": round(sent / duration, 2) if duration else 0.0,
+        }
+        metrics.histogram(
+            "broadcast_duration_seconds",
+            "Wall time of a broadcast run",
+            buckets=(1, 5, 15, 30, 60, 120, 300, 600),
+        ).observe(duration)
+        logger.info("Broadcast finished", extra=report)
+        return report
+
+    async def _send_all(self, run_key: str, messages) -> list:
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results, batch = [], []
+        flushes = []
+
+        async def _send_one(contact_id, text, params):
+            async with semaphore:
+                try:
+                    await self.client.send_message(contact_id, text, **params)
+                    outcome = (str(contact_id), True, None)
+                except Exception as e:
+                    outcome = (str(contact_id), False, str(e)[:500])
+                    logger.warning(
+                        "Broadcast %s: failed to send to %s: %s", run_key, contact_id, e
+                    )
+            metrics.counter(
+                "broadcast_messages_total",
+                "Broadcast sends by outcome",
+                outcome="sent" if outcome[1] else "failed",
+            ).inc()
+            results.append(outcome)
+            batch.append(outcome)
+            if len(batch) >= self.flush_every:
+                flushes.append(
+                    loop.run_in_executor(None, self._record, run_key, batch[:])
+                )
+                batch.clear()
+
+        await asyncio.gather(*(_send_one(*m) for m in messages))
+        if batch:
+            flushes.append(loop.run_in_executor(None, self._record, run_key, batch))
+        await asyncio.gather(*flushes)
+        return results
+
+    @staticmethod
+    def _record(run_key: str, outcomes: list):
+        """Upsert one batch of (contact_id, ok, error) outcomes for a run."""
+        with Session(engine) as session:
+            existing = {
+                row.contact_id: row
+                for row in session.exec(
+                    select(BroadcastDelivery).where(
+                        BroadcastDelivery.run_key == run_key,
+                        BroadcastDelivery.contact_id.in_([o[0] for o in outcomes]),
+                    )
+                ).all()
+            }
+            for contact_id, ok, error in outcomes:
+                row = existing.get(contact_id) or BroadcastDelivery(
+                    run_key=run_key, contact_id=contact_id
+                )
+                row.status = "sent" if ok else "failed"
+                row.error = error
+                row.attempted_at = datetime.utcnow()
+                session.add(row)
+            session.commit()
+
+
+# Shared engine used by the reminder cron
+broadcast_engine = BroadcastEngine(
+    telegram_client, io_loop, concurrency=settings.BROADCAST_CONCURRENCY
+)
@@ -0,0 +1,117 @@
+"""
+Idempotent webhook ingestion keyed on Telegram's update_id.
+
+When our worker is slow Telegram re-delivers the same update.  Every update_id
+is remembered for a while and repeats are dropped in the webhook, before any DB
+or LLM work happens.
+
+- Always backed by a bounded in-memory LRU (oldest ids are evicted first,
+  entries also expire after a TTL).
+- Optionally also backed by Redis (`SET key NX EX ttl`) so several workers
+  behind a load balancer share one view of what was already seen.
+
+Counters: update_dedup_total{result="hit"} is the number of duplicate
+pipelines (LLM calls, pending actions, replies) that were skipped.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi.concurrency import run_in_threadpool
+
+from backend.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDeduplicator:
+    """Remembers recently seen update ids in memory and, optionally, in Redis."""
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        redis_client=None,
+        key_prefix: str = "telegram:update:",
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self._seen: OrderedDict = OrderedDict()  # update_id -> expiry timestamp
+        self._lock = threading.Lock()
+
+    def _check_local(self, update_id) -> bool:
+        """Return True if update_id is in the local window, otherwise record it."""
+        now = time.monotonic()
+        with self._lock:
+            expiry = self._seen.get(update_id)
+            if expiry is not None and expiry > now:
+                return True
+            self._seen[update_id] = now + self.ttl_seconds
+            self._seen.move_to_end(update_id)
+            # Evict expired entries from the front, then enforce the size bound
+            while self._seen:
+                oldest_id, oldest_expiry = next(iter(self._seen.items()))
+                if oldest_expiry > now and len(self._seen) <= self.max_size:
+                    break
+                self._seen.popitem(last=False)
+            return False
+
+    def _check_shared(self, update_id) -> bool:
+        """Return True if another worker already claimed update_id in Redis."""
+        try:
+            claimed = self.redis_client.set(
+                f"{self.key_prefix}{update_id}",
+                1,
+                nx=True,
+                ex=max(1, int(self.ttl_seconds)),
+            )
+            return not claimed
+        except Exception as e:
+            # A Redis outage must not stop the bot; fall back to local-only dedup
+            logger.warning("Redis dedup check failed, using local window only: %s", e)
+            return False
+
+    async def is_duplicate(self, update_id) -> bool:
+        """Return True (and count a hit) if this update_id was already seen."""
+        if update_id is None:
+            return False
+        duplicate = self._check_local(update_id)
+        if not duplicate and self.redis_client is not None:
+            duplicate = await run_in_threadpool(self._check_shared, update_id)
+        metrics.counter(
+            "update_dedup_total",
+            "Webhook updates checked for duplicates",
+            result="hit" if duplicate else "miss",
+        ).inc()
+        return duplicate
+
+    def _forget_shared(self, update_id):
+        try:
+            self.redis_client.delete(f"{self.key_prefix}{update_id}")
+        except Exception as e:
+            logger.warning("Redis dedup forget failed: %s", e)
+
+    async def forget(self, update_id):
+        """Drop an id again, e.g. when the update was rejected and Telegram will retry it."""
+        if update_id is None:
+            return
+        with self._lock:
+            self._seen.pop(update_id, None)
+        if self.redis_client is not None:
+            await run_in_threadpool(self._forget_shared, update_id)
+
+    def stats(self) -> dict:
+        hits = int(metrics.counter("update_dedup_total", result="hit").value)
+        misses = int(metrics.counter("update_dedup_total", result="miss").value)
+        total = hits + misses
+        return {
+            "backend": "redis" if self.redis_client is not None else "memory",
+            "tracked": len(self._seen),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,301 @@
+"""
+Deterministic fast-path parser for common phrasings.
+
+Runs in `read_main` before the LLM call.  Messages like
+
+    "attended DC lecture today"
+    "bunked BDA lab on Monday"
+    "show timetable for tue"
+    "attendance stats for DC"
+
+are built into an `LLMMultiResponse` directly from a small grammar: the
+user's own subject codes, the ClassType / AttendanceStatus vocabularies,
+weekday names and the dates already resolved by
+`extract_dates_from_shift_message`.
+
+The parser only answers when it is confident:
+- every word in the message is part of the grammar (anything else → LLM),
+- every number or month name is part of a date `extract_dates_from_shift_message`
+  resolved ("on 17th", "in march" alone → LLM) and no time is mentioned,
+- exactly one intent, one subject, one status and at most one date,
+- for attendance, exactly one matching slot in the user's timetable
+  (temporary-slot cases are left to the LLM).
+
+Otherwise it returns None and the caller falls back to the LLM.
+"""
+
+import re
+from datetime import date, timedelta
+
+from backend.db.models import (
+    AttendanceStatus,
+    ClassType,
+    DayEnum,
+    IntentEnum,
+    LLMMultiResponse,
+    LLMResponseSchema,
+    Params,
+)
+
+_STATUS_WORDS = {
+    "attended": AttendanceStatus.PRESENT,
+    "attend": AttendanceStatus.PRESENT,
+    "present": AttendanceStatus.PRESENT,
+    "went": AttendanceStatus.PRESENT,
+    "joined": AttendanceStatus.PRESENT,
+    "bunked": AttendanceStatus.ABSENT,
+    "bunk": AttendanceStatus.ABSENT,
+    "missed": AttendanceStatus.ABSENT,
+    "skipped": AttendanceStatus.ABSENT,
+    "skip": AttendanceStatus.ABSENT,
+    "absent": AttendanceStatus.ABSENT,
+    "cancelled": AttendanceStatus.CANCELLED,
+    "canceled": AttendanceStatus.CANCELLED,
+    "cancel": AttendanceStatus.CANCELLED,
+}
+
+_CLASS_TYPE_WORDS = {
+    "lecture": ClassType.LECTURE,
+    "lec": ClassType.LECTURE,
+    "lect": ClassType.LECTURE,
+    "theory": ClassType.LECTURE,
+    "lab": ClassType.LAB,
+    "practical": ClassType.LAB,
+    "prac": ClassType.LAB,
+    "tutorial": ClassType.TUTORIAL,
+    "tut": ClassType.TUTORIAL,
+}
+
+_DAY_WORDS = {
+    "mon": DayEnum.MON,
+    "monday": DayEnum.MON,
+    "tue": DayEnum.TUE,
+    "tues": DayEnum.TUE,
+    "tuesday": DayEnum.TUE,
+    "wed": DayEnum.WED,
+    "wednesday": DayEnum.WED,
+    "thu": DayEnum.THU,
+    "thur": DayEnum.THU,
+    "thurs": DayEnum.THU,
+    "thursday": DayEnum.THU,
+    "fri": DayEnum.FRI,
+    "friday": DayEnum.FRI,
+    "sat": DayEnum.SAT,
+    "saturday": DayEnum.SAT,
+    "sun": DayEnum.SUN,
+    "sunday": DayEnum.SUN,
+}
+
+_TIMETABLE_WORDS = {"timetable", "schedule"}
+_STATS_WORDS = {"stats", "statistics", "percentage", "summary"}
+
+# Words that carry no meaning for the intent but are allowed to appear
+_FILLER_WORDS = set(
+    """
+    i my me the a an for of in at on to class classes session was were is have
+    had has please pls mark as it just show get what whats see view display give
+    tell all attendance got been today tomorrow yesterday next last this s
+    """.split()
+)
+# Only allowed as part of a date the extractor resolved
+_MONTH_WORDS = set(
+    """
+    january february march april may june july august september october november
+    december jan feb mar apr jun jul aug sep sept oct nov dec
+    """.split()
+)
+
+# More than one instruction in a message → let the LLM split it
+_MULTI_INTENT = re.compile(r"[,;&+]|\b(?:and|also|then|plus)\b")
+# Explicit times may disagree with the timetable — leave those to the LLM
+_TIME_MENTION = re.compile(
+    r"\d{1,2}[:.]\d{2}|\b\d{1,2}\s*(?:am|pm)\b|\bat\s+\d{1,2}\b"  # 9:30, 9am, at 9
+)
+_NEGATED_ATTEND = re.compile(
+    r"\b(?:didn'?t|did not|couldn'?t|could not|never|not)\s+(?:attend|go|make it)\b(?:\s+to)?"
+)
+_NUMBER_TOKEN = re.compile(r"^\d{1,2}(?:st|nd|rd|th)?$|^\d{4}$")
+
+_DAY_NAMES = {
+    DayEnum.MON: "Monday",
+    DayEnum.TUE: "Tuesday",
+    DayEnum.WED: "Wednesday",
+    DayEnum.THU: "Thursday",
+    DayEnum.FRI: "Friday",
+    DayEnum.SAT: "Saturday",
+    DayEnum.SUN: "Sunday",
+}
+
+_STATUS_VERBS = {
+    AttendanceStatus.PRESENT: "attended",
+    AttendanceStatus.ABSENT: "bunked",
+    AttendanceStatus.CANCELLED: "cancelled",
+}
+
+
+def looks_multi_intent(message: str, extracted: list) -> bool:
+    """Heuristic: does the message seem to carry more than one instruction?"""
+    return bool(_MULTI_INTENT.search(message.lower())) or "\n" in message.strip() or len(extracted) > 1
+
+
+def _most_recent(day: DayEnum, today: date) -> date:
+    """The latest date on or before `today` that falls on `day`."""
+    target = list(DayEnum).index(day)
+    return today - timedelta(days=(today.weekday() - target) % 7)
+
+
+def _is_bare_weekday(text: str) -> bool:
+    return text.strip().lower() in _DAY_WORDS
+
+
+def parse_fast_path(
+    message: str,
+    slots: list,
+    extracted: list,
+    today: date | None = None,
+) -> LLMMultiResponse | None:
+    """
+    Try to parse `message` without the LLM.
+
+    `slots` are the user's regular TimetableSlots; `extracted` is the output of
+    `extract_dates_from_shift_message(message)`.  Returns an LLMMultiResponse
+    when confident, otherwise None.
+    """
+    today = today or date.today()
+    text = message.strip().lower()
+    if not text or looks_multi_intent(text, extracted) or _TIME_MENTION.search(text):
+        return None
+    text = _NEGATED_ATTEND.sub(" missed ", text)
+    tokens = [t.removesuffix("'s") for t in re.findall(r"[a-z0-9']+", text)]
+
+    subject_codes = {slot.subject_code.lower(): slot.subject_code for slot in slots}
+    # Numbers and months are fine inside a resolved date ("17th October"), but
+    # on their own ("on 17th", "in march") the date would silently become today
+    resolved = set(re.findall(r"[a-z0-9]+", " ".join(m for m, _ in extracted).lower()))
+    statuses, class_types, subjects, days = set(), set(), set(), set()
+    has_timetable = has_stats = False
+    for token in tokens:
+        if token in _STATUS_WORDS:
+            statuses.add(_STATUS_WORDS[token])
+        elif token in _CLASS_TYPE_WORDS:
+            class_types.add(_CLASS_TYPE_WORDS[token])
+        elif token in subject_codes:
+            subjects.add(subject_codes[token])
+        elif token in _DAY_WORDS:
+            days.add(_DAY_WORDS[token])
+        elif token in _TIMETABLE_WORDS:
+            has_timetable = True
+        elif token in _STATS_WORDS:
+            has_stats = True
+        elif token in _FILLER_WORDS:
+            continue
+        elif token in _MONTH_WORDS or _NUMBER_TOKEN.match(token):
+            if token not in resolved:
+                return None  # Part of a date we could not resolve
+        else:
+            return None  # Unknown word — not confident
+
+    if len(statuses) > 1 or len(class_types) > 1 or len(subjects) > 1 or len(days) > 1:
+        return None
+    if sum([bool(statuses), has_timetable, has_stats]) != 1:
+        return None
+
+    subject = next(iter(subjects), None)
+    class_type = next(iter(class_types), None)
+    parsed_date = extracted[0][1].date() if extracted else None
+    day = next(iter(days), None)
+    if parsed_date and day and DayEnum(parsed_date.strftime("%a")) != day:
+        return None
+
+    if has_timetable:
+        if subject or class_type:
+            return None
+        if parsed_date:
+            day = DayEnum(parsed_date.strftime("%a"))
+        day = day or DayEnum(today.strftime("%a"))
+        return LLMMultiResponse(
+            actions=[
+                LLMResponseSchema(
+                    intent=IntentEnum.GET_DAILY_TIMETABLE,
+                    method="GET",
+                    params=Params(day_of_slot=day, date_of_slot=parsed_date),
+                )
+            ],
+            confirmation_message=f"Fetch your timetable for {_DAY_NAMES[day]}. Confirm?",
+        )
+
+    if has_stats:
+        if parsed_date or day:
+            return None
+        if not subject:
+            class_types = [class_type] if class_type else [None]
+        elif class_type:
+            class_types = [class_type]
+        else:
+            # Filtering by subject needs a class type: one action per type in the timetable
+            class_types = sorted(
+                {slot.class_type for slot in slots if slot.subject_code == subject},
+                key=list(ClassType).index,
+            )
+        target = subject or "all subjects"
+        if class_type:
+            target = f"{target} {class_type.value}"
+        return LLMMultiResponse(
+            actions=[
+                LLMResponseSchema(
+                    intent=IntentEnum.GET_ATTENDANCE_STATS,
+                    method="GET",
+                    params=Params(subject_code=subject, classType=ct),
+                )
+                for ct in class_types
+            ],
+            confirmation_message=f"Fetch attendance stats for {target}. Confirm?",
+        )
+
+    # --- mark_attendance ---
+    if not subject:
+        return None
+    if parsed_date is None:
+        parsed_date = _most_recent(day, today) if day else today
+    elif _is_bare_weekday(extracted[0][0]):
+        # "bunked BDA lab on Monday" is about the last Monday, not the next one
+        parsed_date = _most_recent(DayEnum(parsed_date.strftime("%a")), today)
+    if parsed_date > today:
+        return None
+    day = DayEnum(parsed_date.strftime("%a"))
+    matches = [
+        slot
+        for slot in slots
+        if slot.day == day
+        and slot.subject_code == subject
+        and (class_type is None or slot.class_type == class_type)
+    ]
+    if len(matches) != 1:
+        return None  # Not in timetable (temporary slot) or ambiguous — let the LLM decide
+    slot = matches[0]
+    status = next(iter(statuses))
+    start, end = slot.start_time.strftime("%H:%M"), slot.end_time.strftime("%H:%M")
+    return LLMMultiResponse(
+        actions=[
+            LLMResponseSchema(
+                intent=IntentEnum.MARK_ATTENDANCE,
+                method="POST",
+                params=Params(
+                    slot_id=slot.id,
+                    subject_code=slot.subject_code,
+                    date_of_slot=parsed_date,
+                    day_of_slot=day,
+                    start_time=slot.start_time,
+                    end_time=slot.end_time,
+                    status=status,
+                    classType=slot.class_type,
+                ),
+            )
+        ],
+        confirmation_message=(
+            f"Mark {slot.subject_code} {slot.class_type.value} on "
+            f"{parsed_date.strftime('%A, %d %B %Y')} ({start}-{end}) as "
+            f"{_STATUS_VERBS[status]}. Confirm?"
+        ),
+    )
+
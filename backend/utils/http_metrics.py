@@ -0,0 +1,64 @@
+"""
+Request count and latency per router.
+
+`RequestMetricsMiddleware` is a plain ASGI middleware (no request/response
+wrapping, unlike `@app.middleware("http")`), so the per-request cost is one
+prefix match, a counter increment, a histogram observation and the query
+profile below:
+
+    http_requests_total{router="/index", method="GET", status="2xx"}
+    http_request_seconds{router="/index"}
+
+Requests are labelled by router prefix rather than path, which keeps the
+number of series fixed no matter what paths clients hit.  Each request is
+also a query-profiling scope (backend/db/profiling.py) with the same label.
+"""
+
+import time
+
+from backend.db.profiling import profile_queries
+from backend.utils import metrics
+
+# Longest prefix first; anything else (root health check, cron routes, 404s) is "other"
+ROUTER_PREFIXES = ("/adapters/telegram", "/attendance", "/metrics", "/index", "/users")
+
+
+def router_label(path: str) -> str:
+    for prefix in ROUTER_PREFIXES:
+        if path == prefix or path.startswith(prefix + "/"):
+            return prefix
+    return "other"
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500  # If the app raises before responding
+        router = router_label(scope["path"])
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            with profile_queries(router):
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.counter(
+                "http_requests_total",
+                "HTTP requests by router, method and status class",
+                router=router,
+                method=scope["method"],
+                status=f"{status // 100}xx",
+            ).inc()
+            metrics.histogram(
+                "http_request_seconds", "HTTP request latency by router", router=router
+            ).observe(time.perf_counter() - started)
@@ -0,0 +1,147 @@
+"""
+Response cache in front of the LLM call in `read_main`.
+
+Students send near-identical messages all day ("attended DC lecture today",
+"I attended my DC lecture today").  A validated `LLMMultiResponse` is reused
+when all of these match:
+
+- the normalized message (lower-cased, punctuation and filler words removed),
+- the version of the user's weekly timetable (WeeklyContext.version), so any
+  slot change produces new keys,
+- the concrete dates `extract_dates_from_shift_message` resolved, plus
+  today's date (relative words like "today" resolve differently tomorrow).
+
+Users with identical timetables share entries.  Responses that set
+confusion_flag are never cached.
+
+- Always backed by a bounded in-memory LRU with a TTL.
+- Optionally also backed by Redis (LLM_CACHE_BACKEND="redis"), so several
+  workers share one cache.
+
+Counters: llm_cache_total{result="hit"|"miss"}.
+"""
+
+import logging
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from backend.db.models import LLMMultiResponse
+from backend.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Words that don't change what the user is asking for
+_FILLER_WORDS = set(
+    "i my the a an please pls kindly just hey hi hello can could would you me for".split()
+)
+
+
+def normalize_message(message: str) -> str:
+    """Lower-case, strip punctuation and filler words, collapse whitespace."""
+    words = re.findall(r"[a-z0-9:]+", message.lower().replace("'", ""))
+    return " ".join(w for w in words if w not in _FILLER_WORDS)
+
+
+def cache_key(message: str, timetable_version: str, extracted: list, today: date | None = None) -> str:
+    """Key for a message given the user's timetable version and resolved dates."""
+    today = today or date.today()
+    dates = ",".join(d.strftime("%Y-%m-%d") for _, d in extracted)
+    raw = f"{normalize_message(message)}|{timetable_version}|{dates}|{today.isoformat()}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """LRU + TTL cache of validated LLM responses, in memory and optionally in Redis."""
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        redis_client=None,
+        key_prefix: str = "llm:response:",
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self._entries: OrderedDict = OrderedDict()  # key -> (expiry, response dict)
+        self._lock = threading.Lock()
+
+    def _get_local(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _put_local(self, key: str, payload: dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _get_shared(self, key: str):
+        try:
+            raw = self.redis_client.get(f"{self.key_prefix}{key}")
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            # A Redis outage must not stop the bot; behave like a miss
+            logger.warning("Redis LLM cache read failed: %s", e)
+            return None
+
+    def _put_shared(self, key: str, payload: dict):
+        try:
+            self.redis_client.set(
+                f"{self.key_prefix}{key}",
+                json.dumps(payload),
+                ex=max(1, int(self.ttl_seconds)),
+            )
+        except Exception as e:
+            logger.warning("Redis LLM cache write failed: %s", e)
+
+    def get(self, key: str) -> LLMMultiResponse | None:
+        """Return a fresh copy of the cached response, or None (and count the lookup)."""
+        payload = self._get_local(key)
+        if payload is None and self.redis_client is not None:
+            payload = self._get_shared(key)
+            if payload is not None:
+                self._put_local(key, payload)
+        metrics.counter(
+            "llm_cache_total",
+            "LLM response cache lookups",
+            result="hit" if payload is not None else "miss",
+        ).inc()
+        # Validate into a new model every time: perform_intent mutates params
+        return LLMMultiResponse.model_validate(payload) if payload is not None else None
+
+    def put(self, key: str, review: LLMMultiResponse):
+        """Cache a response unless the LLM flagged part of it as ambiguous."""
+        if any(item.params.confusion_flag for item in review.actions):
+            return
+        payload = review.model_dump(mode="json")
+        self._put_local(key, payload)
+        if self.redis_client is not None:
+            self._put_shared(key, payload)
+
+    def stats(self) -> dict:
+        hits = int(metrics.counter("llm_cache_total", result="hit").value)
+        misses = int(metrics.counter("llm_cache_total", result="miss").value)
+        total = hits + misses
+        return {
+            "backend": "redis" if self.redis_client is not None else "memory",
+            "entries": len(self._entries),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,226 @@
+"""
+Lightweight in-process metrics.
+
+Counters, gauges and histograms that the hot paths (webhook, workers, LLM,
+Telegram I/O) update directly.  Everything lives in process memory and an
+update is a lock plus a few integer operations, so it is cheap enough to
+leave on in production.
+
+Metrics are identified by name + labels and created on first use:
+
+    counter("webhook_updates_total", outcome="queued").inc()
+    histogram("queue_wait_seconds").observe(0.012)
+    gauge("queue_depth", fn=lambda: q.qsize())
+
+Histograms keep Prometheus-style cumulative buckets plus a bounded reservoir
+of recent samples for p50/p95/p99 reporting.  `render_prometheus()` renders
+everything in the Prometheus text format (served on /metrics).
+"""
+
+import bisect
+import threading
+from collections import deque
+
+# Upper bounds (seconds) used for latency histograms unless overridden
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+_lock = threading.Lock()
+_metrics: dict = {}  # (kind, name, labels) -> metric
+_descriptions: dict = {}  # name -> help text
+
+
+class Counter:
+    """A monotonically increasing value."""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Gauge:
+    """A value that can go up and down, or is computed on read via `fn`."""
+
+    def __init__(self, fn=None):
+        self._value = 0.0
+        self._fn = fn
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    @property
+    def value(self) -> float:
+        if self._fn is not None:
+            try:
+                return float(self._fn())
+            except Exception:
+                return float("nan")
+        return self._value
+
+
+class Histogram:
+    """Bucketed distribution plus a reservoir of recent samples for percentiles."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, reservoir: int = 2048):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._recent = deque(maxlen=reservoir)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+            if value > self._max:
+                self._max = value
+            self._recent.append(value)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def cumulative_buckets(self):
+        """Return [(upper_bound, cumulative_count), ...] ending with +Inf."""
+        with self._lock:
+            counts = list(self._counts)
+        result, running = [], 0
+        for bound, c in zip(self.buckets + (float("inf"),), counts):
+            running += c
+            result.append((bound, running))
+        return result
+
+    def percentile(self, q: float) -> float | None:
+        """Return the q-th percentile (0-100) of recent samples, or None if empty."""
+        with self._lock:
+            samples = sorted(self._recent)
+        if not samples:
+            return None
+        idx = min(len(samples) - 1, max(0, round(q / 100 * (len(samples) - 1))))
+        return samples[idx]
+
+    def snapshot(self) -> dict:
+        """Summary suitable for JSON stats endpoints and benchmark reports."""
+        return {
+            "count": self._count,
+            "sum": round(self._sum, 6),
+            "max": round(self._max, 6),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+def _get_or_create(kind, name, description, labels, factory):
+    key = (kind, name, tuple(sorted(labels.items())))
+    metric = _metrics.get(key)
+    if metric is None:
+        with _lock:
+            metric = _metrics.get(key)
+            if metric is None:
+                metric = factory()
+                _metrics[key] = metric
+                if description:
+                    _descriptions.setdefault(name, description)
+    return metric
+
+
+def counter(name: str, description: str = "", **labels) -> Counter:
+    """Get or create the counter identified by name + labels."""
+    return _get_or_create("counter", name, description, labels, Counter)
+
+
+def gauge(name: str, description: str = "", fn=None, **labels) -> Gauge:
+    """Get or create a gauge. If `fn` is given it is called on every read."""
+    return _get_or_create("gauge", name, description, labels, lambda: Gauge(fn))
+
+
+def histogram(
+    name: str, description: str = "", buckets=DEFAULT_BUCKETS, **labels
+) -> Histogram:
+    """Get or create the histogram identified by name + labels."""
+    return _get_or_create(
+        "histogram", name, description, labels, lambda: Histogram(buckets)
+    )
+
+
+def collect():
+    """Return a list of (kind, name, labels_dict, metric) for every metric."""
+    with _lock:
+        items = list(_metrics.items())
+    return [(kind, name, dict(labels), m) for (kind, name, labels), m in items]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if value == int(value) else repr(float(value))
+
+
+def render_prometheus() -> str:
+    """Render every metric in the Prometheus text exposition format (version 0.0.4)."""
+    lines, declared = [], set()
+    for kind, name, labels, metric in sorted(
+        collect(), key=lambda item: (item[1], sorted(item[2].items()))
+    ):
+        if name not in declared:
+            declared.add(name)
+            if name in _descriptions:
+                lines.append(f"# HELP {name} {_descriptions[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+        if kind == "histogram":
+            for bound, count in metric.cumulative_buckets():
+                bucket_labels = {**labels, "le": _format_value(bound)}
+                lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {metric.sum}")
+            lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+        else:
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(metric.value)}")
+    return "\n".join(lines) + "\n"
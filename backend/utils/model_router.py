@@ -0,0 +1,120 @@
+"""
+Tiered model routing for intent parsing.
+
+Most messages are simple, single-intent requests that a small model handles
+well, so `ModelRouter.parse` tries the provider's "small" model first (e.g.
+openai/gpt-oss-20b on Groq) and only escalates to its "large" model when:
+
+- the small model's output fails `LLMMultiResponse` validation, is rejected by
+  the provider as not matching the schema, or has no actions,
+- any action sets `params.confusion_flag`,
+- the small tier errors or misses its (shorter) deadline.
+
+Messages that look multi-intent (connectors like "and"/"then", several
+dates, several lines) skip the small tier and go straight to the large model.
+
+Each tier's traffic share, latency and the escalation reasons are counted
+(llm_tier_total, llm_tier_seconds, llm_escalations_total) and summarised by
+`stats()` so the thresholds can be tuned.
+"""
+
+import logging
+import time
+
+from pydantic import ValidationError
+
+from backend.adapters.llm_gateway import LLMUnavailable
+from backend.db.models import LLMMultiResponse
+from backend.utils import metrics, tracing
+from backend.utils.background_loop import BackgroundLoop
+from backend.utils.fast_parser import looks_multi_intent
+
+logger = logging.getLogger(__name__)
+
+TIERS = ("small", "large")
+ESCALATION_REASONS = ("multi_intent", "invalid", "empty", "confusion", "unavailable")
+
+
+class ModelRouter:
+    """Small model first, large model when the small one isn't good enough."""
+
+    def __init__(
+        self,
+        provider,
+        io: BackgroundLoop,
+        small_timeout_seconds: float | None = None,
+        enabled: bool = True,
+    ):
+        self.provider = provider  # LLMProvider or HedgedProvider (backend/adapters/llm_providers.py)
+        self.io = io
+        self.small_timeout_seconds = small_timeout_seconds
+        self.enabled = enabled
+
+    def parse(self, messages: list, user_message: str, extracted: list) -> LLMMultiResponse:
+        """Return a validated LLMMultiResponse; raises LLMUnavailable if no tier answers."""
+        if not self.enabled:
+            return self._call("large", messages)
+
+        if looks_multi_intent(user_message, extracted):
+            reason = "multi_intent"
+        else:
+            try:
+                review = self._call("small", messages, self.small_timeout_seconds)
+            except (ValidationError, ValueError):  # Includes InvalidModelOutput
+                reason = "invalid"
+            except LLMUnavailable as e:
+                if e.reason == "circuit_open":
+                    raise  # Same provider — the large tier would be rejected too
+                reason = "unavailable"
+            else:
+                if not review.actions:
+                    reason = "empty"
+                elif any(item.params.confusion_flag for item in review.actions):
+                    reason = "confusion"
+                else:
+                    return review
+
+        metrics.counter(
+            "llm_escalations_total", "Messages sent to the large model", reason=reason
+        ).inc()
+        tracing.set_attributes(escalation=reason)
+        logger.info(
+            "Escalating to %s",
+            self.provider.models["large"],
+            extra={"reason": reason},
+        )
+        return self._call("large", messages)
+
+    def _call(self, tier: str, messages: list, deadline: float | None = None):
+        metrics.counter("llm_tier_total", "LLM calls per model tier", tier=tier).inc()
+        tracing.add_counts(**{f"{tier}_calls": 1})
+        started = time.perf_counter()
+        try:
+            return self.io.run(self.provider.parse(messages, tier, deadline))
+        finally:
+            metrics.histogram(
+                "llm_tier_seconds", "LLM call latency per model tier", tier=tier
+            ).observe(time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        calls = {t: metrics.counter("llm_tier_total", tier=t).value for t in TIERS}
+        escalations = {
+            r: int(metrics.counter("llm_escalations_total", reason=r).value)
+            for r in ESCALATION_REASONS
+        }
+        total = sum(calls.values())
+        small = calls["small"]
+        # Escalations after a small-model attempt, relative to small-model calls
+        after_small = sum(v for r, v in escalations.items() if r != "multi_intent")
+        return {
+            "enabled": self.enabled,
+            "provider": self.provider.name,
+            "models": self.provider.models,
+            "share": {t: round(c / total, 4) if total else 0.0 for t, c in calls.items()},
+            "calls": {t: int(c) for t, c in calls.items()},
+            "escalation_rate": round(after_small / small, 4) if small else 0.0,
+            "escalations": escalations,
+            "latency_seconds": {
+                t: metrics.histogram("llm_tier_seconds", tier=t).snapshot() for t in TIERS
+            },
+        }
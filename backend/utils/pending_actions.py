@@ -6,12 +6,18 @@ Before executing any LLM-parsed intent, the bot stores it as a PendingAction
 Pending actions expire automatically after 5 minutes.
 """
 
+import logging
 from fastapi import Depends, HTTPException
+from sqlalchemy import case, func
 from sqlmodel import Session, select
 from datetime import datetime
-from backend.db.database import get_session
+import time
+from backend.db.database import engine, get_session
 from backend.db.models import PendingAction
 from backend.routers.index import LLMMultiResponse
+from backend.utils import metrics
+
+logger = logging.getLogger(__name__)
 
 
 def create_pending_action(
@@ -19,8 +25,13 @@ def create_pending_action(
     review: LLMMultiResponse,
     confirmation_message: str,
     session: Session,
+    plan: list[dict] | None = None,
 ):
-    """Store a new pending action, cancelling any existing one for this user."""
+    """
+    Store a new pending action, cancelling any existing one for this user.
+
+    `plan` (from `plan_actions`) is stored under intent_json["plan"].
+    """
     if not contact_id:
         raise HTTPException(status_code=400, detail="Missing contact_id")
     if not review:
@@ -29,12 +40,15 @@ def create_pending_action(
         raise HTTPException(status_code=400, detail="Missing confirmation_message")
     existing_pending = get_pending_action(contact_id, session)
     if existing_pending:
-        print("Existing pending action found, cancelling it:", existing_pending)
+        logger.debug(
+            "Cancelling superseded pending action",
+            extra={"pending_action_id": existing_pending.id},
+        )
         cancel_pending_action(existing_pending, session)
 
     pending = PendingAction(
         contact_id=contact_id,
-        intent_json=review.model_dump(mode="json"),
+        intent_json={**review.model_dump(mode="json"), "plan": plan},
         confirmation_message=confirmation_message,
         status="pending",
     )
@@ -84,3 +98,39 @@ def cancel_pending_action(
 
     session.add(pending)
     session.commit()
+
+
+def count_pending_actions(session: Session) -> dict:
+    """
+    Actions still in status 'pending': `active` ones await a reply, `expired`
+    ones timed out without one.  One aggregate query over the status index.
+    """
+    now = datetime.utcnow()
+    total, active = session.exec(
+        select(
+            func.count(),
+            func.coalesce(func.sum(case((PendingAction.expires_at > now, 1), else_=0)), 0),
+        ).where(PendingAction.status == "pending")
+    ).one()
+    return {"active": active, "expired": total - active}
+
+
+_scraped = {"at": 0.0, "counts": {"active": 0, "expired": 0}}
+
+
+def _scrape_pending_count(state: str) -> int:
+    # Both gauges are read in the same scrape; share one query between them
+    if time.monotonic() - _scraped["at"] > 1.0:
+        with Session(engine) as session:
+            _scraped["counts"] = count_pending_actions(session)
+        _scraped["at"] = time.monotonic()
+    return _scraped["counts"][state]
+
+
+for _state in ("active", "expired"):
+    metrics.gauge(
+        "pending_actions",
+        "Pending actions awaiting a yes/no reply (active) or expired unanswered",
+        fn=lambda state=_state: _scrape_pending_count(state),
+        state=_state,
+    )
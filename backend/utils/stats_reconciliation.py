@@ -0,0 +1,204 @@
+"""
+Rebuild AttendanceStats from attendance_logs and repair drift.
+
+`mark_attendance` keeps the counters incrementally, so a bug or a failed
+write would leave them wrong for good.  `reconcile_attendance_stats`
+recomputes every counter from the logs with one aggregate query
+(attendance_logs ⋈ timetable_slots, grouped by user, subject and class
+type), diffs that against the stored rows and writes only the rows that
+differ, in batches:
+
+- drifted: stored counters differ from the recount  -> batched UPDATE
+- missing: the logs have counts but there is no row  -> batched INSERT
+- orphaned: a row has counts but no logs back them
+
+Counters are only raised by default.  Deleting a timetable slot deletes its
+logs (ON DELETE CASCADE), so a recount below the stored counters is usually
+history that no longer has logs rather than an error: such rows, orphans
+included, are reported as held and only lowered with `lower_counts`.
+
+Each UPDATE only applies if the row still holds the values that were read,
+so a mark committed while the job runs is never overwritten; that row is
+counted as skipped and checked again on the next run.
+
+Run on demand through POST /attendance/reconcile_stats, and by the
+`stats_reconcile` cron when STATS_RECONCILE_CRON is set.
+"""
+
+import logging
+import time
+
+from sqlalchemy import and_, bindparam, case, func, update
+from sqlmodel import Session, select
+
+from backend.config import settings
+from backend.db.database import dialect_insert
+from backend.db.models import (
+    AttendanceLog,
+    AttendanceStats,
+    AttendanceStatus,
+    TimetableSlots,
+)
+from backend.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def recount_attendance_stats(session: Session) -> dict:
+    """(user_id, subject_code, classType) -> (total_classes, attended_classes), from the logs."""
+    counted = AttendanceLog.status.in_([AttendanceStatus.PRESENT, AttendanceStatus.ABSENT])
+    present = AttendanceLog.status == AttendanceStatus.PRESENT
+    rows = session.exec(
+        select(
+            TimetableSlots.user_id,
+            TimetableSlots.subject_code,
+            TimetableSlots.class_type,
+            func.sum(case((counted, 1), else_=0)),
+            func.sum(case((present, 1), else_=0)),
+        )
+        .join(AttendanceLog, AttendanceLog.slot_id == TimetableSlots.id)
+        .group_by(
+            TimetableSlots.user_id, TimetableSlots.subject_code, TimetableSlots.class_type
+        )
+    ).all()
+    return {
+        (user_id, subject_code, class_type): (total, attended)
+        for user_id, subject_code, class_type, total, attended in rows
+    }
+
+
+def reconcile_attendance_stats(
+    session: Session, dry_run: bool = False, lower_counts: bool = False
+) -> dict:
+    """
+    Make AttendanceStats rows match a recount of the logs.
+
+    Rows the recount would lower (including orphans) are left alone and
+    counted as held unless `lower_counts` is set.  With `dry_run`, only
+    reports what would change.  Returns the drift counts, e.g.
+    {"rows_checked": 160000, "drifted": 3, "missing": 0, "orphaned": 1,
+    "held": 1, "updated": 3, "inserted": 0, "skipped": 0, ...}.
+    """
+    started = time.perf_counter()
+    stats = AttendanceStats.__table__
+    # Stored rows first, recount second: a mark committed in between makes
+    # the guarded UPDATE below skip that row instead of overwriting it
+    stored = {
+        (user_id, subject_code, class_type): (row_id, total, attended)
+        for row_id, user_id, subject_code, class_type, total, attended in session.exec(
+            select(
+                AttendanceStats.id,
+                AttendanceStats.user_id,
+                AttendanceStats.subject_code,
+                AttendanceStats.classType,
+                AttendanceStats.total_classes,
+                AttendanceStats.attended_classes,
+            )
+        ).all()
+    }
+    expected = recount_attendance_stats(session)
+
+    changes, missing, drifted, orphaned, held = [], [], 0, 0, 0
+    for key, (row_id, total, attended) in stored.items():
+        counts = expected.get(key, (0, 0))
+        if counts != (total, attended):
+            if key in expected:
+                drifted += 1
+            else:
+                orphaned += 1
+            if not lower_counts and (counts[0] < total or counts[1] < attended):
+                held += 1
+                continue
+            changes.append(
+                {
+                    "row_id": row_id,
+                    "old_total": total,
+                    "old_attended": attended,
+                    "new_total": counts[0],
+                    "new_attended": counts[1],
+                }
+            )
+    for key, (total, attended) in expected.items():
+        if key not in stored:
+            user_id, subject_code, class_type = key
+            missing.append(
+                {
+                    "user_id": user_id,
+                    "subject_code": subject_code,
+                    "classType": class_type,
+                    "total_classes": total,
+                    "attended_classes": attended,
+                }
+            )
+
+    updated = inserted = 0
+    if not dry_run:
+        guarded_update = (
+            update(stats)
+            .where(
+                and_(
+                    stats.c.id == bindparam("row_id"),
+                    stats.c.total_classes == bindparam("old_total"),
+                    stats.c.attended_classes == bindparam("old_attended"),
+                )
+            )
+            .values(
+                total_classes=bindparam("new_total"),
+                attended_classes=bindparam("new_attended"),
+            )
+        )
+        batch = settings.STATS_RECONCILE_BATCH_SIZE
+        for start in range(0, len(changes), batch):
+            updated += _rowcount(
+                session.connection().execute(guarded_update, changes[start : start + batch]),
+                len(changes[start : start + batch]),
+            )
+        for start in range(0, len(missing), batch):
+            # Rows created by a concurrent first mark in the meantime are left alone
+            inserted += _insert_missing(session, missing[start : start + batch])
+        session.commit()
+
+    report = {
+        "dry_run": dry_run,
+        "rows_checked": len(stored),
+        "drifted": drifted,
+        "missing": len(missing),
+        "orphaned": orphaned,
+        "held": held,
+        "lower_counts": lower_counts,
+        "updated": updated,
+        "inserted": inserted,
+        "skipped": 0 if dry_run else len(changes) + len(missing) - updated - inserted,
+        "duration_seconds": round(time.perf_counter() - started, 3),
+    }
+    for kind in ("drifted", "missing", "orphaned"):
+        metrics.counter(
+            "attendance_stats_drift_total",
+            "AttendanceStats rows found out of line with attendance_logs",
+            kind=kind,
+        ).inc(report[kind])
+    metrics.histogram(
+        "attendance_stats_reconcile_seconds",
+        "Wall time of an AttendanceStats reconciliation run",
+        buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+    ).observe(report["duration_seconds"])
+    if changes or missing or held:
+        logger.warning("AttendanceStats drift found", extra=report)
+    else:
+        logger.info("AttendanceStats match attendance_logs", extra=report)
+    return report
+
+
+def _insert_missing(session: Session, rows: list[dict]) -> int:
+    stats = AttendanceStats.__table__
+    statement = dialect_insert(session, stats).on_conflict_do_nothing(
+        index_elements=[stats.c.user_id, stats.c.subject_code, stats.c.classType]
+    )
+    return _rowcount(session.connection().execute(statement, rows), len(rows))
+
+
+def _rowcount(result, attempted: int) -> int:
+    """Rows an executemany changed, if the driver reports it (else assume all)."""
+    if result.context.dialect.supports_sane_multi_rowcount:
+        return result.rowcount
+    return attempted
@@ -0,0 +1,107 @@
+"""
+Structured, non-blocking logging.
+
+Modules log through the standard library (`logger = logging.getLogger(__name__)`).
+`configure_logging()` — called once by the app entry points — routes every
+record through a `QueueHandler`, so the calling thread only copies the record
+onto a queue; a `QueueListener` thread formats it as one JSON object per line
+and writes it to stdout:
+
+    {"ts": "2025-10-27T18:02:11.532Z", "level": "WARNING",
+     "logger": "backend.adapters.telegram_client", "message": "Telegram 429 ...",
+     "method": "sendMessage", "retry_after": 3, "trace_id": "1f2a-118"}
+
+Fields passed with `extra={...}` become top-level keys, and records logged
+inside a trace (backend/utils/tracing.py) carry its trace and span ids.
+If the queue is full (LOG_QUEUE_SIZE), records are dropped and counted in
+`log_records_dropped_total` rather than blocking the caller.
+
+Levels: LOG_LEVEL for everything, overridden per logger by LOG_LEVELS,
+e.g. LOG_LEVELS='{"backend.adapters": "DEBUG", "backend.db.slow_query": "WARNING"}'.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from backend.config import settings
+from backend.utils import metrics, tracing
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+    "taskName",
+}
+
+_listener: QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only what must happen on the calling thread: merge args, render the
+        # traceback while it still exists, and capture the trace context
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        span = tracing.current_span()
+        if span is not None and span.traced:
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.counter(
+                "log_records_dropped_total", "Log records dropped because the queue was full"
+            ).inc()
+
+
+def configure_logging():
+    """Install the queue handler on the root logger and start the writer thread (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+    records = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+    _listener = QueueListener(records, output, respect_handler_level=False)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_NonBlockingQueueHandler(records))
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in settings.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener.start()
+    atexit.register(_listener.stop)  # Flush what is queued on exit
@@ -0,0 +1,150 @@
+"""
+Weekly timetable context for the LLM prompt.
+
+`read_main` needs the user's whole regular timetable on every message.  It is
+loaded with one query (all non-temporary slots, grouped by weekday in
+Python), rendered once into the prompt string and kept in a small per-user
+cache:
+
+    #12 Mon 09:00-10:00 DC (lecture)
+    #13 Mon 10:00-12:00 BDA (lab)
+    #20 Tue ...
+
+Each line starts with the slot's id as a handle; the LLM copies it into
+`Params.slot_id` so actions resolve their slot by primary key instead of
+matching day, times, subject and class type (see `resolve_slot` in
+backend/utils/attendanceManagement.py).
+
+Writers of `timetable_slots` (add_slot, update_slot, delete_slot and
+mark_attendance when it creates a temporary slot) call
+`invalidate_weekly_context(user_id)` after committing.  The cache is per
+process, so entries also expire after TIMETABLE_CONTEXT_TTL_SECONDS to bound
+staleness when several workers run side by side.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import time as dtime
+from typing import NamedTuple
+
+from sqlmodel import Session, select
+
+from backend.config import settings
+from backend.db.models import ClassType, DayEnum, TimetableSlots
+from backend.utils import metrics
+
+
+class SlotView(NamedTuple):
+    """Detached, immutable copy of a TimetableSlots row (safe to cache across sessions)."""
+
+    id: int
+    day: DayEnum
+    start_time: dtime
+    end_time: dtime
+    subject_code: str
+    class_type: ClassType
+
+
+class WeeklyContext(NamedTuple):
+    text: str  # Rendered timetable for the system prompt
+    slots: tuple[SlotView, ...]  # Regular slots, ordered by weekday then start time
+    version: str  # Hash of `text`; changes whenever the timetable does
+
+
+_DAY_ORDER = {day: idx for idx, day in enumerate(DayEnum)}
+
+
+def load_weekly_context(user_id: int, session: Session) -> WeeklyContext:
+    """Build the weekly context from the database with a single query."""
+    rows = session.exec(
+        select(TimetableSlots).where(
+            TimetableSlots.user_id == user_id,
+            TimetableSlots.is_temporary == False,
+        )
+    ).all()
+    slots = tuple(
+        sorted(
+            (
+                SlotView(
+                    id=row.id,
+                    day=row.day,
+                    start_time=row.start_time,
+                    end_time=row.end_time,
+                    subject_code=row.subject_code,
+                    class_type=row.class_type,
+                )
+                for row in rows
+            ),
+            key=lambda s: (_DAY_ORDER[s.day], s.start_time),
+        )
+    )
+    text = "\n".join(
+        f"#{slot.id} {slot.day.value} {slot.start_time:%H:%M}-{slot.end_time:%H:%M} "
+        f"{slot.subject_code} ({slot.class_type.value})"
+        for slot in slots
+    )
+    text = text or "(no regular classes)"
+    version = hashlib.sha1(text.encode()).hexdigest()[:16]
+    return WeeklyContext(text=text, slots=slots, version=version)
+
+
+class WeeklyContextCache:
+    """LRU + TTL cache of WeeklyContext keyed by user_id."""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[int, tuple[float, WeeklyContext]] = OrderedDict()
+        self._invalidations = 0  # Bumped on every invalidate; guards racing loads
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, session: Session) -> WeeklyContext:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                metrics.counter(
+                    "timetable_context_cache_total", "Weekly context lookups", result="hit"
+                ).inc()
+                return entry[1]
+            generation = self._invalidations
+        metrics.counter(
+            "timetable_context_cache_total", "Weekly context lookups", result="miss"
+        ).inc()
+        context = load_weekly_context(user_id, session)
+        with self._lock:
+            if generation != self._invalidations:
+                return context  # A write raced this load; don't cache what may be stale
+            self._entries[user_id] = (now + self.ttl_seconds, context)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return context
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._invalidations += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = WeeklyContextCache(
+    max_size=settings.TIMETABLE_CONTEXT_CACHE_SIZE,
+    ttl_seconds=settings.TIMETABLE_CONTEXT_TTL_SECONDS,
+)
+
+
+def get_weekly_context(user_id: int, session: Session) -> WeeklyContext:
+    """Cached weekly context for `user_id` (one query on a miss, none on a hit)."""
+    return _cache.get(user_id, session)
+
+
+def invalidate_weekly_context(user_id: int):
+    """Drop the cached context after `user_id`'s timetable_slots changed."""
+    _cache.invalidate(user_id)
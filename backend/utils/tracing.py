@@ -0,0 +1,189 @@
+"""
+Per-stage timing spans for the message pipeline.
+
+A trace covers the handling of one update; inside it, a span times one
+stage (user lookup, date extraction, LLM call, Telegram send, ...):
+
+    with tracing.trace("telegram_update", update_id=update_id):
+        with tracing.span("user_lookup"):
+            user = read_user(contact_id, session)
+        ...
+        tracing.set_attributes(prompt_tokens=812)  # on the innermost open span
+
+Spans nest through a contextvar, so they follow the request across function
+calls, into FastAPI's threadpool and onto the I/O loop (coroutines scheduled
+with `io_loop.run` inherit the caller's context).  Work that continues
+elsewhere later (the outbox sending a reply) passes `parent=` explicitly.
+
+Every finished span:
+- observes `pipeline_stage_seconds{stage=<name>}`, exposed with all other
+  metrics on /metrics (backend/routers/metricsRouter.py),
+- counts `pipeline_stage_errors_total{stage=<name>}` if it raised,
+- if it belongs to a trace, is handed to the local exporter, which keeps the
+  most recent spans in memory (/metrics/traces) and, when
+  TRACING_EXPORT_PATH is set, appends them to that file as JSON lines.
+
+Spans opened outside any trace (e.g. secret checks on API requests) only
+record their metrics.
+"""
+
+import logging
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from backend.config import settings
+from backend.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_ids = itertools.count(1)
+_process_tag = f"{os.getpid():x}"
+
+
+class Span:
+    """One timed stage. `attributes` holds counts and small labels, never message text."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start",
+        "duration",
+        "status",
+        "attributes",
+        "traced",
+        "_started",
+    )
+
+    def __init__(
+        self, name: str, parent: "Span | None" = None, root: bool = False, **attributes
+    ):
+        self.name = name
+        self.span_id = f"{_process_tag}-{next(_ids)}"
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.duration: float | None = None
+        self.status = "ok"
+        self.attributes = attributes
+        self.traced = root or (parent is not None and parent.traced)  # Exported if True
+        self._started = time.perf_counter()
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round(1000 * self.duration, 3) if self.duration else None,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class LocalSpanExporter:
+    """Keeps the last `max_spans` finished spans; optionally appends them to a JSONL file."""
+
+    def __init__(self, max_spans: int, path: str = ""):
+        self.path = path
+        self._spans: deque[dict] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        record = span.to_dict()
+        with self._lock:
+            self._spans.append(record)
+            if self.path:
+                try:
+                    with open(self.path, "a") as f:
+                        f.write(json.dumps(record, default=str) + "\n")
+                except OSError as e:
+                    logger.warning("Span export to %s failed: %s", self.path, e)
+
+    def recent_traces(self, limit: int = 20) -> list[dict]:
+        """The `limit` most recent traces, each with its spans in start order."""
+        with self._lock:
+            spans = list(self._spans)
+        traces: dict[str, list] = {}
+        for record in reversed(spans):
+            if record["trace_id"] not in traces:
+                if len(traces) == limit:
+                    continue
+                traces[record["trace_id"]] = []
+            traces[record["trace_id"]].append(record)
+        return [
+            {"trace_id": trace_id, "spans": sorted(records, key=lambda r: r["start"])}
+            for trace_id, records in traces.items()
+        ]
+
+
+exporter = LocalSpanExporter(
+    max_spans=settings.TRACING_BUFFER_SIZE, path=settings.TRACING_EXPORT_PATH
+)
+
+_current: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+@contextmanager
+def trace(name: str, **attributes):
+    """Start a new trace whose root span is `name`."""
+    with _span(name, None, True, attributes) as s:
+        yield s
+
+
+@contextmanager
+def span(name: str, parent: Span | None = None, **attributes):
+    """Time a stage as a child of `parent` (default: the current span)."""
+    with _span(name, parent or _current.get(), False, attributes) as s:
+        yield s
+
+
+@contextmanager
+def _span(name: str, parent: Span | None, root: bool, attributes: dict):
+    s = Span(name, parent, root, **attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException:
+        s.status = "error"
+        metrics.counter(
+            "pipeline_stage_errors_total", "Pipeline stages that raised", stage=name
+        ).inc()
+        raise
+    finally:
+        _current.reset(token)
+        s.duration = time.perf_counter() - s._started
+        metrics.histogram(
+            "pipeline_stage_seconds", "Latency of each pipeline stage", stage=name
+        ).observe(s.duration)
+        if s.traced:
+            exporter.export(s)
+
+
+def set_attributes(**attributes):
+    """Set attributes on the current span (no-op outside a span)."""
+    s = _current.get()
+    if s is not None:
+        s.attributes.update(attributes)
+
+
+def add_counts(**counts: int):
+    """Add to numeric attributes of the current span, e.g. tokens over several LLM calls."""
+    s = _current.get()
+    if s is not None:
+        for key, value in counts.items():
+            s.attributes[key] = s.attributes.get(key, 0) + (value or 0)
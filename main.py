@@ -5,20 +5,30 @@ Initializes the app, registers all routers, and ensures the database
 tables are created on startup.
 """
 
+import logging
 from fastapi import FastAPI
 from backend.config import settings
 from backend.db.database import create_db_and_tables
-from backend.routers import index, attendanceRouter, userRouter
+from backend.routers import index, attendanceRouter, userRouter, metricsRouter
 from backend.adapters.telegram import router as telegram_router
+from backend.utils.http_metrics import RequestMetricsMiddleware
+from backend.utils.structured_logging import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# JSON logs, written from a background thread
+configure_logging()
 
 app = FastAPI()
+# Request count and latency per router, served on /metrics
+app.add_middleware(RequestMetricsMiddleware)
 
 
 @app.on_event("startup")
 async def on_startup():
     """Create all database tables (if they don't exist) when the server starts."""
     create_db_and_tables()
-    print("Database and tables created!")
+    logger.info("Database and tables created")
 
 
 # --- Register routers with their URL prefixes ---
@@ -26,6 +36,7 @@ app.include_router(index.router, prefix="/index")
 app.include_router(userRouter.router, prefix="/users")
 app.include_router(attendanceRouter.router, prefix="/attendance")
 app.include_router(telegram_router, prefix="/adapters/telegram")
+app.include_router(metricsRouter.router, prefix="/metrics")
 
 
 @app.get("/")
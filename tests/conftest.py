@@ -0,0 +1,74 @@
+"""
+Test configuration: the required settings point at a throwaway SQLite
+database and dummy credentials, so no `.env`, Postgres or network is needed.
+
+    python -m pytest -q
+"""
+
+import os
+import sys
+import tempfile
+from datetime import time
+
+import pytest
+
+_DB_DIR = tempfile.mkdtemp(prefix="attendomatic-tests-")
+
+os.environ.setdefault("PG_DB", f"sqlite:///{_DB_DIR}/test.db")
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("TELEGRAM_BOT_KEY", "123:test")
+os.environ.setdefault("WEBHOOK_SECRET_TOKEN", "test")
+os.environ.setdefault("BASE_URL", "http://localhost")
+os.environ.setdefault("API_SECRET_KEY", "test")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def session():
+    """A session on freshly created tables."""
+    from sqlmodel import Session, SQLModel
+
+    from backend.db.database import create_db_and_tables, engine
+
+    SQLModel.metadata.drop_all(engine)
+    create_db_and_tables()
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def student(session):
+    """A user with subject DC: a Monday and a Thursday lecture, 09:00-10:00."""
+    from backend.db.models import ClassType, DayEnum, Subjects, TimetableSlots, User
+    from backend.utils.timetable_context import invalidate_weekly_context
+
+    user = User(
+        uid="U1",
+        name="Student",
+        div="A",
+        year=3,
+        batch="B1",
+        branch="COMPS",
+        contact_id="1001",
+        adminStatus=False,
+    )
+    session.add(user)
+    session.add(Subjects(subject_code="DC", subject_name="Digital Communication"))
+    session.commit()
+    for day in (DayEnum.MON, DayEnum.THU):
+        session.add(
+            TimetableSlots(
+                user_id=user.id,
+                day=day,
+                start_time=time(9),
+                end_time=time(10),
+                subject_code="DC",
+                class_type=ClassType.LECTURE,
+                is_temporary=False,
+            )
+        )
+    session.commit()
+    invalidate_weekly_context(user.id)
+    return user
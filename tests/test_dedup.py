@@ -0,0 +1,37 @@
+import asyncio
+import threading
+
+from backend.utils.dedup import UpdateDeduplicator
+
+
+class FakeRedis:
+    def __init__(self):
+        self.keys = {}
+        self.delete_threads = []
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+    def delete(self, key):
+        self.delete_threads.append(threading.get_ident())
+        self.keys.pop(key, None)
+
+
+def test_forget_lets_a_retry_through():
+    redis = FakeRedis()
+    dedup = UpdateDeduplicator(max_size=10, ttl_seconds=60, redis_client=redis)
+
+    async def scenario():
+        assert not await dedup.is_duplicate(7)
+        assert await dedup.is_duplicate(7)
+        await dedup.forget(7)
+        assert not await dedup.is_duplicate(7)
+
+        # The Redis delete ran in the threadpool, not on the event loop
+        (thread,) = redis.delete_threads
+        assert thread != threading.get_ident()
+
+    asyncio.run(scenario())
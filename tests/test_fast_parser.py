@@ -0,0 +1,60 @@
+from datetime import date, datetime, time
+
+import pytest
+
+from backend.db.models import AttendanceStatus, ClassType, DayEnum
+from backend.utils.date_extract import extract_dates_from_shift_message
+from backend.utils.fast_parser import parse_fast_path
+from backend.utils.timetable_context import SlotView
+
+TODAY = date(2026, 10, 16)  # A Friday
+
+SLOTS = [
+    SlotView(1, DayEnum.FRI, time(9), time(10), "DC", ClassType.LECTURE),
+    SlotView(2, DayEnum.FRI, time(11), time(13), "BDA", ClassType.LAB),
+    SlotView(3, DayEnum.MON, time(9), time(10), "DC", ClassType.LECTURE),
+]
+
+
+def parse(message: str):
+    base = datetime.combine(TODAY, time(12))
+    extracted = extract_dates_from_shift_message(message, base=base)
+    return parse_fast_path(message, SLOTS, extracted, today=TODAY)
+
+
+@pytest.mark.parametrize(
+    "message, slot_id, on, status",
+    [
+        ("attended DC lecture today", 1, TODAY, AttendanceStatus.PRESENT),
+        ("bunked BDA lab", 2, TODAY, AttendanceStatus.ABSENT),
+        ("attended dc on monday", 3, date(2026, 10, 12), AttendanceStatus.PRESENT),
+        ("attended DC on 16th October", 1, TODAY, AttendanceStatus.PRESENT),
+    ],
+)
+def test_marks_attendance(message, slot_id, on, status):
+    review = parse(message)
+    assert review is not None
+    (action,) = review.actions
+    assert action.params.slot_id == slot_id
+    assert action.params.date_of_slot == on
+    assert action.params.status == status
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        # Dates the extractor cannot resolve must not fall back to today
+        "attended DC on 17th",
+        "attended dc lecture on the 9th",
+        "bunked DC in march",
+        "attended DC on 13",
+        # Explicit times, including a bare "at 9", may not match the timetable
+        "attended DC lecture at 9",
+        "attended DC lecture at 9:00",
+        "attended DC lecture 9am",
+        # More than one instruction
+        "attended DC and bunked BDA",
+    ],
+)
+def test_leaves_to_llm(message):
+    assert parse(message) is None
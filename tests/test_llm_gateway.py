@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from backend.adapters.llm_gateway import CircuitBreaker, LLMGateway, LLMUnavailable
+
+
+def _gateway(reset_seconds: float = 0.05) -> LLMGateway:
+    return LLMGateway(
+        "test",
+        timeout_seconds=5,
+        max_retries=0,
+        breaker=CircuitBreaker(failure_threshold=1, reset_seconds=reset_seconds),
+        is_transient=lambda e: True,
+    )
+
+
+async def _fail():
+    raise ConnectionError("down")
+
+
+async def _open_then_half_open(gw: LLMGateway):
+    with pytest.raises(LLMUnavailable):
+        await gw.run(_fail)
+    assert gw.breaker.state == CircuitBreaker.OPEN
+    await asyncio.sleep(gw.breaker.reset_seconds + 0.01)
+    assert gw.breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_cancelled_half_open_trial_is_released():
+    async def scenario():
+        gw = _gateway()
+        await _open_then_half_open(gw)
+
+        trial = asyncio.create_task(gw.run(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)  # The trial is in flight
+        assert not gw.breaker.allow()
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        # Still half-open, but a new trial is admitted and can close it
+        assert gw.breaker.state == CircuitBreaker.HALF_OPEN
+        assert await gw.run(lambda: asyncio.sleep(0, result="ok")) == "ok"
+        assert gw.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_failed_half_open_trial_reopens():
+    async def scenario():
+        gw = _gateway()
+        await _open_then_half_open(gw)
+        with pytest.raises(LLMUnavailable):
+            await gw.run(_fail)
+        assert gw.breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(LLMUnavailable, match="circuit_open"):
+            await gw.run(lambda: asyncio.sleep(0))
+
+    asyncio.run(scenario())
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from groq import BadRequestError
+
+from backend.adapters.llm_gateway import CircuitBreaker, LLMGateway, is_transient_groq_error
+from backend.adapters.llm_providers import (
+    FakeProvider,
+    GroqProvider,
+    _default_fake_response,
+)
+from backend.utils import metrics
+from backend.utils.background_loop import BackgroundLoop
+from backend.utils.model_router import ModelRouter
+
+io = BackgroundLoop("test-io")
+
+
+def _bad_request(code: str, message: str) -> BadRequestError:
+    body = {"error": {"message": message, "type": "invalid_request_error", "code": code}}
+    response = httpx.Response(
+        400, request=httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+    )
+    return BadRequestError(f"Error code: 400 - {body}", response=response, body=body)
+
+
+def _router(small_error: BadRequestError):
+    provider = GroqProvider(
+        "test",
+        {"small": "small-model", "large": "large-model"},
+        LLMGateway(
+            "groq",
+            timeout_seconds=5,
+            max_retries=0,
+            breaker=CircuitBreaker(failure_threshold=3, reset_seconds=30),
+            is_transient=is_transient_groq_error,
+        ),
+    )
+    calls = []
+
+    async def create(model, messages, response_format):
+        calls.append(model)
+        if model == "small-model":
+            raise small_error
+        message = SimpleNamespace(content=_default_fake_response(messages, model))
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=message)])
+
+    provider.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+    return ModelRouter(provider, io), calls
+
+
+def _parse(router: ModelRouter):
+    messages = [{"role": "user", "content": "attended DC lecture today"}]
+    return router.parse(messages, "attended DC lecture today", [])
+
+
+@pytest.mark.parametrize(
+    "code, message",
+    [
+        ("json_validate_failed", "Failed to generate JSON. Please adjust your prompt."),
+        ("tool_use_failed", "Failed to call a function. Please adjust your prompt."),
+    ],
+)
+def test_schema_rejection_escalates_to_large_model(code, message):
+    router, calls = _router(_bad_request(code, message))
+    escalations = metrics.counter("llm_escalations_total", reason="invalid")
+    before = escalations.value
+
+    review = _parse(router)
+
+    assert review.actions
+    assert calls == ["small-model", "large-model"]
+    assert escalations.value == before + 1
+    # A schema rejection is not a provider outage
+    assert router.provider.gateway.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_other_bad_requests_are_not_escalated():
+    router, calls = _router(_bad_request("model_not_found", "The model does not exist."))
+    with pytest.raises(BadRequestError):
+        _parse(router)
+    assert calls == ["small-model"]
+
+
+def test_small_tier_timeouts_leave_the_large_tier_callable():
+    # Every small-tier call misses its 50 ms deadline
+    provider = FakeProvider(
+        latency_seconds=0.2,
+        gateway=LLMGateway(
+            "fake",
+            timeout_seconds=5,
+            max_retries=0,
+            breaker=CircuitBreaker(failure_threshold=1, reset_seconds=30),
+            is_transient=lambda e: False,
+        ),
+    )
+    router = ModelRouter(provider, io, small_timeout_seconds=0.05)
+    escalations = metrics.counter("llm_escalations_total", reason="unavailable")
+    before = escalations.value
+
+    for _ in range(3):
+        assert _parse(router).actions
+
+    assert escalations.value == before + 3
+    assert provider.gateway.breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,118 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from backend.db.models import LLMMultiResponse, Subjects, TimetableSlots, User
+from backend.routers import index
+
+
+@pytest.fixture
+def savepoint_session(tmp_path):
+    """
+    A session on its own SQLite database where savepoints nest as on Postgres.
+
+    pysqlite commits when the outermost SAVEPOINT is released; letting
+    SQLAlchemy emit BEGIN itself keeps the whole message in one transaction.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path}/perform.db")
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, _):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(
+            User(
+                uid="U1",
+                name="Student",
+                div="A",
+                year=3,
+                batch="B1",
+                branch="COMPS",
+                contact_id="1001",
+                adminStatus=False,
+            )
+        )
+        session.add(Subjects(subject_code="DC", subject_name="Digital Communication"))
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def _add_slot(start: str, end: str) -> dict:
+    return {
+        "intent": "add_slot",
+        "method": "POST",
+        "params": {
+            "subject_code": "DC",
+            "day_of_slot": "Fri",
+            "start_time": start,
+            "end_time": end,
+            "classType": "lab",
+        },
+    }
+
+
+def test_unexpected_error_rolls_back_the_whole_message(savepoint_session, monkeypatch):
+    def failing_create_subject(subject, session):
+        raise IntegrityError("INSERT INTO subjects ...", {}, Exception("duplicate key"))
+
+    monkeypatch.setattr(index, "create_subject", failing_create_subject)
+    review = LLMMultiResponse(
+        actions=[
+            _add_slot("11:00", "13:00"),
+            {
+                "intent": "create_subject",
+                "method": "POST",
+                "params": {"subject_code": "OS", "subject_name": "Operating Systems"},
+            },
+            _add_slot("14:00", "16:00"),
+        ],
+        confirmation_message="Confirm?",
+    )
+
+    result = index.perform_intent("1001", savepoint_session, review=review)
+
+    assert result["message"] == "Action 2 (create_subject) failed, so nothing was changed."
+    # The slot added by action 1 was rolled back, and action 3 never ran
+    assert savepoint_session.exec(select(TimetableSlots)).all() == []
+
+
+def test_per_action_failures_keep_the_other_actions(savepoint_session):
+    review = LLMMultiResponse(
+        actions=[_add_slot("11:00", "13:00"), _add_slot("12:00", "14:00")],
+        confirmation_message="Confirm?",
+    )
+
+    result = index.perform_intent("1001", savepoint_session, review=review)
+
+    first, second = result["message"].split("\n")
+    assert first.startswith("Slot added successfully")
+    assert second.startswith("Failed to add slot.")
+    assert len(savepoint_session.exec(select(TimetableSlots)).all()) == 1
+
+
+def test_rejected_plan_is_not_reported_as_executed(session, student):
+    review = LLMMultiResponse(
+        actions=[
+            {
+                "intent": "create_subject",
+                "method": "POST",
+                "params": {"subject_code": "DC", "subject_name": "Digital Communication"},
+            }
+        ],
+        confirmation_message="Confirm?",
+    )
+
+    result = index._confirm_review(review, student.contact_id, student, session)
+
+    assert result["executed"] is False
+    assert result["rejected"] is True
+    (problems,) = result["problems"]
+    assert "already exists" in problems[0]
@@ -0,0 +1,88 @@
+"""
+Query-count budgets for the main message flows, so N+1 regressions fail CI.
+
+One user's Telegram updates run in order through `process_update` (fake LLM,
+replies captured instead of sent); each must stay within its statement
+budget (`query_budget`, backend/db/profiling.py).  The budgets are the
+current counts; lower them when a flow gets cheaper.  To check them against
+Postgres, point PG_DB at a throwaway database:
+
+    PG_DB=postgresql://... python -m pytest -q tests/test_query_budget.py
+"""
+
+from datetime import date, time, timedelta
+
+from backend.adapters import telegram
+from backend.adapters.llm_providers import FakeProvider
+from backend.db.database import engine
+from backend.db.models import ChatID, ClassType, DayEnum, TimetableSlots
+from backend.db.profiling import query_budget
+from backend.routers import index
+from backend.utils.timetable_context import invalidate_weekly_context
+
+# SQLite takes its write lock with one extra statement when marking
+_LOCK = 1 if engine.dialect.name == "sqlite" else 0
+
+# (message text, max statements), in order.  {day} is today, or yesterday on
+# Sundays; the user has a DC lab that day.
+FLOWS = [
+    ("/today", 4),
+    ("attended DC lab {day}", 9),
+    ("yes", 9 + _LOCK),
+    ("attendance stats for DC", 7),  # One stats query per class type of DC
+    ("bunked DC lab {day}", 8),
+    ("no", 4),
+    ("what did I do in the DC lab last week?", 6),
+]
+
+
+class RecordingOutbox:
+    """Collects replies instead of sending them."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text: str, **params):
+        self.sent.append(text)
+
+    def call(self, method: str, **params):
+        self.sent.append(params.get("text", method))
+
+
+def test_message_flows_stay_within_query_budgets(session, student, monkeypatch):
+    day = "today" if date.today().weekday() != 6 else "yesterday"
+    on = date.today() if day == "today" else date.today() - timedelta(days=1)
+    session.add(ChatID(contact_id=student.contact_id, user_id=student.id, adapter="telegram"))
+    session.add(
+        TimetableSlots(
+            user_id=student.id,
+            day=DayEnum(on.strftime("%a")),
+            start_time=time(11),
+            end_time=time(13),
+            subject_code="DC",
+            class_type=ClassType.LAB,
+            is_temporary=False,
+        )
+    )
+    session.commit()
+    invalidate_weekly_context(student.id)
+
+    outbox = RecordingOutbox()
+    monkeypatch.setattr(telegram, "outbox", outbox)
+    monkeypatch.setattr(index.model_router, "provider", FakeProvider())
+
+    contact_id = int(student.contact_id)
+    for update_id, (template, budget) in enumerate(FLOWS, 1):
+        replies = len(outbox.sent)
+        update = {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "from": {"id": contact_id},
+                "chat": {"id": contact_id},
+                "text": template.format(day=day),
+            },
+        }
+        with query_budget(max_queries=budget):
+            telegram.process_update(update)
+        assert len(outbox.sent) > replies, f"no reply to {update['message']['text']!r}"
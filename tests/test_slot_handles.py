@@ -0,0 +1,124 @@
+from datetime import date, time
+
+from sqlmodel import select
+
+from backend.db.models import (
+    AttendanceLog,
+    ClassType,
+    DayEnum,
+    LLMMultiResponse,
+    TimetableSlots,
+)
+from backend.utils.action_planner import plan_actions
+from backend.utils.attendanceManagement import mark_attendance, resolve_slot
+
+THURSDAY = date(2026, 10, 15)
+
+
+def _slots(session, user):
+    slots = session.exec(
+        select(TimetableSlots).where(TimetableSlots.user_id == user.id)
+    ).all()
+    return {slot.day: slot for slot in slots}
+
+
+def test_handle_for_another_day_falls_back_to_composite(session, student):
+    slots = _slots(session, student)
+    monday, thursday = slots[DayEnum.MON], slots[DayEnum.THU]
+    kwargs = dict(
+        subject_code="DC",
+        start_time=time(9),
+        end_time=time(10),
+        class_type=ClassType.LECTURE,
+    )
+    # Monday's handle with Thursday's lecture → Thursday's slot
+    found = resolve_slot(session, student.id, monday.id, day=DayEnum.THU, **kwargs)
+    assert found.id == thursday.id
+    # A handle alone (nothing to contradict it) is trusted
+    assert resolve_slot(session, student.id, monday.id).id == monday.id
+
+
+def test_mark_with_mixed_up_handle_logs_the_described_slot(session, student):
+    slots = _slots(session, student)
+    mark_attendance(
+        user_id=student.id,
+        subject_code="DC",
+        day=DayEnum.THU,
+        start_time=time(9),
+        end_time=time(10),
+        status="present",
+        classType=ClassType.LECTURE,
+        session=session,
+        date_of_slot=THURSDAY,
+        slot_id=slots[DayEnum.MON].id,
+    )
+    (log,) = session.exec(select(AttendanceLog)).all()
+    assert log.slot_id == slots[DayEnum.THU].id
+
+
+def test_plan_resolves_or_flags_mixed_up_handles(session, student):
+    slots = _slots(session, student)
+    monday = slots[DayEnum.MON]
+
+    def plan(**params):
+        action = {"intent": "mark_attendance", "method": "POST", "params": params}
+        review = LLMMultiResponse(actions=[action], confirmation_message="Confirm?")
+        return plan_actions(review, student, session)[0]
+
+    entry = plan(
+        slot_id=monday.id,
+        subject_code="DC",
+        date_of_slot=str(THURSDAY),
+        start_time="09:00",
+        end_time="10:00",
+        classType="lecture",
+        status="present",
+    )
+    assert entry["slot_id"] == slots[DayEnum.THU].id
+    assert entry["problems"] == []
+
+    # Thursday has no 11:00 class: the handle contradicts it and nothing matches
+    entry = plan(
+        slot_id=monday.id,
+        subject_code="DC",
+        date_of_slot=str(THURSDAY),
+        start_time="11:00",
+        end_time="12:00",
+        classType="lecture",
+        status="present",
+    )
+    assert entry["slot_id"] is None
+    assert f"#{monday.id} is DC lecture on Mon" in entry["problems"][0]
+
+
+def test_temporary_slot_note_follows_what_mark_attendance_did(session, student):
+    from backend.db.models import LLMResponseSchema
+    from backend.routers.index import _perform_action
+
+    monday = _slots(session, student)[DayEnum.MON]
+
+    def perform(**params):
+        item = LLMResponseSchema(intent="mark_attendance", method="POST", params=params)
+        messages = []
+        _perform_action(item, student, session, messages)
+        return messages[0]
+
+    # Handle only: a timetabled slot, no temporary slot
+    message = perform(
+        slot_id=monday.id,
+        subject_code="DC",
+        classType="lecture",
+        date_of_slot=str(date(2026, 10, 12)),
+        status="present",
+    )
+    assert message.startswith("Attendance marked") and "temporary" not in message
+    # Explicit times that aren't in the timetable: a temporary slot is created
+    message = perform(
+        subject_code="DC",
+        classType="lecture",
+        date_of_slot=str(THURSDAY),
+        start_time="14:00",
+        end_time="15:00",
+        status="absent",
+    )
+    assert "temporary slot created" in message
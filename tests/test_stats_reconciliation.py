@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+
+from sqlalchemy import delete
+from sqlmodel import select
+
+from backend.db.models import AttendanceLog, AttendanceStats, DayEnum, TimetableSlots
+from backend.utils.attendanceManagement import mark_attendance
+from backend.utils.stats_reconciliation import reconcile_attendance_stats
+
+MONDAY = date(2026, 10, 12)
+
+
+def _mark_weeks(session, user, slot, weeks: int, offset: int):
+    for week in range(weeks):
+        mark_attendance(
+            user_id=user.id,
+            subject_code=slot.subject_code,
+            day=slot.day,
+            start_time=slot.start_time,
+            end_time=slot.end_time,
+            status="present",
+            classType=slot.class_type,
+            session=session,
+            date_of_slot=MONDAY + timedelta(days=offset - 7 * week),
+            slot_id=slot.id,
+        )
+
+
+def _delete_slot_with_logs(session, slot_id: int):
+    # What ON DELETE CASCADE does on Postgres (SQLite runs without foreign keys)
+    session.execute(delete(AttendanceLog).where(AttendanceLog.slot_id == slot_id))
+    session.execute(delete(TimetableSlots).where(TimetableSlots.id == slot_id))
+    session.commit()
+
+
+def _counters(session):
+    (row,) = session.exec(select(AttendanceStats)).all()
+    session.refresh(row)
+    return row.total_classes, row.attended_classes
+
+
+def test_deleted_slot_keeps_its_history(session, student):
+    slots = {
+        s.day: s
+        for s in session.exec(
+            select(TimetableSlots).where(TimetableSlots.user_id == student.id)
+        ).all()
+    }
+    monday, thursday = slots[DayEnum.MON], slots[DayEnum.THU]
+    _mark_weeks(session, student, monday, weeks=3, offset=0)
+    _mark_weeks(session, student, thursday, weeks=2, offset=3)
+    assert _counters(session) == (5, 5)
+
+    # Monday's lecture is dropped from the timetable: its 3 logs go with it
+    _delete_slot_with_logs(session, monday.id)
+    report = reconcile_attendance_stats(session)
+    assert report["drifted"] == 1 and report["held"] == 1 and report["updated"] == 0
+    assert _counters(session) == (5, 5)
+
+    # Losing every log of the subject leaves an orphan, which is kept too
+    _delete_slot_with_logs(session, thursday.id)
+    report = reconcile_attendance_stats(session)
+    assert report["orphaned"] == 1 and report["held"] == 1 and report["updated"] == 0
+    assert _counters(session) == (5, 5)
+
+    # Lowering is an explicit choice
+    report = reconcile_attendance_stats(session, lower_counts=True)
+    assert report["updated"] == 1
+    assert _counters(session) == (0, 0)
+
+
+def test_missing_and_undercounted_rows_are_repaired(session, student):
+    monday = session.exec(
+        select(TimetableSlots).where(TimetableSlots.day == DayEnum.MON)
+    ).one()
+    _mark_weeks(session, student, monday, weeks=2, offset=0)
+    row = session.exec(select(AttendanceStats)).one()
+    row.total_classes, row.attended_classes = 1, 0
+    session.commit()
+    report = reconcile_attendance_stats(session)
+    assert report["drifted"] == 1 and report["updated"] == 1
+    assert _counters(session) == (2, 2)
+
+    session.execute(delete(AttendanceStats))
+    session.commit()
+    report = reconcile_attendance_stats(session)
+    assert report["missing"] == 1 and report["inserted"] == 1
+    assert _counters(session) == (2, 2)
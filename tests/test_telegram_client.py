@@ -0,0 +1,61 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+from backend.adapters.telegram_client import RateLimiter, TelegramClient, TelegramOutbox
+from backend.utils.background_loop import BackgroundLoop
+
+
+def test_429_keeps_a_chats_replies_in_order_and_pauses_other_chats():
+    sent = []  # (chat_id, text, monotonic time) of accepted sends
+    limited = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = json.loads(request.content)
+        if params["text"] == "Processing…" and not limited:
+            limited.append(time.monotonic())
+            return httpx.Response(
+                429,
+                json={
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests: retry after 1",
+                    "parameters": {"retry_after": 1},
+                },
+            )
+        sent.append((params["chat_id"], params["text"], time.monotonic()))
+        return httpx.Response(200, json={"ok": True, "result": {}})
+
+    client = TelegramClient(
+        "123:test",
+        global_rate=1000,
+        per_chat_rate=100,
+        transport=httpx.MockTransport(handler),
+    )
+    outbox = TelegramOutbox(client, BackgroundLoop("test-telegram"), concurrency=4)
+
+    outbox.send_message(chat_id=1, text="Processing…")
+    outbox.send_message(chat_id=1, text="Done")
+    time.sleep(0.2)  # The first send got its 429
+    outbox.send_message(chat_id=2, text="Hello")
+    asyncio.run(outbox.drain(timeout=10))
+
+    assert [text for chat, text, _ in sent if chat == 1] == ["Processing…", "Done"]
+    (hello_at,) = [at for chat, _, at in sent if chat == 2]
+    assert hello_at >= limited[0] + 0.9  # Held back by the global pause
+
+
+def test_defer_holds_back_reservations_already_made():
+    async def scenario():
+        limiter = RateLimiter(rate_per_second=10)
+        await limiter.acquire("chat")
+        started = time.monotonic()
+        waiting = asyncio.create_task(limiter.acquire("chat"))  # Reserved for +0.1s
+        await asyncio.sleep(0)
+        limiter.defer(0.3, "chat")
+        await waiting
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.29
@@ -0,0 +1,20 @@
+from backend.adapters import telegram
+
+
+def test_help_and_bot_down_replies_open_no_session(monkeypatch):
+    replies = []
+
+    def no_session():
+        raise AssertionError("opened a DB session")
+
+    monkeypatch.setattr(telegram, "get_db_session", no_session)
+    monkeypatch.setattr(
+        telegram.outbox, "send_message", lambda chat_id, text, **params: replies.append(text)
+    )
+    message = {"chat": {"id": 1001}, "from": {"id": 1001}, "text": "/help"}
+
+    telegram.process_message(message)
+    monkeypatch.setattr(telegram, "is_telegram_bot_down", lambda: True)
+    telegram.process_message({**message, "text": "attended DC"})
+
+    assert replies == [telegram.HELP_TEXT, "Sorry, bot is temporarily down."]
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+import time
+
+from backend.adapters.update_queue import ShardedUpdateScheduler
+
+
+def test_stop_waits_for_handlers_off_the_event_loop():
+    finished = threading.Event()
+
+    def slow_handler(item):
+        time.sleep(0.3)
+        finished.set()
+
+    async def scenario():
+        scheduler = ShardedUpdateScheduler(slow_handler, lanes=1, lane_depth=4)
+        scheduler.start()
+        assert await scheduler.submit({"update_id": 1}, key="1001")
+        await asyncio.sleep(0.05)  # The handler is running in the pool
+
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        beating = asyncio.create_task(heartbeat())
+        await scheduler.stop(timeout=0)
+        beating.cancel()
+
+        # stop() returned only after the handler finished, and the loop kept
+        # running while it waited
+        assert finished.is_set()
+        assert ticks > 5
+
+    asyncio.run(scenario())
+
+
+def test_drop_oldest_hands_the_evicted_update_to_on_drop():
+    release = threading.Event()
+    dropped = []
+
+    async def scenario():
+        scheduler = ShardedUpdateScheduler(
+            lambda item: release.wait(5),
+            lanes=1,
+            lane_depth=1,
+            overflow_policy="drop_oldest",
+            on_drop=dropped.append,
+        )
+        scheduler.start()
+        assert await scheduler.submit("first", key="1001")
+        await asyncio.sleep(0.05)  # "first" is being handled; the lane is empty
+        assert await scheduler.submit("second", key="1001")
+        assert await scheduler.submit("third", key="1001")  # Evicts "second"
+        assert dropped == ["second"]
+        release.set()
+        await scheduler.stop(timeout=5)
+
+    asyncio.run(scenario())